@@ -0,0 +1,28 @@
+"""Add content_sha256 to documents for move detection
+
+Revision ID: 5b1e9a7c3d20
+Revises: 0c8740bb4663
+Create Date: 2026-10-19 10:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e9a7c3d20'
+down_revision = '0c8740bb4663'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index('idx_documents_size_sha256', ['file_size', 'content_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('idx_documents_size_sha256')
+        batch_op.drop_column('content_sha256')
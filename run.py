@@ -8,6 +8,7 @@ SRC_PATH = Path(__file__).parent / "src"
 sys.path.insert(0, str(SRC_PATH))
 
 from local_document_search import create_app
+from local_document_search.services.reconcile_service import start_reconcile_scheduler
 
 def print_banner(app):
     debug = bool(app.config.get("DEBUG") or app.config.get("FLASK_DEBUG"))
@@ -24,6 +25,7 @@ if __name__ == "__main__":
     app = create_app()
     print_banner(app)
     app.logger.info("Application starting...")
+    start_reconcile_scheduler(app)
     app.logger.info("Threaded server so /convert/stop stays responsive during ingestion")
 
     # Flask built-in dev server; keep threaded=True to avoid blocking SSE + control endpoint
@@ -0,0 +1,97 @@
+"""Cold-start benchmark for app startup and the conversion CLI.
+
+Usage:
+  python scripts/bench_import_time.py            # 5 runs per scenario
+  python scripts/bench_import_time.py --runs 10 --top 15
+
+Each scenario runs in a fresh interpreter (no warm module cache) and reports the median
+wall-clock time. With ``--top N`` the slowest top-level imports from ``python -X importtime``
+are listed as well, which shows whether heavy converter dependencies (markitdown,
+faster_whisper/ctranslate2, onnxruntime, dashscope, google-genai, openai) are still being
+pulled in at startup.
+
+Scenarios:
+  create_app     from local_document_search import create_app; create_app()
+  convert-file   python -m local_document_search.cli convert-file <tmp .txt>
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+HEAVY_MODULES = ('markitdown', 'faster_whisper', 'ctranslate2', 'onnxruntime', 'dashscope', 'google.genai', 'openai')
+_IMPORTTIME = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    return env
+
+
+def _scenarios(sample_file):
+    return {
+        'create_app': [sys.executable, '-c', 'from local_document_search import create_app; create_app()'],
+        'convert-file': [sys.executable, '-m', 'local_document_search.cli', 'convert-file', sample_file],
+    }
+
+
+def _time_run(cmd):
+    start = time.perf_counter()
+    subprocess.run(cmd, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def _import_profile(cmd):
+    """Return ({top-level package: cumulative µs}, set of heavy modules imported)."""
+    proc = subprocess.run([cmd[0], '-X', 'importtime'] + cmd[1:], env=_env(),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    top = {}
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        cumulative, name = int(m.group(2)), m.group(3)
+        root = name.split('.')[0]
+        # A package's outermost import line carries the largest cumulative time
+        top[root] = max(top.get(root, 0), cumulative)
+        for mod in HEAVY_MODULES:
+            if name == mod or name.startswith(mod + '.'):
+                heavy.add(mod)
+    return top, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh-interpreter runs per scenario (default: 5)')
+    parser.add_argument('--top', type=int, default=0, help='Also list the N slowest top-level imports')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = os.path.join(tmp, 'sample.txt')
+        with open(sample, 'w', encoding='utf-8') as f:
+            f.write('hello world\n')
+
+        for name, cmd in _scenarios(sample).items():
+            timings = [_time_run(cmd) for _ in range(max(1, args.runs))]
+            top, heavy = _import_profile(cmd)
+            print(f"{name:<14} median={statistics.median(timings) * 1000:8.1f} ms  "
+                  f"min={min(timings) * 1000:8.1f} ms  runs={len(timings)}")
+            print(f"{'':<14} heavy modules imported: {', '.join(sorted(heavy)) or 'none'}")
+            if args.top:
+                for mod, us in sorted(top.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+                    print(f"{'':<16}{us / 1000:8.1f} ms  {mod}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,21 @@ from local_document_search.routes import convert, search, main, cleanup
 from local_document_search.utils.logger import configure_logging
 
 
+def configure_engine_options(app: Flask) -> None:
+    """Pool settings from DB_POOL_* for server databases; explicit SQLALCHEMY_ENGINE_OPTIONS win."""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    options = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+    }
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
 def init_extensions(app: Flask) -> None:
     """Initialize Flask extensions."""
     db.init_app(app)
@@ -35,9 +50,13 @@ def create_app(config_class: type[Config] = Config) -> Flask:
     if not app.config.get('SQLALCHEMY_DATABASE_URI'):
         raise RuntimeError("SQLALCHEMY_DATABASE_URI is not set. Ensure DATABASE_URL is defined in the environment/.env.")
 
+    configure_engine_options(app)
     init_extensions(app)
     register_blueprints(app)
 
+    from local_document_search.services.pool_metrics import install_pool_metrics
+    install_pool_metrics(app)
+
     configure_logging(app)
     app.logger.info('Application startup')
 
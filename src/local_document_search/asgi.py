@@ -0,0 +1,151 @@
+"""ASGI entry point: ingestion progress streams on the event loop, everything else via WSGI.
+
+    pip install ".[asgi]"
+    uvicorn --factory local_document_search.asgi:create_asgi_app --host 0.0.0.0 --port 5000
+
+Under a WSGI server every open ``/api/convert-stream`` connection occupies a worker thread
+for the whole ingestion. Here the stream routes still run their Flask view (validation,
+session start, Last-Event-ID resume) in a thread, but the view only hands the session
+over; the events are then relayed by a coroutine awaiting ``astream_async_session``.
+All other routes (pages, search, stop) run the Flask app in a bounded thread pool via
+a2wsgi (ASGI_WSGI_WORKERS).
+
+Ingestion sessions live in process memory, so run a single server process (or use sticky
+sessions) — a stream, its stop request and its reconnects must reach the same process.
+"""
+import asyncio
+import re
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from local_document_search import create_app
+from local_document_search.routes.convert import (
+    ASYNC_SSE_ENVIRON_KEY, SSE_AFTER_HEADER, SSE_SESSION_HEADER, session_started_event, sse_message,
+)
+from local_document_search.services.ingestion_manager import astream_async_session
+from local_document_search.services.reconcile_service import start_reconcile_scheduler
+
+# GET routes whose response may be an ingestion session stream
+STREAM_PATH = re.compile(r'^/api/(convert-stream|sources/[^/]+/stream)$')
+
+
+class AsgiApp:
+    """ASGI wrapper around the Flask app that serves session streams without a thread each."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._wsgi = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'GET' and STREAM_PATH.match(scope['path']):
+            await self._stream(scope, receive, send)
+        else:
+            await self._wsgi_app()(scope, receive, send)
+
+    def _wsgi_app(self):
+        if self._wsgi is None:
+            try:
+                from a2wsgi import WSGIMiddleware
+            except ImportError as e:
+                raise RuntimeError('ASGI mode needs a2wsgi: pip install ".[asgi]"') from e
+            self._wsgi = WSGIMiddleware(self.flask_app, workers=self.flask_app.config.get('ASGI_WSGI_WORKERS', 10))
+        return self._wsgi
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                start_reconcile_scheduler(self.flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _environ(self, scope):
+        headers = [(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']]
+        host = next((v for k, v in headers if k.lower() == 'host'), 'localhost')
+        builder = EnvironBuilder(path=scope['path'], query_string=scope['query_string'].decode('latin-1'),
+                                 method='GET', headers=headers,
+                                 base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}")
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        environ[ASYNC_SSE_ENVIRON_KEY] = True
+        return environ
+
+    async def _stream(self, scope, receive, send):
+        app_iter, status, headers = await asyncio.to_thread(run_wsgi_app, self.flask_app, self._environ(scope))
+        session_id = headers.get(SSE_SESSION_HEADER)
+        if session_id is None:
+            # Not handed over (error stream, 204, synchronous ingestion): relay the WSGI body
+            await self._relay(app_iter, status, headers, send)
+            return
+        await asyncio.to_thread(_close, app_iter)
+        after_event_id = int(headers.get(SSE_AFTER_HEADER, 0))
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache')]})
+        relay = asyncio.create_task(self._relay_session(session_id, after_event_id, send))
+        disconnect = asyncio.create_task(_wait_disconnect(receive))
+        try:
+            await asyncio.wait({relay, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (relay, disconnect):
+                task.cancel()
+            await asyncio.gather(relay, disconnect, return_exceptions=True)
+        if relay.done() and not relay.cancelled():
+            if relay.exception() is not None:
+                self.flask_app.logger.error(f"[ASGI] stream of session {session_id} failed: {relay.exception()!r}")
+            else:
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def _relay_session(self, session_id, after_event_id, send):
+        with self.flask_app.app_context():
+            if not after_event_id:
+                await _send_chunk(send, sse_message(session_started_event(session_id), session_id))
+            async for evt in astream_async_session(session_id, after_event_id):
+                await _send_chunk(send, sse_message(evt, session_id))
+
+    async def _relay(self, app_iter, status, headers, send):
+        # The body generator may push an app context, so it is consumed in a single thread
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def produce():
+            try:
+                for chunk in app_iter:
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            finally:
+                _close(app_iter)
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        producer = loop.run_in_executor(None, produce)
+        await send({'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]})
+        while (chunk := await chunks.get()) is not None:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        await producer
+
+
+def _close(app_iter):
+    # Close the WSGI response (generator cleanup, call_on_close hooks)
+    if hasattr(app_iter, 'close'):
+        app_iter.close()
+
+
+async def _send_chunk(send, text):
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def create_asgi_app(flask_app=None):
+    """ASGI application factory (``uvicorn --factory``)."""
+    return AsgiApp(flask_app or create_app())
@@ -1,10 +1,26 @@
 from __future__ import annotations
 
 import os
+import json
+import time
+import signal
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import click
+from flask import Flask
 from local_document_search.config import load_environment
 from local_document_search.config import Config
 from local_document_search.services.provider_factory import build_conversion_service
+from local_document_search.utils.file_utils import normalize_path
+from local_document_search.utils.hash_utils import file_sha256
+
+
+def _conversion_context():
+    """Minimal app context so converters can read current_app.config / logger (no database needed)."""
+    app = Flask("local_document_search")
+    app.config.from_object(Config)
+    return app.app_context()
 
 
 @click.group()
@@ -20,7 +36,8 @@ def convert_file(file_path: str, file_type: str | None, output: str | None) -> N
     """Convert a single file to Markdown using the conversion service."""
     load_environment()
     service = build_conversion_service()
-    result = service.convert(file_path, file_type)
+    with _conversion_context():
+        result = service.convert(file_path, file_type)
 
     if not result.success:
         click.secho(f"[error] {result.error}", fg="red", err=True)
@@ -34,15 +51,105 @@ def convert_file(file_path: str, file_type: str | None, output: str | None) -> N
         click.echo(result.content or "")
 
 
+MANIFEST_NAME = ".convert_manifest.jsonl"
+_worker_service = None
+
+
+def _load_worker_service() -> None:
+    global _worker_service
+    load_environment()
+    _worker_service = build_conversion_service()
+
+
+def _init_worker() -> None:
+    """Pool initializer: the worker process keeps one conversion context for its lifetime."""
+    _conversion_context().push()
+    _load_worker_service()
+
+
+def _convert_job(src_path: str, ext: str, out_path: str) -> tuple[str, str, bool, str | None]:
+    """Convert one file and write its markdown atomically; runs in a pool worker (or inline for --jobs 1)."""
+    try:
+        result = _worker_service.convert(src_path, ext)
+        if not result.success:
+            return src_path, out_path, False, result.error
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp_path = out_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(result.content or "")
+        os.replace(tmp_path, out_path)
+        return src_path, out_path, True, None
+    except Exception as e:
+        return src_path, out_path, False, f"{type(e).__name__}: {e}"
+
+
+def _load_manifest(path: str) -> dict:
+    """Latest manifest entry per relative source path; compacts the file when mostly superseded."""
+    entries = {}
+    lines = 0
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            lines += 1
+            try:
+                entry = json.loads(line)
+                entries[entry["src"]] = entry
+            except (ValueError, KeyError):
+                continue  # torn last line from an interrupted run
+    if lines > 2 * len(entries) + 100:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+    return entries
+
+
+def _is_up_to_date(src_path: str, out_path: str, entry: dict | None, digests: dict) -> bool:
+    """Decide from mtimes and the manifest's size/mtime; the source is hashed only when that is ambiguous.
+
+    Hashes computed here are left in ``digests`` (src -> (mtime_ns, sha256)) so a reconversion
+    can record them without reading the file again.
+    """
+    if not os.path.exists(out_path):
+        return False
+    st = os.stat(src_path)
+    if os.path.getmtime(out_path) >= st.st_mtime:
+        return True
+    if not entry or entry.get("status") != "ok" or entry.get("size") != st.st_size:
+        return False
+    if entry.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    # Same size, new mtime (copied archive, restored backup): compare with the recorded hash
+    digest = file_sha256(src_path)
+    digests[src_path] = (st.st_mtime_ns, digest)
+    if entry.get("sha256") == digest:
+        os.utime(out_path)
+        return True
+    return False
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
 @cli.command("convert-dir")
 @click.argument("source_dir", type=click.Path(exists=True, file_okay=False, readable=True))
 @click.option("--output-dir", "output_dir", "-o", required=True, type=click.Path(file_okay=False, writable=True), help="Directory to write converted Markdown files (structure is preserved).")
 @click.option("--extensions", "exts", "-e", help="Comma-separated list of file extensions to include (default: Config.SUPPORTED_FILE_TYPES).")
 @click.option("--recursive/--no-recursive", default=True, help="Recurse into subdirectories (default: true).")
-def convert_dir(source_dir: str, output_dir: str, exts: str | None, recursive: bool) -> None:
-    """Convert a directory of files to Markdown, writing .md files to OUTPUT_DIR."""
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1, show_default=True, help="Number of worker processes.")
+@click.option("--force", is_flag=True, help="Reconvert every file, ignoring up-to-date outputs and the manifest.")
+def convert_dir(source_dir: str, output_dir: str, exts: str | None, recursive: bool, jobs: int, force: bool) -> None:
+    """Convert a directory of files to Markdown, writing .md files to OUTPUT_DIR.
+
+    Outputs newer than their source, or whose source size/mtime (or, when only the mtime
+    changed, SHA-256) matches the manifest (OUTPUT_DIR/.convert_manifest.jsonl), are
+    skipped, so an interrupted run resumes.
+    """
     load_environment()
-    service = build_conversion_service()
 
     include_exts = None
     if exts:
@@ -50,7 +157,13 @@ def convert_dir(source_dir: str, output_dir: str, exts: str | None, recursive: b
     else:
         include_exts = [ext.lower() for ext in Config.SUPPORTED_FILE_TYPES]
 
-    total = success = failed = 0
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {} if force else _load_manifest(manifest_path)
+
+    total = skipped = 0
+    pending = []
+    digests = {}
     for root, dirs, files in os.walk(source_dir):
         if not recursive:
             # clear dirs to prevent deeper traversal
@@ -64,19 +177,200 @@ def convert_dir(source_dir: str, output_dir: str, exts: str | None, recursive: b
             rel_path = os.path.relpath(src_path, source_dir)
             rel_no_ext = os.path.splitext(rel_path)[0]
             out_path = os.path.join(output_dir, rel_no_ext + ".md")
-            os.makedirs(os.path.dirname(out_path), exist_ok=True)
-
-            result = service.convert(src_path, ext)
-            if not result.success:
-                failed += 1
-                click.secho(f"[fail] {src_path} :: {result.error}", fg="red", err=True)
+            if not force and _is_up_to_date(src_path, out_path, manifest.get(rel_path), digests):
+                skipped += 1
                 continue
+            pending.append((src_path, ext, out_path, rel_path))
+
+    if skipped:
+        click.echo(f"Skipping {skipped} up-to-date file(s); {len(pending)} to convert with {jobs} job(s).")
+
+    success = failed = 0
+    rel_paths = {src_path: rel_path for src_path, _, _, rel_path in pending}
+    started = last_report = time.monotonic()
+
+    def record(src_path, out_path, ok, error):
+        nonlocal success, failed, last_report
+        if ok:
             success += 1
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(result.content or "")
             click.secho(f"[ok] {src_path} -> {out_path}", fg="green")
+        else:
+            failed += 1
+            click.secho(f"[fail] {src_path} :: {error}", fg="red", err=True)
+        try:
+            st = os.stat(src_path)
+        except FileNotFoundError:
+            st = None  # source removed mid-run; no manifest entry, so a resume revisits the path
+        if st is not None:
+            entry = {"src": rel_paths[src_path], "size": st.st_size, "mtime_ns": st.st_mtime_ns, "status": "ok" if ok else "failed"}
+            if ok:
+                mtime_ns, digest = digests.get(src_path, (None, None))
+                if mtime_ns == st.st_mtime_ns:
+                    entry["sha256"] = digest
+            else:
+                entry["error"] = (error or "")[:500]
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            manifest_file.flush()
+
+        now = time.monotonic()
+        done = success + failed
+        if now - last_report >= 2.0 or done == len(pending):
+            last_report = now
+            rate = done / max(now - started, 1e-6)
+            eta = (len(pending) - done) / rate if rate > 0 else 0
+            click.echo(f"[progress] {done}/{len(pending)} converted, {rate:.1f} files/s, ETA {_format_eta(eta)}")
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        if jobs == 1:
+            with _conversion_context():
+                _load_worker_service()
+                for src_path, ext, out_path, _ in pending:
+                    record(*_convert_job(src_path, ext, out_path))
+        elif pending:
+            # Bounded in-flight window so 100k-file trees don't create 100k futures up front
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+                queue = iter(pending)
+                in_flight = set()
+                while True:
+                    for src_path, ext, out_path, _ in queue:
+                        in_flight.add(pool.submit(_convert_job, src_path, ext, out_path))
+                        if len(in_flight) >= jobs * 4:
+                            break
+                    if not in_flight:
+                        break
+                    done_futures, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done_futures:
+                        record(*future.result())
+
+    elapsed = time.monotonic() - started
+    click.echo(f"Done. total={total} success={success} failed={failed} skipped={skipped} elapsed={elapsed:.1f}s")
+
+
+def _echo_event(evt: dict, root: str | None, verbose: bool) -> None:
+    if evt.get("stage") == "debug_state" and not verbose:
+        return
+    line = dict(evt, root=root, ts=datetime.now(timezone.utc).isoformat())
+    click.echo(json.dumps(line, ensure_ascii=False, default=str))
+
+
+@cli.command("ingest")
+@click.argument("roots", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False, readable=True))
+@click.option("--file-types", "-t", "file_types", help="Comma-separated extensions to ingest (default: all supported types).")
+@click.option("--recursive/--no-recursive", default=True, help="Recurse into subdirectories (default: true).")
+@click.option("--date-from", "date_from", help="Only files modified on/after YYYY-MM-DD (default: the root's last successful run).")
+@click.option("--date-to", "date_to", help="Only files modified on/before YYYY-MM-DD.")
+@click.option("--workers", "-w", type=click.IntRange(min=1), help="Conversion threads per root (default: INGEST_WORKERS).")
+@click.option("--batch-size", "-b", "batch_size", type=click.IntRange(min=1), help="Documents per database commit (default: INGEST_BATCH_SIZE).")
+@click.option("--verbose", "-v", is_flag=True, help="Also print heartbeat (debug_state) events.")
+def ingest(roots: tuple[str, ...], file_types: str | None, recursive: bool, date_from: str | None, date_to: str | None,
+           workers: int | None, batch_size: int | None, verbose: bool) -> None:
+    """Ingest ROOTS into the database without the web server.
+
+    Prints one JSON object per ingestion event (JSON lines) to stdout; logs go to stderr /
+    logs/. Exit code: 0 ok, 1 if some files failed to convert, 2 on a critical error or
+    interruption. SIGINT/SIGTERM cancel after the files in flight, without advancing the
+    root's incremental cursor.
+    """
+    from local_document_search import create_app
+    from local_document_search.services.ingestion_manager import run_local_ingestion, request_cancel_ingestion
+
+    app = create_app()
+    exit_code = 0
+    current = {"session_id": None, "interrupted": False}
+
+    def handle_signal(signum, frame):
+        current["interrupted"] = True
+        if current["session_id"]:
+            request_cancel_ingestion(current["session_id"])
+
+    previous = {sig: signal.signal(sig, handle_signal) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        with app.app_context():
+            for raw_root in roots:
+                if current["interrupted"]:
+                    break
+                # Same normalization as /api/convert-stream, so CLI and web runs share IngestState cursors
+                root = normalize_path(raw_root)
+                for evt in run_local_ingestion(root, date_from, date_to, recursive, file_types,
+                                               workers=workers, batch_size=batch_size):
+                    current["session_id"] = evt.get("session_id") or current["session_id"]
+                    if current["interrupted"]:
+                        request_cancel_ingestion(current["session_id"])
+                    stage = evt.get("stage")
+                    if stage == "file_error":
+                        exit_code = max(exit_code, 1)
+                    elif stage == "critical_error":
+                        exit_code = 2
+                    _echo_event(evt, root, verbose)
+                current["session_id"] = None
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    if current["interrupted"]:
+        exit_code = 2
+    raise SystemExit(exit_code)
+
+
+@cli.command("watch")
+@click.argument("roots", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False, readable=True))
+@click.option("--file-types", "-t", "file_types", help="Comma-separated extensions to ingest (default: all supported types).")
+@click.option("--recursive/--no-recursive", default=True, help="Watch subdirectories too (default: true).")
+@click.option("--debounce", type=float, help="Seconds a path must stay quiet before it is ingested (default: WATCH_DEBOUNCE_SECONDS).")
+@click.option("--polling", is_flag=True, help="Force the polling backend even if watchdog is installed.")
+@click.option("--poll-interval", "poll_interval", type=float, help="Seconds between polling snapshots (default: WATCH_POLL_INTERVAL).")
+@click.option("--initial-scan/--no-initial-scan", default=True, help="Run an incremental scan of each root before watching (default: true).")
+@click.option("--workers", "-w", type=click.IntRange(min=1), help="Conversion threads (default: INGEST_WORKERS).")
+@click.option("--batch-size", "-b", "batch_size", type=click.IntRange(min=1), help="Documents per database commit (default: INGEST_BATCH_SIZE).")
+@click.option("--verbose", "-v", is_flag=True, help="Also print heartbeat (debug_state) events.")
+def watch(roots: tuple[str, ...], file_types: str | None, recursive: bool, debounce: float | None, polling: bool,
+          poll_interval: float | None, initial_scan: bool, workers: int | None, batch_size: int | None, verbose: bool) -> None:
+    """Watch ROOTS and ingest created/modified/moved files, removing deleted ones from the index.
+
+    Uses watchdog (pip install watchdog) when available, otherwise polls. Prints JSON lines
+    like `ingest`; runs until SIGINT/SIGTERM.
+    """
+    from local_document_search import create_app
+    from local_document_search.services.fs_watcher import watch_roots
+
+    app = create_app()
+    stop_event = threading.Event()
+    previous = {sig: signal.signal(sig, lambda signum, frame: stop_event.set()) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        with app.app_context():
+            watch_roots(list(roots), recursive=recursive, file_types_str=file_types, debounce=debounce,
+                        poll_interval=poll_interval, use_polling=polling, initial_scan=initial_scan,
+                        workers=workers, batch_size=batch_size, stop_event=stop_event,
+                        on_event=lambda evt, root: _echo_event(evt, root, verbose))
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+@cli.command("reconcile")
+@click.argument("roots", nargs=-1, type=click.Path(file_okay=False))
+@click.option("--file-types", "-t", "file_types", help="Comma-separated extensions considered as move targets (default: all supported types).")
+@click.option("--recursive/--no-recursive", default=True, help="Look for moved files in subdirectories too (default: true).")
+@click.option("--dry-run", "dry_run", is_flag=True, help="Report moves and orphans without changing the database.")
+def reconcile(roots: tuple[str, ...], file_types: str | None, recursive: bool, dry_run: bool) -> None:
+    """Re-point Documents of moved files and delete orphans under ROOTS.
+
+    Without ROOTS every previously ingested local folder is reconciled. Prints one JSON
+    object per root with the orphan / moved / deleted counts.
+    """
+    from local_document_search import create_app
+    from local_document_search.extensions import db
+    from local_document_search.services.reconcile_service import ingested_roots, reconcile_root
 
-    click.echo(f"Done. total={total} success={success} failed={failed}")
+    app = create_app()
+    with app.app_context():
+        targets = [normalize_path(r) for r in roots] or ingested_roots()
+        for root in targets:
+            stats = reconcile_root(root, recursive=recursive, file_types_str=file_types, delete_orphans=not dry_run)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            click.echo(json.dumps(dict(stats, dry_run=dry_run), ensure_ascii=False))
 
 
 if __name__ == "__main__":
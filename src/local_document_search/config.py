@@ -25,6 +25,13 @@ class Config:
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool for server databases (PostgreSQL); SQLite keeps SQLAlchemy's own pooling.
+    # Every running ingestion holds one connection while its batch is open, searches take one per request.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes', 'on')
 
     # --- Logging Configuration ---
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper() # Default to INFO
@@ -108,12 +115,36 @@ class Config:
     # Joplin Configuration
     JOPLIN_API_TOKEN = os.environ.get('JOPLIN_API_TOKEN')
     JOPLIN_API_URL = os.environ.get('JOPLIN_API_URL', 'http://localhost:41184')
+    # Concurrent HTTP requests while importing (note pages / bodies are fetched ahead of conversion)
+    JOPLIN_FETCH_WORKERS = int(os.environ.get('JOPLIN_FETCH_WORKERS', 4))
+    # Cache HTML note bodies converted to Markdown under CACHE_DIR/joplin (keyed by note id + updated_time)
+    JOPLIN_NOTE_CACHE = os.environ.get('JOPLIN_NOTE_CACHE', 'true').lower() in ('1', 'true', 'yes', 'on')
 
     # --- Application Logic Constants ---
     # Data Sources
     SOURCE_LOCAL_FS = 'local_fs'
     SOURCE_JOPLIN = 'Joplin'
 
+    # Ingestion pipeline: conversion threads per session and Document rows per DB commit
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 20))
+    # Conversion threads shared by all background (web) sessions, interleaved by session priority; 0 = per-session pools
+    INGEST_GLOBAL_WORKERS = int(os.environ.get('INGEST_GLOBAL_WORKERS', 4))
+    # Progress streams: pending events kept per SSE client (oldest dropped beyond this) and idle heartbeat
+    SSE_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('SSE_SUBSCRIBER_QUEUE_SIZE', 1000))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15.0))
+    # Numbered events kept per session for Last-Event-ID resume and page-reload history
+    SSE_EVENT_LOG_SIZE = int(os.environ.get('SSE_EVENT_LOG_SIZE', 1000))
+    # ASGI mode (local_document_search.asgi): threads running the non-streaming Flask routes
+    ASGI_WSGI_WORKERS = int(os.environ.get('ASGI_WSGI_WORKERS', 10))
+    # Per-file events of background sessions are merged into one progress update per interval (0 = send every event)
+    SSE_PROGRESS_INTERVAL = float(os.environ.get('SSE_PROGRESS_INTERVAL', 0.1))
+    # Watch mode (cli watch): per-path quiet period before ingesting, and polling interval when watchdog is absent
+    WATCH_DEBOUNCE_SECONDS = float(os.environ.get('WATCH_DEBOUNCE_SECONDS', 2.0))
+    WATCH_POLL_INTERVAL = float(os.environ.get('WATCH_POLL_INTERVAL', 5.0))
+    # Background reconciliation of ingested local roots (moved files re-pointed, orphans deleted); 0 = off
+    RECONCILE_INTERVAL_MINUTES = float(os.environ.get('RECONCILE_INTERVAL_MINUTES', 0))
+
     # Search Defaults
     SEARCH_DEFAULT_PER_PAGE = 20
     SEARCH_DEFAULT_SORT_BY = 'relevance'
@@ -140,6 +171,20 @@ class Config:
     IMAGE_CAPTION_PROVIDER = os.environ.get('IMAGE_CAPTION_PROVIDER', 'google-genai').lower()
     # Local OCR language (for pytesseract); can be overridden by env TESSERACT_LANG
     TESSERACT_LANG = os.environ.get('TESSERACT_LANG', 'chi_sim+eng')
+    # Local OCR engine mode: 'parallel' (tile very large images, OCR tiles in a process pool) or 'simple' (one pytesseract call)
+    OCR_ENGINE_MODE = os.environ.get('OCR_ENGINE_MODE', 'parallel').lower()
+    # CPU budget for the OCR process pool; 0 -> half of the available CPUs
+    OCR_MAX_WORKERS = int(os.environ.get('OCR_MAX_WORKERS', 0))
+    # Images with at least this many pixels are split into horizontal bands of ~OCR_TILE_HEIGHT rows
+    OCR_TILE_MIN_PIXELS = int(os.environ.get('OCR_TILE_MIN_PIXELS', 12_000_000))
+    OCR_TILE_HEIGHT = int(os.environ.get('OCR_TILE_HEIGHT', 2000))
+    # Scanned PDFs: pages with fewer text-layer characters than this are rasterized and OCR'd locally
+    PDF_OCR_FALLBACK = os.environ.get('PDF_OCR_FALLBACK', 'true').lower() in ('1', 'true', 'yes', 'on')
+    PDF_OCR_MIN_TEXT_CHARS = int(os.environ.get('PDF_OCR_MIN_TEXT_CHARS', 16))
+    # At least this fraction of textless pages makes a PDF "scanned" (built from page texts + OCR);
+    # below it MarkItDown converts the PDF and only the textless pages are OCR'd into its output
+    PDF_OCR_SCANNED_RATIO = float(os.environ.get('PDF_OCR_SCANNED_RATIO', 0.5))
+    PDF_OCR_DPI = int(os.environ.get('PDF_OCR_DPI', 200))
     # OpenAI model override
     OPENAI_IMAGE_MODEL = os.environ.get('OPENAI_IMAGE_MODEL', 'gpt-5-mini')
     # Gemini model override
@@ -156,5 +201,35 @@ class Config:
     WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base')
     # Device to use for transcription ('cpu', 'cuda')
     WHISPER_DEVICE = os.environ.get('WHISPER_DEVICE', 'cpu')
+    # CTranslate2 compute type for faster-whisper ('int8', 'float16', 'int8_float16', ...)
+    WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'int8')
+    # Loaded models are reused across files and released after this many idle seconds (0 = keep forever)
+    WHISPER_MODEL_IDLE_SECONDS = float(os.environ.get('WHISPER_MODEL_IDLE_SECONDS', 600))
+    # Audio is piped from ffmpeg and transcribed in windows of this many seconds (bounds memory)
+    WHISPER_STREAM_CHUNK_SECONDS = float(os.environ.get('WHISPER_STREAM_CHUNK_SECONDS', 300))
+    # Recordings at least this long (CPU only) are split at silences into ~WHISPER_CHUNK_SECONDS chunks,
+    # transcribed by WHISPER_CHUNK_WORKERS processes and checkpointed under CACHE_DIR/transcripts for resume
+    WHISPER_CHUNK_MIN_SECONDS = float(os.environ.get('WHISPER_CHUNK_MIN_SECONDS', 1200))
+    WHISPER_CHUNK_SECONDS = float(os.environ.get('WHISPER_CHUNK_SECONDS', 600))
+    WHISPER_CHUNK_WORKERS = int(os.environ.get('WHISPER_CHUNK_WORKERS', 2))
     # Path to ffmpeg and ffprobe binaries
     FFMPEG_BIN = os.environ.get('FFMPEG_BIN', 'ffmpeg')
+
+    # --- Spreadsheet Conversion (.xlsx/.xls) ---
+    # Per-sheet caps for the streaming spreadsheet converter; rows/columns beyond these are dropped
+    SPREADSHEET_MAX_ROWS = int(os.environ.get('SPREADSHEET_MAX_ROWS', 2000))
+    SPREADSHEET_MAX_COLS = int(os.environ.get('SPREADSHEET_MAX_COLS', 50))
+
+    # --- LibreOffice Conversion Pool (.doc/.ppt on non-Windows) ---
+    # Number of headless soffice slots (each with its own user profile) and per-job timeout in seconds
+    LIBREOFFICE_POOL_SIZE = int(os.environ.get('LIBREOFFICE_POOL_SIZE', 2))
+    LIBREOFFICE_JOB_TIMEOUT = float(os.environ.get('LIBREOFFICE_JOB_TIMEOUT', 120))
+    # UNO listening ports: 0 picks a free port per slot start; otherwise slot N uses LIBREOFFICE_BASE_PORT + N
+    LIBREOFFICE_BASE_PORT = int(os.environ.get('LIBREOFFICE_BASE_PORT', 0))
+    # Converted .docx/.pptx intermediates live in CACHE_DIR/office keyed by source SHA-256;
+    # least recently used entries are evicted once the cache exceeds this size (0 = unbounded)
+    OFFICE_CACHE_MAX_MB = int(os.environ.get('OFFICE_CACHE_MAX_MB', 2048))
+
+    # --- Local Cache Directory ---
+    # Holds resumable transcription checkpoints and other derived intermediates
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'cache')))
@@ -1,5 +1,23 @@
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
 db = SQLAlchemy()
 migrate = Migrate()
+
+
+@contextmanager
+def worker_context(app):
+    """App context for a background thread that releases its DB session on exit.
+
+    Rolls back on error so the connection goes back to the pool clean; the session is
+    removed explicitly rather than relying on app-context teardown ordering.
+    """
+    with app.app_context():
+        try:
+            yield
+        except BaseException:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
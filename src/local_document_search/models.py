@@ -30,11 +30,13 @@ class Document(db.Model):
     error_message = Column(Text)
     source = Column(String(30), index=True)
     source_url = Column(Text)
+    content_sha256 = Column(String(64))  # SHA-256 of the source file, used to detect moves/renames
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         Index('idx_documents_file_path', 'file_path', unique=True),
+        Index('idx_documents_size_sha256', 'file_size', 'content_sha256'),
         # Note: PGroonga indexes are created manually via SQL in the migration
         # and are not explicitly defined in the model's __table_args__.
     )
@@ -49,6 +51,7 @@ class IngestState(db.Model):
     last_ended_at = Column(TIMESTAMP(timezone=True))
     last_error_message = Column(Text)
     cursor_updated_at = Column(TIMESTAMP(timezone=True))
+    cursor_token = Column(Text)  # opaque change-feed cursor (e.g. Joplin /events)
     total_files = Column(Integer)
     processed = Column(Integer)
     skipped = Column(Integer)
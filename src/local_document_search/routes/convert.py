@@ -29,10 +29,16 @@ from local_document_search.services.ingestion_manager import (
     request_cancel_ingestion,
     get_active_session_ids,
     get_session_debug,
+    get_session_events,
     start_async_ingestion,
+    start_async_source,
+    set_session_priority,
     stream_async_session,
+    get_source_type,
 )
 from local_document_search.services.provider_factory import build_conversion_service
+from local_document_search.services.pool_metrics import pool_snapshot
+from local_document_search.services.ingest_scheduler import clamp_priority, get_scheduler
 from local_document_search.models import Document
 from local_document_search.extensions import db
 
@@ -58,6 +64,79 @@ def browse_folder():
         current_app.logger.error(f"Error opening folder dialog: {e}")
         return jsonify({'status': 'error', 'message': 'Could not open folder dialog.'}), 500
 
+# Set by the ASGI front end (local_document_search.asgi): session streams are handed over to
+# it through these response headers instead of being served by this (worker) thread.
+ASYNC_SSE_ENVIRON_KEY = 'local_document_search.async_sse'
+SSE_SESSION_HEADER = 'X-Ingest-Session'
+SSE_AFTER_HEADER = 'X-Ingest-After-Event'
+
+
+def sse_message(evt, session_id):
+    """One SSE message; logged events carry ``id: <session_id>-<event_id>`` for Last-Event-ID resume."""
+    event_id = f"id: {session_id}-{evt['event_id']}\n" if 'event_id' in evt else ''
+    return f"{event_id}data: {json.dumps(evt, default=str)}\n\n"
+
+
+def session_started_event(session_id):
+    # Immediate session_info-like notice so client knows session id quickly
+    return {'level': 'info', 'message': f'Session started: {session_id}', 'stage': 'session_info', 'session_id': session_id}
+
+
+def _session_stream(session_id, after_event_id=0):
+    """SSE response following an async session (new or already running).
+
+    Logged events carry ``id: <session_id>-<event_id>`` so a dropped EventSource reconnects
+    with Last-Event-ID and only receives what it missed.
+    """
+    if request.environ.get(ASYNC_SSE_ENVIRON_KEY):
+        return Response(status=200, headers={SSE_SESSION_HEADER: session_id, SSE_AFTER_HEADER: str(after_event_id)})
+    app = current_app._get_current_object()
+    def async_gen():
+        with app.app_context():
+            if not after_event_id:
+                yield sse_message(session_started_event(session_id), session_id)
+            for evt in stream_async_session(session_id, after_event_id):
+                yield sse_message(evt, session_id)
+    return Response(async_gen(), mimetype='text/event-stream')
+
+
+def _resume_point():
+    """``(session_id, after_event_id)`` when the request continues an existing session, else None.
+
+    EventSource sends the last ``id:`` it received as the Last-Event-ID header when it
+    reconnects on its own; a reloaded page passes ``session_id`` (and ``last_event_id``).
+    """
+    session_id = request.args.get('session_id')
+    last = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or ''
+    if '-' in last:
+        session_id, _, last = last.rpartition('-')
+    if not session_id:
+        return None
+    try:
+        after_event_id = max(int(last or 0), 0)
+    except ValueError:
+        after_event_id = 0
+    return session_id, after_event_id
+
+
+def _resume_stream(resume):
+    session_id, after_event_id = resume
+    if session_id not in get_active_session_ids():
+        return _error_stream('Session not found or already ended.')
+    debug = get_session_debug(session_id)
+    if debug and debug['done'] and after_event_id and not get_session_events(session_id, after_event_id):
+        # Finished and fully delivered: 204 tells EventSource to stop reconnecting
+        return Response(status=204)
+    return _session_stream(session_id, after_event_id)
+
+
+def _error_stream(message):
+    def error_stream():
+        error_data = {'level': 'critical', 'message': message, 'stage': 'critical_error'}
+        yield f"data: {json.dumps(error_data)}\n\n"
+    return Response(error_stream(), mimetype='text/event-stream')
+
+
 @bp.route('/convert-stream')
 def convert_stream_route():
     folder_path = request.args.get('folder_path')
@@ -67,6 +146,11 @@ def convert_stream_route():
     file_types = request.args.get('file_types')
     async_mode = request.args.get('async', 'true').lower() == 'true'
 
+    # Continue a running async session (reconnect / page reload) instead of starting a new scan
+    resume = _resume_point()
+    if resume:
+        return _resume_stream(resume)
+
     # --- Path Normalization ---
     if folder_path:
         # 1. Normalize to OS-native format (e.g., C:\Users...\ on Windows)
@@ -83,24 +167,15 @@ def convert_stream_route():
     )
 
     if not folder_path or not os.path.isdir(folder_path):
-        def error_stream():
-            error_data = {'level': 'critical', 'message': 'Invalid or missing folder path.', 'stage': 'critical_error'}
-            yield f"data: {json.dumps(error_data)}\n\n"
-        return Response(error_stream(), mimetype='text/event-stream')
+        return _error_stream('Invalid or missing folder path.')
     
     app = current_app._get_current_object()
 
     if async_mode:
         # Start async session and then stream queue
-        session_id = start_async_ingestion(folder_path, date_from, date_to, recursive, file_types)
-        def async_gen():
-            with app.app_context():
-                # Emit immediate session_info-like notice so client knows session id quickly
-                # Initial session info event
-                yield f"data: {json.dumps({'level':'info','message':f'Session started: {session_id}','stage':'session_info','session_id':session_id})}\n\n"
-                for evt in stream_async_session(session_id):
-                    yield f"data: {json.dumps(evt)}\n\n"
-        return Response(async_gen(), mimetype='text/event-stream')
+        session_id = start_async_ingestion(folder_path, date_from, date_to, recursive, file_types,
+                                           priority=request.args.get('priority'))
+        return _session_stream(session_id)
     else:
         def generate_stream(app):
             with app.app_context():
@@ -108,6 +183,27 @@ def convert_stream_route():
                     yield f"data: {json.dumps(progress_update)}\n\n"
         return Response(generate_stream(app), mimetype='text/event-stream')
 
+
+@bp.route('/sources/<source_name>/stream')
+def source_stream_route(source_name):
+    """Start an ingestion session for a registered source (e.g. joplin) and stream its events.
+
+    Same event format as /api/convert-stream; cancel with /api/convert/stop.
+    """
+    resume = _resume_point()
+    if resume:
+        return _resume_stream(resume)
+    source_type = get_source_type(source_name)
+    if source_type is None:
+        return _error_stream(f'Unknown ingestion source: {source_name}')
+    try:
+        source = source_type.from_args(request.args)
+    except Exception as e:
+        current_app.logger.error(f"Invalid parameters for source {source_name}: {e}")
+        return _error_stream(f'Invalid parameters for source {source_name}.')
+    current_app.logger.info(f"Starting source stream: source='{source_name}' params={source.params()}")
+    return _session_stream(start_async_source(source, priority=request.args.get('priority')))
+
 @bp.route('/convert/stop', methods=['POST'])
 def stop_conversion():
     """Request cancellation of an ingestion session.
@@ -162,6 +258,20 @@ def stop_all_conversions():
         current_app.logger.error(f"Error in stop-all: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': 'Failed to request stop-all.'}), 500
 
+@bp.route('/convert/priority', methods=['POST'])
+def change_priority():
+    """Change a running session's share of the global conversion budget.
+
+    Request JSON: {"session_id": "...", "priority": 1-10}
+    """
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+    if not session_id or data.get('priority') is None:
+        return jsonify({'status': 'error', 'message': 'session_id and priority are required.'}), 400
+    if not set_session_priority(session_id, data['priority']):
+        return jsonify({'status': 'error', 'message': 'Session not found.'}), 404
+    return jsonify({'status': 'success', 'session_id': session_id, 'priority': get_session_debug(session_id)['priority']})
+
 @bp.route('/convert/sessions', methods=['GET'])
 def list_sessions():
     """Return list of active ingestion session IDs for debugging/diagnostics."""
@@ -177,11 +287,22 @@ def list_sessions_detail():
         details = []
         for sid in get_active_session_ids():
             details.append(get_session_debug(sid))
-        return jsonify({'status': 'success', 'sessions': details})
+        scheduler = get_scheduler()
+        return jsonify({'status': 'success', 'sessions': details,
+                        'scheduler': scheduler.stats() if scheduler is not None else None})
     except Exception as e:
         current_app.logger.error(f"Error listing session details: {e}")
         return jsonify({'status': 'error', 'message': 'Failed to list session details.'}), 500
 
+@bp.route('/convert/db-pool', methods=['GET'])
+def db_pool_status():
+    """Connection pool usage (size / checked out / overflow, peak and checkout counters)."""
+    try:
+        return jsonify({'status': 'success', 'pool': pool_snapshot(current_app._get_current_object())})
+    except Exception as e:
+        current_app.logger.error(f"Error reading pool status: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to read pool status.'}), 500
+
 @bp.route('/convert/sessions/history', methods=['GET'])
 def list_sessions_with_history():
     """Return active async sessions with last events for UI reconnection.
@@ -190,19 +311,20 @@ def list_sessions_with_history():
     {
       status: 'success',
       sessions: [
-        { session_id, folder_path, params, done, stop, history: [ {level, message, stage, ...}, ... ] }
+        { session_id, source, folder_path, params, done, stop, history: [ {event_id, level, message, stage, ...}, ... ] }
       ]
     }
     """
     try:
         sessions_out = []
         sessions = current_app.config.get('INGEST_SESSIONS', {})
-        for sid, data in sessions.items():
+        for sid, data in list(sessions.items()):
             if data.get('mode') != 'async':
                 continue
-            hist = list(data.get('history', []))
+            hist = get_session_events(sid) or []
             sessions_out.append({
                 'session_id': sid,
+                'source': data.get('source'),
                 'folder_path': data.get('folder_path'),
                 'params': data.get('params', {}),
                 'done': data.get('done'),
@@ -220,7 +342,8 @@ def start_batch_ingestion():
 
     Request JSON:
     {
-        "directories": ["E:/docs/a", "E:/docs/b"],
+        "directories": ["E:/docs/a", {"path": "E:/docs/b", "priority": 5}],
+        "priority": 1,     # optional default share of the global conversion budget (1-10)
         "recursive": true,
         "date_from": "",   # optional
         "date_to": "",     # optional
@@ -236,7 +359,8 @@ def start_batch_ingestion():
         ]
     }
 
-    Frontend then creates separate EventSource objects for each stream_url.
+    Frontend then creates separate EventSource objects for each stream_url. The sessions
+    share the INGEST_GLOBAL_WORKERS conversion threads, interleaved by priority.
     """
     try:
         payload = request.get_json(silent=True) or {}
@@ -247,9 +371,14 @@ def start_batch_ingestion():
         date_from = payload.get('date_from') or ''
         date_to = payload.get('date_to') or ''
         file_types = payload.get('file_types')  # allow None -> UI fallback
+        default_priority = payload.get('priority')
 
         batch_entries = []
-        for raw_dir in directories:
+        for entry in directories:
+            if isinstance(entry, dict):
+                raw_dir, priority = entry.get('path'), entry.get('priority', default_priority)
+            else:
+                raw_dir, priority = entry, default_priority
             if not raw_dir or not os.path.isdir(raw_dir):
                 batch_entries.append({
                     'directory': raw_dir,
@@ -268,6 +397,8 @@ def start_batch_ingestion():
             }
             if file_types:
                 params['file_types'] = file_types
+            if priority is not None:
+                params['priority'] = str(clamp_priority(priority))
             query = urlencode(params, quote_via=quote)
             batch_entries.append({
                 'directory': dir_norm,
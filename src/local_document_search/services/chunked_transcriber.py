@@ -0,0 +1,226 @@
+"""Chunked, parallel transcription of long recordings with resumable on-disk checkpoints.
+
+Public functions:
+    detect_silences(path, ffmpeg_bin, ...) -> list[(start, end)]
+    plan_chunks(duration, silences, target_seconds) -> list[(start, end)]
+    transcribe_chunked(path, duration, options) -> list[(start, end, text)]
+
+Chunk boundaries are placed in the middle of silent stretches found by ffmpeg's
+``silencedetect`` filter (an energy-based VAD that streams, so memory stays flat), so
+words are not split between chunks. Each chunk is decoded and transcribed in a
+separate process of one shared pool (WHISPER_CHUNK_WORKERS processes, each loading its
+model once); a file keeps at most that many chunks in flight, so concurrent ingestions
+share the pool instead of resizing it. Finished chunks are written to ``<checkpoint_root>/<job key>/`` so an
+interrupted ingestion only redoes the chunks that were in flight.
+"""
+import os
+import re
+import math
+import json
+import time
+import atexit
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+_SILENCE_START = re.compile(r'silence_start:\s*(-?[\d.]+)')
+_SILENCE_END = re.compile(r'silence_end:\s*([\d.]+)')
+STALE_CHECKPOINT_SECONDS = 7 * 24 * 3600
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def detect_silences(path: str, ffmpeg_bin: str = 'ffmpeg', noise_db: int = -35, min_silence: float = 0.6):
+    """Return (start, end) silent intervals reported by ffmpeg silencedetect, parsed line by line."""
+    cmd = [
+        ffmpeg_bin, '-nostdin', '-hide_banner', '-i', path, '-vn',
+        '-af', f"silencedetect=noise={noise_db}dB:d={min_silence}", '-f', 'null', '-'
+    ]
+    silences = []
+    current_start = None
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='ignore')
+    try:
+        for line in proc.stderr:
+            m = _SILENCE_START.search(line)
+            if m:
+                current_start = max(0.0, float(m.group(1)))
+                continue
+            m = _SILENCE_END.search(line)
+            if m and current_start is not None:
+                silences.append((current_start, float(m.group(1))))
+                current_start = None
+        proc.wait()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    return silences
+
+
+def plan_chunks(duration: float, silences, target_seconds: float = 600.0):
+    """Split [0, duration] into chunks of ~target_seconds, cutting at the nearest silence midpoint.
+
+    A boundary only moves to a silence within +/- 25% of the target; otherwise it is a hard cut.
+    """
+    if duration <= target_seconds * 1.25:
+        return [(0.0, duration)]
+    midpoints = [(s + e) / 2 for s, e in silences]
+    slack = target_seconds * 0.25
+    chunks = []
+    start = 0.0
+    while duration - start > target_seconds + slack:
+        target = start + target_seconds
+        candidates = [m for m in midpoints if abs(m - target) <= slack and m > start]
+        cut = min(candidates, key=lambda m: abs(m - target)) if candidates else target
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, duration))
+    return chunks
+
+
+def _job_key(path: str, options: dict) -> str:
+    st = os.stat(path)
+    raw = '|'.join(str(x) for x in (
+        os.path.abspath(path), st.st_size, st.st_mtime_ns,
+        options['model_name'], options['compute_type'], options['chunk_seconds'],
+    ))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def _write_json_atomic(path: str, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _prune_stale(root: str, keep: str):
+    now = time.time()
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name == keep or not entry.is_dir():
+            continue
+        try:
+            if now - entry.stat().st_mtime > STALE_CHECKPOINT_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """The shared pool, created on first use; never resized, since that would cancel other files' chunks."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            # spawn: children must not inherit the parent's whisper worker thread or held locks
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = max_workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def _transcribe_chunk(path, start, end, options):
+    """Pool worker: decode one window via ffmpeg pipe and transcribe it with a process-local model."""
+    from local_document_search.services import whisper_pool
+    from local_document_search.services.video_converter import stream_pcm
+
+    model = whisper_pool.get_model(
+        options['model_name'], options['device'], options['compute_type'],
+        options['idle_ttl'], options['cpu_threads'],
+    )
+    segments = []
+    # The whole planned chunk is one decode window (it may exceed chunk_seconds by up to 25% to
+    # end in a silence); a smaller window would cut it again in the middle of speech
+    window = math.ceil(end - start)
+    for offset, samples in stream_pcm(path, options['ffmpeg_bin'], window, start=start, duration=end - start):
+        parts, _ = model.transcribe(samples, beam_size=5)
+        for seg in parts:
+            segments.append([start + offset + seg.start, start + offset + seg.end, seg.text])
+    return segments
+
+
+def transcribe_chunked(path: str, duration: float, options: dict):
+    """Transcribe ``path`` chunk by chunk across a process pool, resuming from checkpoints.
+
+    ``options`` keys: model_name, device, compute_type, idle_ttl, ffmpeg_bin, chunk_seconds,
+    workers, checkpoint_root. Returns all segments sorted by start time.
+    """
+    root = options['checkpoint_root']
+    key = _job_key(path, options)
+    job_dir = os.path.join(root, key)
+    os.makedirs(job_dir, exist_ok=True)
+    _prune_stale(root, keep=key)
+
+    plan_file = os.path.join(job_dir, 'plan.json')
+    if os.path.exists(plan_file):
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            chunks = [tuple(c) for c in json.load(f)['chunks']]
+    else:
+        silences = detect_silences(path, options['ffmpeg_bin'])
+        chunks = plan_chunks(duration, silences, options['chunk_seconds'])
+        _write_json_atomic(plan_file, {'source': os.path.abspath(path), 'chunks': chunks})
+
+    results = {}
+    pending = []
+    for index, (start, end) in enumerate(chunks):
+        chunk_file = os.path.join(job_dir, f"chunk_{index:05d}.json")
+        if os.path.exists(chunk_file):
+            with open(chunk_file, 'r', encoding='utf-8') as f:
+                results[index] = json.load(f)
+        else:
+            pending.append((index, start, end, chunk_file))
+    if results:
+        logger.info("Resuming transcription of %s: %d/%d chunks already checkpointed", path, len(results), len(chunks))
+
+    if pending:
+        workers = max(1, options['workers'])
+        worker_options = dict(options, cpu_threads=max(1, (os.cpu_count() or 1) // workers))
+        pool = _get_pool(workers)
+        queue = list(reversed(pending))
+        futures = {}
+        errors = []
+        while queue or futures:
+            # At most ``workers`` chunks of this file queued at once, so concurrent files interleave in the pool
+            while queue and len(futures) < workers:
+                index, start, end, chunk_file = queue.pop()
+                futures[pool.submit(_transcribe_chunk, path, start, end, worker_options)] = (index, chunk_file)
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, chunk_file = futures.pop(future)
+                try:
+                    segments = future.result()
+                except Exception as e:
+                    # Keep collecting: chunks that do finish are checkpointed before we give up
+                    logger.error("Chunk %d/%d of %s failed: %s", index + 1, len(chunks), path, e)
+                    errors.append(e)
+                    continue
+                _write_json_atomic(chunk_file, segments)
+                results[index] = segments
+                logger.info("Transcribed chunk %d/%d of %s", index + 1, len(chunks), path)
+        if errors:
+            raise errors[0]
+
+    all_segments = [tuple(seg) for index in sorted(results) for seg in results[index]]
+    shutil.rmtree(job_dir, ignore_errors=True)
+    return all_segments
@@ -1,59 +1,106 @@
-﻿import os
+import os
+import unicodedata
+from collections import OrderedDict
+import sqlalchemy as sa
 from local_document_search.models import Document
 from local_document_search.extensions import db
 from local_document_search.utils.file_utils import normalize_path
 
-def find_orphan_files(folder_path, file_type_filter=None, path_keyword_filter=None):
+SCAN_BATCH_SIZE = 1000
+LISTING_CACHE_SIZE = 1024
+
+# 会话级临时表：仅当前数据库连接可见，用于承载本次扫描得到的孤儿 ID
+orphan_scan_ids = sa.Table('orphan_scan_ids', sa.MetaData(), sa.Column('id', sa.Integer, primary_key=True), prefixes=['TEMPORARY'])
+
+
+class _Always:
+    def __contains__(self, item):
+        return True
+
+
+_ALWAYS = _Always()
+
+
+class _DirectoryListingCache:
+    """按目录缓存文件名集合（LRU）。路径按顺序流式处理时同一目录的记录相邻，命中率很高。"""
+
+    def __init__(self, max_dirs=LISTING_CACHE_SIZE):
+        self.max_dirs = max_dirs
+        self._listings = OrderedDict()
+
+    def _listing(self, directory):
+        names = self._listings.get(directory)
+        if names is not None:
+            self._listings.move_to_end(directory)
+            return names
+        try:
+            with os.scandir(directory) as it:
+                names = {unicodedata.normalize('NFC', entry.name) for entry in it}
+        except (FileNotFoundError, NotADirectoryError):
+            names = frozenset()
+        except OSError:
+            # 无权限、路径过长等：无法确认是否存在，按“存在”处理，避免误删
+            names = None
+        self._listings[directory] = names if names is not None else _ALWAYS
+        if len(self._listings) > self.max_dirs:
+            self._listings.popitem(last=False)
+        return self._listings[directory]
+
+    def exists(self, file_path):
+        directory, name = file_path.rsplit('/', 1)
+        return name in self._listing(directory or '/')
+
+
+def _prepare_orphan_table(connection):
+    connection.execute(sa.text(f"CREATE TEMPORARY TABLE IF NOT EXISTS {orphan_scan_ids.name} (id INTEGER PRIMARY KEY)"))
+    connection.execute(orphan_scan_ids.delete())
+
+
+def find_orphan_files(folder_path, file_type_filter=None, path_keyword_filter=None, batch_size=SCAN_BATCH_SIZE):
     """
     查找指定文件夹路径下，存在于数据库但文件系统中已不存在的“孤儿”文件记录。
 
+    按 file_path 排序分批（keyset 分页）流式读取数据库中的 (id, file_path)，用按目录缓存的
+    文件列表判断文件是否存在，孤儿 ID 写入会话级临时表，内存占用与记录总数无关，
+    也不会生成超长的 IN (...) 参数列表。
+
     :param folder_path: 用户指定的要检查的文件夹绝对路径。
     :param file_type_filter: (可选) 用于筛选的文件类型。
     :param path_keyword_filter: (可选) 用于筛选文件路径的关键词。
-    :return: 孤儿文件记录的查询对象。
+    :return: 孤儿文件记录的查询对象（需在同一请求/会话内分页使用）。
     """
-    # 1. 标准化输入的文件夹路径
+    # 1. 标准化输入的文件夹路径；目录不存在时（如网络盘未挂载）不判定任何孤儿
     normalized_folder_path = normalize_path(folder_path)
-
-    # 2. 从数据库中查询所有以该路径开头的记录
-    # 使用 startswith 操作符进行前缀匹配，这比 like 更安全、更高效
-    query = Document.query.filter(Document.file_path.startswith(normalized_folder_path))
-    
-    db_file_paths = {doc.file_path: doc for doc in query.all()}
-
-    # 3. 遍历文件系统，获取真实存在的文件路径
-    existing_file_paths = set()
-    try:
-        if not os.path.isdir(folder_path):
-            # 如果路径不是一个有效的目录，直接返回空查询
-            return Document.query.filter(db.false())
-
-        for root, _, files in os.walk(folder_path):
-            for name in files:
-                file_path = os.path.join(root, name)
-                normalized_file_path = normalize_path(file_path)
-                existing_file_paths.add(normalized_file_path)
-    except OSError:
-        # 处理路径名过长或其他OS级别错误
+    if not os.path.isdir(folder_path):
         return Document.query.filter(db.false())
 
-    # 4. 对比找出孤儿文件
-    orphan_doc_ids = []
-    for path, doc in db_file_paths.items():
-        if path not in existing_file_paths:
-            orphan_doc_ids.append(doc.id)
-    
-    if not orphan_doc_ids:
-        return Document.query.filter(db.false()) # 如果没有孤儿，返回一个空查询
-
-    # 5. 基于孤儿ID列表构建最终查询，并应用筛选条件
-    final_query = Document.query.filter(Document.id.in_(orphan_doc_ids))
+    # 2. 在当前会话的连接上准备临时表，后续分页查询复用同一连接
+    connection = db.session.connection()
+    _prepare_orphan_table(connection)
 
+    prefix = normalized_folder_path.rstrip('/') + '/'
+    base = sa.select(Document.id, Document.file_path).where(Document.file_path.startswith(prefix, autoescape=True))
     if file_type_filter:
-        final_query = final_query.filter(Document.file_type == file_type_filter)
-    
+        base = base.where(Document.file_type == file_type_filter)
     if path_keyword_filter:
-        final_query = final_query.filter(Document.file_path.ilike(f"%{path_keyword_filter}%"))
+        base = base.where(Document.file_path.ilike(f"%{path_keyword_filter}%"))
 
-    return final_query
+    # 3. 按路径顺序分批流式比对
+    listings = _DirectoryListingCache()
+    last_path = None
+    while True:
+        stmt = base
+        if last_path is not None:
+            stmt = stmt.where(Document.file_path > last_path)
+        rows = connection.execute(stmt.order_by(Document.file_path).limit(batch_size)).all()
+        if not rows:
+            break
+        orphan_ids = [{'id': doc_id} for doc_id, path in rows if not listings.exists(path)]
+        if orphan_ids:
+            connection.execute(orphan_scan_ids.insert(), orphan_ids)
+        last_path = rows[-1].file_path
+        if len(rows) < batch_size:
+            break
 
+    # 4. 以临时表关联返回查询，调用方可排序/分页
+    return Document.query.join(orphan_scan_ids, orphan_scan_ids.c.id == Document.id)
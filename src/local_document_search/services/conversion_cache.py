@@ -0,0 +1,120 @@
+"""Content-addressed cache for intermediate files produced while converting legacy formats.
+
+Public functions:
+    cached_conversion(source_path, target_ext, convert, cache_root, max_bytes) -> str | None
+    collect_garbage(cache_root, max_bytes, keep=None) -> int
+
+Intermediates (e.g. ``.doc`` -> ``.docx``) are stored as ``<cache_root>/office/<ab>/<sha256>.<ext>``
+keyed by the SHA-256 of the source, never next to the source file, so read-only shares
+work and the scanner does not pick the intermediate up as a second document. Hits are
+touched so the size-bounded garbage collection evicts the least recently used entries.
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from local_document_search.utils.hash_utils import file_sha256
+
+logger = logging.getLogger(__name__)
+
+STAGING_PREFIX = 'tmp-'
+STALE_STAGING_SECONDS = 3600
+GC_INTERVAL_SECONDS = 60.0
+
+_gc_lock = threading.Lock()
+_last_gc = {}
+
+
+def _office_root(cache_root: str) -> Path:
+    return Path(cache_root).resolve() / 'office'
+
+
+def cache_path(source_path: str, target_ext: str, cache_root: str) -> Path:
+    digest = file_sha256(source_path)
+    return _office_root(cache_root) / digest[:2] / f"{digest}.{target_ext}"
+
+
+def collect_garbage(cache_root: str, max_bytes: int, keep: str | None = None) -> int:
+    """Evict least recently used intermediates until the cache fits in ``max_bytes``; returns bytes freed."""
+    root = _office_root(cache_root)
+    if not root.is_dir():
+        return 0
+    now = time.time()
+    entries = []
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in list(dirnames):
+            if name.startswith(STAGING_PREFIX):
+                dirnames.remove(name)
+                staging = os.path.join(dirpath, name)
+                # Leftovers of a crashed conversion; live ones are younger than this
+                try:
+                    if now - os.stat(staging).st_mtime > STALE_STAGING_SECONDS:
+                        shutil.rmtree(staging, ignore_errors=True)
+                except OSError:
+                    pass
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    freed = 0
+    if max_bytes <= 0 or total <= max_bytes:
+        return 0
+    for _, size, path in sorted(entries):
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        freed += size
+        total -= size
+        if total <= max_bytes:
+            break
+    logger.info("Conversion cache GC freed %d bytes under %s", freed, root)
+    return freed
+
+
+def _maybe_collect(cache_root: str, max_bytes: int, keep: str):
+    now = time.monotonic()
+    with _gc_lock:
+        if now - _last_gc.get(cache_root, float('-inf')) < GC_INTERVAL_SECONDS:
+            return
+        _last_gc[cache_root] = now
+    collect_garbage(cache_root, max_bytes, keep=keep)
+
+
+def cached_conversion(source_path: str, target_ext: str, convert, cache_root: str, max_bytes: int = 0) -> str | None:
+    """Return the cached intermediate for ``source_path``, producing it with ``convert`` on a miss.
+
+    ``convert(src: Path, staging_dir: Path) -> str | None`` writes its output inside
+    ``staging_dir`` and returns that path; it is then moved atomically into the cache.
+    """
+    src = Path(source_path).resolve()
+    dst = cache_path(str(src), target_ext, cache_root)
+    if dst.exists():
+        try:
+            os.utime(dst)
+        except OSError:
+            pass
+        logger.debug("Conversion cache hit for %s -> %s", src, dst)
+        return str(dst)
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=dst.parent))
+    try:
+        produced = convert(src, staging)
+        if not produced or not os.path.exists(produced):
+            return None
+        os.replace(produced, dst)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    _maybe_collect(cache_root, max_bytes, keep=str(dst))
+    return str(dst)
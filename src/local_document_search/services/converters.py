@@ -6,21 +6,25 @@ import traceback
 import logging
 from typing import List
 from xml.etree import ElementTree as ET
-from markitdown import MarkItDown
 from local_document_search.config import Config
 from local_document_search.models import ConversionType
 from local_document_search.services.conversion_result import ConversionResult
-from local_document_search.services.doc_converter import convert_doc_to_docx
-from local_document_search.services.drawio_converter import convert_drawio_to_markdown
-from local_document_search.services.image_converter import convert_image_to_markdown
-from local_document_search.services.ppt_converter import convert_ppt_to_pptx
-from local_document_search.services.video_converter import convert_video_metadata
-from local_document_search.services.registry import register, get_handler
+from local_document_search.services.registry import register, get_handler, register_text, get_text_handler
 
 logger = logging.getLogger(__name__)
 
-# Initialize markitdown instance (shared)
-_md = MarkItDown()
+# Shared markitdown instance, created on first use. Format-specific converter modules are
+# likewise imported inside their handlers, so only the extensions actually ingested pay
+# for their dependencies (markitdown, pypdfium2, faster-whisper, LLM SDKs, ...).
+_md = None
+
+
+def _get_md():
+    global _md
+    if _md is None:
+        from markitdown import MarkItDown
+        _md = MarkItDown()
+    return _md
 
 class XMindLoader:
     def __init__(self, file_path: str):
@@ -138,6 +142,7 @@ def _convert_xmind(file_path: str, file_type: str) -> ConversionResult:
 @register(Config.IMAGE_TO_MARKDOWN_TYPES)
 def _convert_image(file_path: str, file_type: str) -> ConversionResult:
     try:
+        from local_document_search.services.image_converter import convert_image_to_markdown
         content, conversion_type = convert_image_to_markdown(file_path)
         if conversion_type is None:
             return ConversionResult(success=False, error=content, conversion_type=None, content=None)
@@ -150,7 +155,7 @@ def _convert_image(file_path: str, file_type: str) -> ConversionResult:
 def _convert_html(file_path: str, file_type: str) -> ConversionResult:
     try:
         with open(file_path, 'rb') as f:
-            result = _md.convert(f)
+            result = _get_md().convert(f)
         if not result.text_content or not result.text_content.strip():
             return ConversionResult(success=False, error=f"Markitdown conversion resulted in empty content for {file_path}. Error: {getattr(result, 'error', None)}", conversion_type=None, content=None)
         return ConversionResult(success=True, content=result.text_content, conversion_type=ConversionType.HTML_TO_MD)
@@ -163,21 +168,37 @@ def _convert_structured(file_path: str, file_type: str) -> ConversionResult:
     try:
         adjusted_path = file_path
         if file_type == 'doc':
+            from local_document_search.services.doc_converter import convert_doc_to_docx
             adjusted_path = convert_doc_to_docx(file_path)
             if not adjusted_path:
                 return ConversionResult(success=False, error="Failed to convert .doc to .docx", conversion_type=None, content=None)
         elif file_type == 'ppt':
+            from local_document_search.services.ppt_converter import convert_ppt_to_pptx
             adjusted_path = convert_ppt_to_pptx(file_path)
             if not adjusted_path:
                 return ConversionResult(success=False, error="Failed to convert .ppt to .pptx", conversion_type=None, content=None)
 
+        elif file_type == 'pdf':
+            # Pages without a text layer (scanned archives) are OCR'd page by page
+            from local_document_search.services.pdf_converter import convert_pdf_with_ocr_fallback
+            ocr_result = convert_pdf_with_ocr_fallback(file_path, lambda: _convert_with_markitdown(adjusted_path))
+            if ocr_result is not None:
+                return ocr_result
+
+        return _convert_with_markitdown(adjusted_path)
+    except Exception as e:
+        return ConversionResult(success=False, error=f"Markitdown conversion failed: {e}", conversion_type=None, content=None)
+
+
+def _convert_with_markitdown(adjusted_path: str) -> ConversionResult:
+    try:
         logger.debug("Attempting Markitdown conversion for structured file: %s", adjusted_path)
 
         if not os.path.exists(adjusted_path):
             return ConversionResult(success=False, error=f"Converted file not found: {adjusted_path}", conversion_type=None, content=None)
 
         with open(adjusted_path, 'rb') as f:
-            result = _md.convert(f)
+            result = _get_md().convert(f)
         logger.debug(
             "Markitdown conversion completed for %s. Content length: %s, Error: %s",
             adjusted_path,
@@ -192,9 +213,20 @@ def _convert_structured(file_path: str, file_type: str) -> ConversionResult:
         return ConversionResult(success=False, error=f"Markitdown conversion failed: {e}", conversion_type=None, content=None)
 
 
+@register(['xlsx', 'xls'])
+def _convert_spreadsheet(file_path: str, file_type: str) -> ConversionResult:
+    # Streams rows with per-sheet caps; MarkItDown would materialize the whole workbook
+    from local_document_search.services.spreadsheet_converter import convert_spreadsheet_to_markdown
+    result = convert_spreadsheet_to_markdown(file_path, file_type)
+    if result is None:
+        return _convert_structured(file_path, file_type)
+    return result
+
+
 @register(Config.VIDEO_TO_MARKDOWN_TYPES)
 def _convert_video(file_path: str, file_type: str) -> ConversionResult:
     try:
+        from local_document_search.services.video_converter import convert_video_metadata
         content_or_error, conv_type = convert_video_metadata(file_path)
         if conv_type is None:
             return ConversionResult(success=False, error=content_or_error, conversion_type=None, content=None)
@@ -205,9 +237,38 @@ def _convert_video(file_path: str, file_type: str) -> ConversionResult:
 
 @register(Config.DRAWIO_TO_MARKDOWN_TYPES)
 def _convert_drawio(file_path: str, file_type: str) -> ConversionResult:
+    from local_document_search.services.drawio_converter import convert_drawio_to_markdown
     return convert_drawio_to_markdown(file_path)
 
 
+@register_text(Config.NATIVE_MARKDOWN_TYPES)
+def _convert_native_markdown_text(content: str, file_type: str) -> ConversionResult:
+    return ConversionResult(success=True, content=content, conversion_type=ConversionType.DIRECT)
+
+
+@register_text(Config.HTML_TO_MARKDOWN_TYPES)
+def _convert_html_text(content: str, file_type: str) -> ConversionResult:
+    try:
+        from markdownify import markdownify
+        return ConversionResult(success=True, content=markdownify(content), conversion_type=ConversionType.HTML_TO_MD)
+    except Exception as e:
+        return ConversionResult(success=False, error=f"HTML to Markdown conversion failed: {e}", conversion_type=None, content=None)
+
+
+def convert_text_to_markdown(content, file_type) -> ConversionResult:
+    """
+    Converts an in-memory body (no file on disk, e.g. a Joplin note) via the registered text handlers.
+    """
+    file_type_lower = (file_type or '').lower()
+    handler = get_text_handler(file_type_lower)
+    if not handler:
+        return ConversionResult(success=False, error=f"Unsupported text type: {file_type}", conversion_type=None, content=None)
+    try:
+        return handler(content, file_type_lower).sanitized()
+    except Exception as e:
+        return ConversionResult(success=False, error=f"An unexpected error occurred converting {file_type} text: {e}", conversion_type=None, content=None)
+
+
 def convert_to_markdown(file_path, file_type) -> ConversionResult:
     """
     Converts a file to Markdown format with fine-grained error handling via registered handlers.
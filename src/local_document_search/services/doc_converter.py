@@ -1,9 +1,8 @@
-import os
-import shutil
-import subprocess
 import sys
 from flask import current_app
 from pathlib import Path
+from local_document_search.services.office_pool import office_pool_from_config
+from local_document_search.services.conversion_cache import cached_conversion
 
 # Try to import Windows COM automation (pywin32). If not available (e.g., on Linux),
 # we'll fall back to using LibreOffice (soffice) in headless mode for conversions.
@@ -18,23 +17,30 @@ except Exception:
 
 def convert_doc_to_docx(doc_path: str) -> str | None:
     """
-    使用 Microsoft Word 的 COM 接口将 .doc 转换为 .docx。
+    使用 Microsoft Word 的 COM 接口（或 LibreOffice）将 .doc 转换为 .docx。
+
+    转换结果写入 CACHE_DIR/office 下以源文件哈希命名的缓存文件，不再写到源文件旁边。
 
     Args:
         doc_path: 待转换的 .doc 文件的路径。
 
     Returns:
-        转换后的 .docx 文件路径，如果转换失败则返回 None。
+        缓存中的 .docx 文件路径，如果转换失败则返回 None。
     """
+    config = current_app.config
+    converted = cached_conversion(
+        doc_path, 'docx', _convert_into,
+        config.get('CACHE_DIR', 'cache'), int(config.get('OFFICE_CACHE_MAX_MB', 2048)) * 1024 * 1024,
+    )
+    if converted:
+        current_app.logger.info(f"Using cached .docx {converted} for {doc_path}")
+    return converted
+
+
+def _convert_into(doc_path_obj: Path, staging_dir: Path) -> str | None:
     word = None
     doc = None
-    doc_path_obj = Path(doc_path).resolve()
-    docx_path_obj = doc_path_obj.with_suffix('.docx')
-
-    # 如果 .docx 文件已存在，则直接返回
-    if docx_path_obj.exists():
-        current_app.logger.info(f"Skipping conversion for {doc_path_obj} as {docx_path_obj} already exists.")
-        return str(docx_path_obj)
+    docx_path_obj = staging_dir / f"{doc_path_obj.stem}.docx"
 
     # If running on Windows and pywin32 is available, use COM automation.
     if _has_win32:
@@ -42,9 +48,9 @@ def convert_doc_to_docx(doc_path: str) -> str | None:
             word = win32.gencache.EnsureDispatch('Word.Application')
             word.Visible = False
 
-            doc = word.Documents.Open(str(doc_path_obj))
+            doc = word.Documents.Open(str(doc_path_obj), ReadOnly=True)
             doc.SaveAs(str(docx_path_obj), FileFormat=constants.wdFormatXMLDocument)
-            current_app.logger.info(f"Successfully converted {doc_path_obj} to {docx_path_obj} via Word COM")
+            current_app.logger.info(f"Successfully converted {doc_path_obj} to .docx via Word COM")
             return str(docx_path_obj)
         except Exception as e:
             current_app.logger.error(f"Failed to convert {doc_path_obj} to .docx using Word COM: {e}", exc_info=True)
@@ -63,26 +69,12 @@ def convert_doc_to_docx(doc_path: str) -> str | None:
 
     # Fallback: use LibreOffice (soffice) in headless mode to convert .doc -> .docx
     # soffice must be installed on Linux (package: libreoffice-core / libreoffice-common / libreoffice-writer)
-    soffice_path = shutil.which('soffice') or shutil.which('libreoffice')
-    if not soffice_path:
+    # Pooled headless LibreOffice: long-lived instances with isolated profiles (see office_pool)
+    pool = office_pool_from_config(current_app.config)
+    if pool is None:
         current_app.logger.error("LibreOffice (soffice) not found on PATH; cannot convert .doc to .docx on this platform.")
         return None
-
-    try:
-        # Use --headless --convert-to docx to perform conversion and place output in the same directory
-        subprocess.check_call([
-            soffice_path,
-            '--headless',
-            '--convert-to', 'docx:MS Word 2007 XML',
-            '--outdir', str(doc_path_obj.parent),
-            str(doc_path_obj)
-        ])
-        if docx_path_obj.exists():
-            current_app.logger.info(f"Successfully converted {doc_path_obj} to {docx_path_obj} via LibreOffice")
-            return str(docx_path_obj)
-        else:
-            current_app.logger.error(f"LibreOffice conversion completed but output file not found: {docx_path_obj}")
-            return None
-    except subprocess.CalledProcessError as e:
-        current_app.logger.error(f"LibreOffice conversion failed for {doc_path_obj}: {e}", exc_info=True)
-        return None
+    converted = pool.convert(str(doc_path_obj), 'docx', 'MS Word 2007 XML', str(staging_dir))
+    if converted:
+        current_app.logger.info(f"Successfully converted {doc_path_obj} to .docx via LibreOffice")
+    return converted
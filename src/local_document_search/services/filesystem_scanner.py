@@ -75,3 +75,27 @@ def find_files(root_path, recursive, file_types_str, date_from_str=None, date_to
             
     return matched_files
 
+
+
+def is_ingestible(file_path, file_types_str=None):
+    """
+    Single-file counterpart of find_files' filters (excluded dirs/suffixes/extensions and
+    requested types); used by watch mode where paths arrive one event at a time.
+    """
+    config = current_app.config
+    excluded_dirs = set(config.get('EXCLUDED_DIRS', []))
+    excluded_dir_suffixes = tuple(suf.lower() for suf in config.get('EXCLUDED_DIR_SUFFIXES', ['.assets']))
+    excluded_extensions = tuple(f".{ext.lower()}" for ext in config.get('EXCLUDED_FILE_EXTENSIONS', []))
+
+    parts = os.path.normpath(file_path).split(os.sep)
+    for d in parts[:-1]:
+        if d in excluded_dirs or (excluded_dir_suffixes and d.lower().endswith(excluded_dir_suffixes)):
+            return False
+    name = parts[-1].lower()
+    if excluded_extensions and name.endswith(excluded_extensions):
+        return False
+    if file_types_str:
+        file_types = [ft.strip().lower() for ft in file_types_str.split(',') if ft.strip()]
+    else:
+        file_types = [ft.lower() for ft in config.get('SUPPORTED_FILE_TYPES', [])]
+    return name.endswith(tuple(f".{ft}" for ft in file_types))
@@ -0,0 +1,197 @@
+"""Watch mode: feed filesystem changes under configured roots into the ingestion pipeline.
+
+Public:
+    ChangeDebouncer(quiet_seconds, max_delay) -- coalesces raw events per path
+    watch_roots(roots, ..., stop_event=None, on_event=None) -- blocks until stop_event is set
+
+Change notifications come from watchdog (inotify / FSEvents / ReadDirectoryChangesW) when
+it is installed, otherwise from a polling snapshot diff every ``poll_interval`` seconds.
+Bursts (editors saving via temp file + rename, copies in progress) are debounced per path
+and then applied in one ``ingest_paths`` call: created/modified/moved-to paths are
+converted (a moved-to file re-points the Document of its moved-from path), then
+deleted/moved-from paths have their remaining Documents removed.
+"""
+import os
+import time
+import threading
+from flask import current_app
+from local_document_search.services.filesystem_scanner import is_ingestible
+from local_document_search.services.ingestion_manager import ingest_paths, run_local_ingestion
+from local_document_search.utils.file_utils import normalize_path
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+class ChangeDebouncer:
+    """Thread-safe per-path event coalescing.
+
+    A path is released once no event arrived for ``quiet_seconds`` (or ``max_delay`` after
+    its first event, so a file that is written continuously is still picked up). The last
+    event wins: create+delete becomes delete, delete+create (atomic save) becomes upsert.
+    """
+
+    def __init__(self, quiet_seconds=2.0, max_delay=30.0):
+        self.quiet_seconds = quiet_seconds
+        self.max_delay = max(max_delay, quiet_seconds)
+        self._pending = {}  # path -> [kind, first_seen, last_seen]
+        self._lock = threading.Lock()
+
+    def add(self, kind, path, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [kind, now, now]
+            else:
+                entry[0] = kind
+                entry[2] = now
+
+    def pop_ready(self, now=None):
+        """Return (upserts, deletes) whose quiet period has elapsed."""
+        now = time.monotonic() if now is None else now
+        upserts, deletes = [], []
+        with self._lock:
+            for path, (kind, first_seen, last_seen) in list(self._pending.items()):
+                if now - last_seen >= self.quiet_seconds or now - first_seen >= self.max_delay:
+                    del self._pending[path]
+                    (upserts if kind == UPSERT else deletes).append(path)
+        return sorted(upserts), sorted(deletes)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+def _start_watchdog(roots, recursive, debouncer):
+    """Schedule a watchdog observer for ``roots``; None when watchdog is not installed."""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_created(self, event):
+            debouncer.add(UPSERT, event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                debouncer.add(UPSERT, event.src_path)
+
+        def on_moved(self, event):
+            debouncer.add(DELETE, event.src_path)
+            debouncer.add(UPSERT, event.dest_path)
+
+        def on_deleted(self, event):
+            debouncer.add(DELETE, event.src_path)
+
+    observer = Observer()
+    handler = _Handler()
+    for root in roots:
+        observer.schedule(handler, root, recursive=recursive)
+    observer.daemon = True
+    observer.start()
+    return observer
+
+
+def _snapshot(roots, recursive):
+    state = {}
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                state[path] = (st.st_size, st.st_mtime_ns)
+            if not recursive:
+                break
+    return state
+
+
+def _diff_snapshots(before, after, debouncer):
+    for path, sig in after.items():
+        if before.get(path) != sig:
+            debouncer.add(UPSERT, path)
+    for path in before.keys() - after.keys():
+        debouncer.add(DELETE, path)
+
+
+def _expand_upserts(paths, recursive, file_types_str):
+    """Directories (created or moved in) expand to their files; everything is filtered like a scan."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.join(dirpath, name) for name in filenames)
+                if not recursive:
+                    break
+        elif os.path.isfile(path):
+            files.append(path)
+    seen = set()
+    result = []
+    for path in files:
+        norm = normalize_path(path)
+        if norm not in seen and is_ingestible(path, file_types_str):
+            seen.add(norm)
+            result.append(norm)
+    return result
+
+
+def watch_roots(roots, recursive=True, file_types_str=None, debounce=None, poll_interval=None,
+                use_polling=False, initial_scan=True, workers=None, batch_size=None,
+                stop_event=None, on_event=None):
+    """Watch ``roots`` until ``stop_event`` is set; must run inside an app context.
+
+    ``on_event(event, root)`` receives every ingestion event (``root`` is None for
+    watch batches). With ``initial_scan`` each root first gets a regular incremental scan
+    so changes made while the watcher was down are picked up.
+    """
+    config = current_app.config
+    logger = current_app.logger
+    debounce = config.get('WATCH_DEBOUNCE_SECONDS', 2.0) if debounce is None else debounce
+    poll_interval = config.get('WATCH_POLL_INTERVAL', 5.0) if poll_interval is None else poll_interval
+    stop_event = stop_event or threading.Event()
+    on_event = on_event or (lambda evt, root: None)
+    roots = [normalize_path(r) for r in roots]
+
+    debouncer = ChangeDebouncer(quiet_seconds=debounce, max_delay=max(30.0, debounce * 10))
+    observer = None if use_polling else _start_watchdog(roots, recursive, debouncer)
+    snapshot = _snapshot(roots, recursive) if observer is None else None
+    logger.info(f"[Watch] watching {roots} via {'watchdog' if observer else f'polling every {poll_interval}s'}")
+
+    try:
+        if initial_scan:
+            for root in roots:
+                for evt in run_local_ingestion(root, None, None, recursive, file_types_str,
+                                               workers=workers, batch_size=batch_size):
+                    on_event(evt, root)
+                if stop_event.is_set():
+                    return
+
+        next_poll = time.monotonic() + poll_interval
+        tick = min(0.5, max(0.05, debounce / 4))
+        while not stop_event.wait(tick):
+            if snapshot is not None and time.monotonic() >= next_poll:
+                current = _snapshot(roots, recursive)
+                _diff_snapshots(snapshot, current, debouncer)
+                snapshot = current
+                next_poll = time.monotonic() + poll_interval
+
+            upserts, deletes = debouncer.pop_ready()
+            if not upserts and not deletes:
+                continue
+            changed = _expand_upserts(upserts, recursive, file_types_str)
+            # A path that exists again (atomic save: delete + create) is an update, not a delete
+            deleted = [p for p in deletes if not os.path.exists(p)]
+            if not changed and not deleted:
+                continue
+            logger.info(f"[Watch] applying {len(changed)} changed / {len(deleted)} deleted path(s)")
+            for evt in ingest_paths(changed, deleted, workers=workers, batch_size=batch_size, roots=roots):
+                on_event(evt, None)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=5)
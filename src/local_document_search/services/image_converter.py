@@ -7,6 +7,8 @@ import os
 from flask import current_app
 from local_document_search.models import ConversionType
 from .provider_factory import get_markitdown_instance
+from .ocr_engine import ocr_image, ocr_options
+from local_document_search.utils.hash_utils import file_sha256
 
 def _build_image_front_matter(file_path: str, sha256_hash, file_stats, exif_data, ocr_lang):
     import datetime
@@ -44,10 +46,7 @@ def _local_ocr_convert(file_path: str):
 
     try:
         file_stats = os.stat(file_path)
-        import hashlib
-        with open(file_path, 'rb') as bf:
-            img_bytes = bf.read()
-        sha256_hash = hashlib.sha256(img_bytes).hexdigest()
+        sha256_hash = file_sha256(file_path)
     except Exception as meta_e:  # pragma: no cover - logging side effect only
         current_app.logger.warning(f"Failed to compute file metadata for {file_path}: {meta_e}")
 
@@ -85,8 +84,10 @@ def _local_ocr_convert(file_path: str):
         # OCR
         lang = current_app.config.get('TESSERACT_LANG', 'eng')
         try:
-            import pytesseract
-            ocr_text = pytesseract.image_to_string(img, lang=lang)
+            if current_app.config.get('OCR_ENGINE_MODE', 'parallel') == 'parallel':
+                ocr_text = ocr_image(img, lang, **ocr_options(current_app.config))
+            else:
+                ocr_text = pytesseract.image_to_string(img, lang=lang)
         except Exception as ocr_e:
             return f"Tesseract OCR failed for {file_path}: {ocr_e}", None
         if ocr_text and ocr_text.strip():
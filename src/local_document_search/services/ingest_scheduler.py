@@ -0,0 +1,130 @@
+"""Process-wide conversion scheduler shared by all background ingestion sessions.
+
+Public:
+    IngestionScheduler(workers)
+    get_scheduler(app=None) -> IngestionScheduler | None
+
+Without it every async session (e.g. each directory of ``/api/convert/batch``) converts
+on its own threads, so ten directories mean ten uncoordinated pools competing for CPU,
+the database and LLM quotas. Here sessions only enqueue conversions and
+INGEST_GLOBAL_WORKERS threads run them, picking across sessions by weighted round-robin:
+a session with priority ``p`` gets up to ``p`` conversions per turn, so higher priorities
+finish sooner without starving the others. Sessions still apply results in their own
+file order, so their progress events are unchanged.
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future
+from flask import current_app
+
+MIN_PRIORITY = 1
+MAX_PRIORITY = 10
+
+_lock = threading.Lock()
+
+
+def clamp_priority(priority):
+    try:
+        value = int(priority)
+    except (TypeError, ValueError):
+        return MIN_PRIORITY
+    return max(MIN_PRIORITY, min(MAX_PRIORITY, value))
+
+
+class IngestionScheduler:
+    def __init__(self, workers):
+        self.workers = max(1, int(workers))
+        self._cond = threading.Condition()
+        self._queues = {}  # session_id -> deque of (future, fn, args)
+        self._priority = {}  # session_id -> weight per round-robin turn
+        self._ring = deque()  # sessions with queued work, in service order
+        self._credit = 0  # picks left for the session at the head of the ring
+        self._threads = []
+
+    def submit(self, session_id, fn, *args):
+        """Queue ``fn(*args)`` on behalf of ``session_id``; returns a Future."""
+        future = Future()
+        with self._cond:
+            self._start_threads()
+            queue = self._queues.get(session_id)
+            if queue is None:
+                queue = self._queues[session_id] = deque()
+                self._ring.append(session_id)
+            queue.append((future, fn, args))
+            self._cond.notify()
+        return future
+
+    def set_priority(self, session_id, priority):
+        with self._cond:
+            self._priority[session_id] = clamp_priority(priority)
+
+    def priority(self, session_id):
+        with self._cond:
+            return self._priority.get(session_id, MIN_PRIORITY)
+
+    def release(self, session_id):
+        """Forget a finished session; conversions it still had queued are cancelled."""
+        with self._cond:
+            queue = self._queues.pop(session_id, None)
+            if queue is not None:
+                if self._ring and self._ring[0] == session_id:
+                    self._credit = 0
+                self._ring.remove(session_id)
+                for future, _, _ in queue:
+                    future.cancel()
+            self._priority.pop(session_id, None)
+
+    def stats(self):
+        with self._cond:
+            return {'workers': self.workers,
+                    'queued': {sid: len(queue) for sid, queue in self._queues.items()},
+                    'priority': dict(self._priority)}
+
+    def _start_threads(self):
+        # caller holds the Condition; threads are started on first use
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"ingest-sched-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_task(self):
+        # caller holds the Condition and the ring is not empty
+        session_id = self._ring[0]
+        if self._credit <= 0:
+            self._credit = self._priority.get(session_id, MIN_PRIORITY)
+        queue = self._queues[session_id]
+        task = queue.popleft()
+        self._credit -= 1
+        if not queue:
+            self._ring.popleft()
+            del self._queues[session_id]
+            self._credit = 0
+        elif self._credit <= 0:
+            self._ring.rotate(-1)
+        return task
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ring:
+                    self._cond.wait()
+                future, fn, args = self._next_task()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+def get_scheduler(app=None):
+    """The app's shared scheduler, or None when INGEST_GLOBAL_WORKERS is 0 (per-session pools)."""
+    app = app or current_app._get_current_object()
+    workers = int(app.config.get('INGEST_GLOBAL_WORKERS', 0) or 0)
+    if workers <= 0:
+        return None
+    with _lock:
+        scheduler = app.extensions.get('ingest_scheduler')
+        if scheduler is None:
+            scheduler = app.extensions['ingest_scheduler'] = IngestionScheduler(workers)
+    return scheduler
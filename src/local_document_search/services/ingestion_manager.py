@@ -1,29 +1,38 @@
-﻿"""Ingestion manager: manages folder ingestion sessions with cancellation support.
+﻿"""Ingestion manager: manages ingestion sessions with cancellation support.
 
 This is a clean reimplementation after corruption. Key features:
  - Session storage in `app.config['INGEST_SESSIONS']` (survives dev server reload).
  - Every emitted event includes `session_id`.
  - Control-plane events (e.g. CANCEL_ACK) queued so they are flushed ASAP.
  - Heartbeat / debug events to help diagnose cancellation timing.
+ - Pluggable sources (local folders, Joplin) share one session and event pipeline:
+   background runs publish to any number of SSE subscribers (sync and asyncio), and
+   their conversions run on the shared IngestionScheduler.
 """
 
 import os
 import json
+import asyncio
+import importlib
 import uuid
 import traceback
 import threading
 import time
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from flask import current_app
 
-from local_document_search.extensions import db
+from local_document_search.extensions import db, worker_context
 from local_document_search.models import Document, IngestState
-from local_document_search.utils.file_utils import get_file_metadata
+from local_document_search.utils.file_utils import get_file_metadata, normalize_path
 from local_document_search.services.filesystem_scanner import find_files
 from local_document_search.services.provider_factory import build_conversion_service
 from local_document_search.services.conversion_result import ConversionResult
+from local_document_search.services.ingest_scheduler import clamp_priority, get_scheduler
 from local_document_search.services.log_events import LogEvent
+from local_document_search.services.reconcile_service import find_moved_document, ingested_roots, repoint_document, root_of
+from local_document_search.utils.hash_utils import file_sha256
 
 
 # ---------------- Session Store Helpers ---------------- #
@@ -41,12 +50,16 @@ def start_session() -> str:
         'stop': False,
         'started_at': datetime.now(timezone.utc),
         'control_events': [],  # control-plane queue (CANCEL_ACK etc)
-        'event_queue': deque(),  # for async/background mode
+        'subscribers': [],  # async mode: one _Subscriber per connected SSE client
+        'cond': threading.Condition(),  # guards subscribers/done; notified on every event
         'done': False,
         'mode': 'sync',  # or 'async'
+        'source': None,
         'folder_path': None,
         'params': {},
-        'history': deque(maxlen=1000)  # recent events for reconnection
+        'priority': 1,  # share of the global conversion budget (async sessions)
+        'history': deque(maxlen=int(current_app.config.get('SSE_EVENT_LOG_SIZE', 1000))),  # numbered event log for resume
+        'last_event_id': 0,
     }
     return sid
 
@@ -101,83 +114,211 @@ def get_session_debug(session_id: str):
         'started_at': data.get('started_at').isoformat() if data.get('started_at') else None,
         'cancel_requested_at': data.get('cancel_requested_at').isoformat() if data.get('cancel_requested_at') else None,
         'control_queue_length': len(data.get('control_events', [])),
-        'event_queue_length': len(data.get('event_queue', [])),
+        'subscribers': len(data.get('subscribers', [])),
+        'subscriber_backlog': [len(sub.queue) for sub in data.get('subscribers', [])],
         'done': data.get('done'),
         'mode': data.get('mode'),
+        'priority': data.get('priority'),
+        'source': data.get('source'),
         'folder_path': data.get('folder_path'),
         'params': data.get('params', {})
     }
 
 
 # ---------------- Ingestion Core ---------------- #
-def run_local_ingestion(folder_path, date_from_str, date_to_str, recursive, file_types_str):
-    """Generator yielding structured SSE dicts for ingestion progress."""
+def _drain_control_events(session_id: str):
+    ctrl_events = _get_sessions().get(session_id, {}).get('control_events', [])
+    while ctrl_events:
+        yield ctrl_events.pop(0)
+
+
+def _derive_source(file_path: str):
+    """Return (source, source_url) from DOWNLOAD_PATH layout and the optional .meta.json sidecar."""
     logger = current_app.logger
-    start_time = datetime.now(timezone.utc)
-    conversion_service = build_conversion_service()
-    session_id = start_session()
+    source_url = None
+    try:
+        meta_path = file_path + '.meta.json'
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                mdata = json.load(f)
+                source_url = mdata.get('source_url')
+    except Exception as e:
+        logger.warning(f"Could not read metadata for {file_path}: {e}")
 
-    # IngestState fetch / create
-    ingest_state = db.session.query(IngestState).filter_by(
-        source=current_app.config['SOURCE_LOCAL_FS'], scope_key=folder_path).first()
-    if not ingest_state:
-        ingest_state = IngestState(source=current_app.config['SOURCE_LOCAL_FS'], scope_key=folder_path)
-        db.session.add(ingest_state)
-    ingest_state.last_started_at = start_time
-    ingest_state.last_error_message = None
-    db.session.commit()
+    # Determine source based on DOWNLOAD_PATH
+    source = current_app.config['SOURCE_LOCAL_FS']
+    download_path = current_app.config.get('DOWNLOAD_PATH')
+    if download_path:
+        try:
+            norm_download = os.path.normpath(download_path)
+            norm_file = os.path.normpath(file_path)
+            if norm_file.startswith(norm_download + os.sep):
+                rel = os.path.relpath(norm_file, norm_download)
+                parts = rel.split(os.sep)
+                if len(parts) > 1:
+                    source = f"公众号_{parts[0]}"
+        except Exception as e:
+            logger.warning(f"Could not derive source from DOWNLOAD_PATH for {file_path}: {e}")
+    return source, source_url
+
+
+def _apply_result(metadata, existing_doc, result: ConversionResult, source, source_url, content_sha256=None):
+    """Stage the Document insert/update for one conversion result (committed by the caller)."""
+    if not result.success:
+        if existing_doc:
+            existing_doc.status = 'failed'
+            existing_doc.error_message = result.error
+            existing_doc.source = source
+            existing_doc.source_url = source_url
+        else:
+            db.session.add(Document(
+                file_name=metadata['file_name'], file_type=metadata['file_type'],
+                file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
+                file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
+                status='failed', error_message=result.error, source=source, source_url=source_url
+            ))
+    elif existing_doc:
+        existing_doc.file_size = metadata['file_size']
+        existing_doc.file_modified_time = metadata['file_modified_time']
+        existing_doc.markdown_content = result.content
+        existing_doc.conversion_type = result.conversion_type
+        existing_doc.status = 'completed'
+        existing_doc.error_message = None
+        existing_doc.source = source
+        existing_doc.source_url = source_url
+        existing_doc.content_sha256 = content_sha256
+    else:
+        db.session.add(Document(
+            file_name=metadata['file_name'], file_type=metadata['file_type'],
+            file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
+            file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
+            markdown_content=result.content, conversion_type=result.conversion_type, status='completed',
+            source=source, source_url=source_url, content_sha256=content_sha256
+        ))
+
+
+def _convert_and_hash(conversion_service, file_path, file_type):
+    """Convert one file and hash its source (the hash lets later scans recognise the file after a move)."""
+    result = conversion_service.convert(file_path, file_type)
+    content_sha256 = None
+    if result.success:
+        try:
+            content_sha256 = file_sha256(file_path)
+        except OSError:
+            pass
+    return result, content_sha256
 
-    effective_date_from = date_from_str
-    if not date_from_str and ingest_state.cursor_updated_at:
-        effective_date_from = ingest_state.cursor_updated_at.isoformat()
 
-    processed_files = skipped_files = error_files = 0
+def _convert_in_context(app, conversion_service, file_path, file_type):
+    # Converter threads need an app context for current_app.config / logger; they never touch the DB session
+    with app.app_context():
+        return _convert_and_hash(conversion_service, file_path, file_type)
 
-    try:
-        # Session + scan start events
-        yield {'level': 'info', 'message': f'Starting folder scan: {folder_path}', 'stage': LogEvent.SCAN_START.value, 'session_id': session_id}
-        yield {'level': 'info', 'message': f'Session started: {session_id}', 'stage': 'session_info', 'session_id': session_id}
 
-        matched_files = find_files(folder_path, recursive, file_types_str, effective_date_from, date_to_str)
-        total_files = len(matched_files)
-        ingest_state.total_files = total_files
-        db.session.commit()
-        yield {'level': 'info', 'message': f'Scan found {total_files} matching files.', 'stage': LogEvent.SCAN_COMPLETE.value, 'total_files': total_files, 'session_id': session_id}
+class _FilePipeline:
+    """Convert-and-store loop shared by folder scans, the CLI and the directory watcher.
 
-        if total_files == 0:
-            summary = {'total_files': 0, 'processed_files': 0, 'skipped_files': 0, 'error_files': 0}
-            yield {'level': 'info', 'message': 'No files to process.', 'stage': LogEvent.DONE.value, 'summary': summary, 'session_id': session_id}
-            ingest_state.cursor_updated_at = start_time
-            return
+    Metadata, skip checks and all DB writes stay on the calling thread. With ``workers`` > 1
+    conversions run on a thread pool (results are applied in input order), and Document
+    writes are committed every ``batch_size`` files instead of after each one. Background
+    sessions hand their conversions to the shared IngestionScheduler instead, so the
+    global INGEST_GLOBAL_WORKERS budget applies across all of them.
+    """
 
+    def __init__(self, session_id, workers=None, batch_size=None, roots=()):
+        config = current_app.config
+        self.session_id = session_id
+        self.logger = current_app.logger
+        self.app = current_app._get_current_object()
+        self.workers = max(1, int(workers or config.get('INGEST_WORKERS', 1)))
+        self.batch_size = max(1, int(batch_size or config.get('INGEST_BATCH_SIZE', 1)))
+        self.conversion_service = build_conversion_service()
+        background = _get_sessions().get(session_id, {}).get('mode') == 'async'
+        self.scheduler = get_scheduler(self.app) if background else None
+        self.executor = (ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"convert-{session_id[:8]}")
+                         if self.workers > 1 and self.scheduler is None else None)
+        self.roots = [normalize_path(root) for root in roots]  # move detection stays within these
+        self.in_flight = deque()  # (future, file_path, metadata, existing_doc, source, source_url), in input order
+        self.uncommitted = 0
+        self.processed_files = self.skipped_files = self.error_files = 0
+
+    def _apply_next(self):
+        session_id = self.session_id
+        future, file_path, metadata, existing_doc, source, source_url = self.in_flight.popleft()
+        try:
+            result, content_sha256 = future.result()
+        except Exception as e:
+            result = ConversionResult(success=False, error=f"Conversion crashed: {e}", conversion_type=None, content=None)
+            content_sha256 = None
+        _apply_result(metadata, existing_doc, result, source, source_url, content_sha256)
+        self.uncommitted += 1
+        if self.uncommitted >= self.batch_size:
+            self.commit()
+        if not result.success:
+            self.error_files += 1
+            self.logger.error(f"[Ingestion][{session_id}] ERROR converting: {file_path} :: {result.error}")
+            return {'level': 'error', 'message': f'Failed to convert file: {file_path}. Reason: {result.error}', 'stage': LogEvent.FILE_ERROR.value, 'session_id': session_id}
+        self.processed_files += 1
+        self.logger.info(f"[Ingestion][{session_id}] SUCCESS {file_path}")
+        return {'level': 'info', 'message': f'Successfully processed: {file_path}', 'stage': LogEvent.FILE_SUCCESS.value, 'session_id': session_id}
+
+    def drain(self):
+        while self.in_flight:
+            yield self._apply_next()
+
+    def commit(self):
+        db.session.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.scheduler is not None:
+            self.scheduler.release(self.session_id)
+
+    def _window(self):
+        # Conversions queued ahead per session; a scheduled session keeps enough queued to fill the
+        # global pool when it runs alone and to use its whole priority share when others compete
+        if self.scheduler is None:
+            return self.workers * 2
+        return max(self.scheduler.workers, self.scheduler.priority(self.session_id)) * 2
+
+    def summary(self, total_files):
+        return {'total_files': total_files, 'processed_files': self.processed_files,
+                'skipped_files': self.skipped_files, 'error_files': self.error_files}
+
+    def process(self, file_paths):
+        """Yield events while ingesting ``file_paths``; returns True if stopped by cancellation."""
+        session_id = self.session_id
+        logger = self.logger
         sessions = _get_sessions()
-        for i, file_path in enumerate(matched_files):
-            # Drain control events
-            ctrl_events = sessions.get(session_id, {}).get('control_events', [])
-            while ctrl_events:
-                evt = ctrl_events.pop(0)
+        total_files = len(file_paths)
+        stopped_after_file = False
+        for i, file_path in enumerate(file_paths):
+            for evt in _drain_control_events(session_id):
                 logger.info(f"[IngestionControl] emit {evt['stage']} session={session_id}")
                 yield evt
             # Heartbeat with richer diagnostic information
-            active_ids = list(sessions.keys())
             yield {
                 'level': 'info',
                 'message': (
                     f"Heartbeat: i={i} stop={sessions.get(session_id, {}).get('stop')} "
                     f"queue={len(sessions.get(session_id, {}).get('control_events', []))} "
-                    f"active_sessions={active_ids}"
+                    f"in_flight={len(self.in_flight)} active_sessions={len(sessions)}"
                 ),
                 'stage': 'debug_state',
                 'session_id': session_id
             }
             if is_cancelled(session_id):
+                yield from self.drain()
                 yield {'level': 'warning', 'message': 'Stopping before next file (cancelled).', 'stage': LogEvent.CANCELLED.value, 'session_id': session_id}
-                break
+                self.commit()
+                return True
 
             progress = int(((i + 1) / total_files) * 100)
             metadata = get_file_metadata(file_path)
             if not metadata:
-                skipped_files += 1
+                self.skipped_files += 1
                 logger.warning(f"[Ingestion][{session_id}] SKIP (metadata unavailable) {file_path}")
                 yield {'level': 'warning', 'message': f'Could not get metadata for {file_path}, skipping.', 'stage': LogEvent.FILE_SKIP.value, 'session_id': session_id}
                 continue
@@ -186,309 +327,440 @@ def run_local_ingestion(folder_path, date_from_str, date_to_str, recursive, file
             logger.info(f"[Ingestion][{session_id}] PROCESS {i+1}/{total_files} :: {metadata['file_name']}")
             yield {'level': 'info', 'message': f"Processing file {i+1}/{total_files}: {metadata['file_name']}", 'stage': LogEvent.FILE_PROCESSING.value, 'progress': progress, 'current_file': metadata['file_name'], 'session_id': session_id}
 
-            # Sidecar metadata (.meta.json)
-            source_url = None
-            try:
-                meta_path = file_path + '.meta.json'
-                if os.path.exists(meta_path):
-                    with open(meta_path, 'r', encoding='utf-8') as f:
-                        mdata = json.load(f)
-                        source_url = mdata.get('source_url')
-            except Exception as e:
-                logger.warning(f"Could not read metadata for {file_path}: {e}")
-
-            # Determine source based on DOWNLOAD_PATH
-            source = current_app.config['SOURCE_LOCAL_FS']
-            download_path = current_app.config.get('DOWNLOAD_PATH')
-            if download_path:
-                try:
-                    norm_download = os.path.normpath(download_path)
-                    norm_file = os.path.normpath(file_path)
-                    if norm_file.startswith(norm_download + os.sep):
-                        rel = os.path.relpath(norm_file, norm_download)
-                        parts = rel.split(os.sep)
-                        if len(parts) > 1:
-                            source = f"公众号_{parts[0]}"
-                except Exception as e:
-                    logger.warning(f"Could not derive source from DOWNLOAD_PATH for {file_path}: {e}")
+            source, source_url = _derive_source(file_path)
 
             existing_doc = Document.query.filter(Document.file_path.ilike(metadata['file_path'])).first()
             if existing_doc and existing_doc.file_modified_time == metadata['file_modified_time']:
-                skipped_files += 1
+                self.skipped_files += 1
                 logger.info(f"[Ingestion][{session_id}] SKIP (unchanged) {file_path}")
                 yield {'level': 'info', 'message': f'Skipping unchanged file: {file_path}', 'stage': LogEvent.FILE_SKIP.value, 'reason': 'unchanged', 'session_id': session_id}
                 continue
 
-            result: ConversionResult = conversion_service.convert(file_path, metadata['file_type'])
-            if not result.success:
-                error_files += 1
-                if existing_doc:
-                    existing_doc.status = 'failed'
-                    existing_doc.error_message = result.error
-                    existing_doc.source = source
-                    existing_doc.source_url = source_url
-                else:
-                    db.session.add(Document(
-                        file_name=metadata['file_name'], file_type=metadata['file_type'],
-                        file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
-                        file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
-                        status='failed', error_message=result.error, source=source, source_url=source_url
-                    ))
-                logger.error(f"[Ingestion][{session_id}] ERROR converting: {file_path} :: {result.error}")
-                yield {'level': 'error', 'message': f'Failed to convert file: {file_path}. Reason: {result.error}', 'stage': LogEvent.FILE_ERROR.value, 'session_id': session_id}
+            root = root_of(metadata['file_path'], self.roots) if existing_doc is None else None
+            moved_doc = find_moved_document(metadata, root) if root else None
+            if moved_doc is not None:
+                old_path = moved_doc.file_path
+                repoint_document(moved_doc, metadata)
+                self.uncommitted += 1
+                if self.uncommitted >= self.batch_size:
+                    self.commit()
+                self.skipped_files += 1
+                logger.info(f"[Ingestion][{session_id}] MOVED {old_path} -> {file_path}")
+                yield {'level': 'info', 'message': f'Detected moved file: {old_path} -> {file_path}', 'stage': LogEvent.FILE_MOVED.value, 'reason': 'moved', 'session_id': session_id}
+                continue
+
+            if self.scheduler is not None:
+                future = self.scheduler.submit(session_id, _convert_in_context, self.app, self.conversion_service, file_path, metadata['file_type'])
+            elif self.executor is None:
+                future = Future()
+                future.set_result(_convert_and_hash(self.conversion_service, file_path, metadata['file_type']))
             else:
-                if existing_doc:
-                    existing_doc.file_size = metadata['file_size']
-                    existing_doc.file_modified_time = metadata['file_modified_time']
-                    existing_doc.markdown_content = result.content
-                    existing_doc.conversion_type = result.conversion_type
-                    existing_doc.status = 'completed'
-                    existing_doc.error_message = None
-                    existing_doc.source = source
-                    existing_doc.source_url = source_url
-                else:
-                    db.session.add(Document(
-                        file_name=metadata['file_name'], file_type=metadata['file_type'],
-                        file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
-                        file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
-                        markdown_content=result.content, conversion_type=result.conversion_type, status='completed',
-                        source=source, source_url=source_url
-                    ))
-                processed_files += 1
-                logger.info(f"[Ingestion][{session_id}] SUCCESS {file_path}")
-                yield {'level': 'info', 'message': f'Successfully processed: {file_path}', 'stage': LogEvent.FILE_SUCCESS.value, 'session_id': session_id}
-
-            db.session.commit()
+                future = self.executor.submit(_convert_in_context, self.app, self.conversion_service, file_path, metadata['file_type'])
+            self.in_flight.append((future, file_path, metadata, existing_doc, source, source_url))
+            # Keep at most ~2 conversions per worker queued; apply finished ones in input order
+            while self.in_flight and (len(self.in_flight) >= self._window() or self.in_flight[0][0].done()):
+                yield self._apply_next()
 
             if is_cancelled(session_id):
-                # Drain any leftover control events
-                ctrl_events2 = sessions.get(session_id, {}).get('control_events', [])
-                while ctrl_events2:
-                    evt = ctrl_events2.pop(0)
-                    logger.info(f"[IngestionControl] emit-post-file {evt['stage']} session={session_id}")
-                    yield evt
-                yield {'level': 'warning', 'message': '当前文件完成后停止 (stopped after current file).', 'stage': LogEvent.CANCELLED.value, 'session_id': session_id}
+                stopped_after_file = True
                 break
 
+        yield from self.drain()
+        self.commit()
+
+        if stopped_after_file:
+            for evt in _drain_control_events(session_id):
+                logger.info(f"[IngestionControl] emit-post-file {evt['stage']} session={session_id}")
+                yield evt
+            yield {'level': 'warning', 'message': '当前文件完成后停止 (stopped after current file).', 'stage': LogEvent.CANCELLED.value, 'session_id': session_id}
+        return stopped_after_file
+
+
+def _ingest_folder(session_id, folder_path, date_from_str, date_to_str, recursive, file_types_str,
+                   workers=None, batch_size=None):
+    """Scan ``folder_path`` and ingest matching files; yields structured event dicts."""
+    logger = current_app.logger
+    config = current_app.config
+    start_time = datetime.now(timezone.utc)
+
+    # IngestState fetch / create
+    ingest_state = db.session.query(IngestState).filter_by(
+        source=config['SOURCE_LOCAL_FS'], scope_key=folder_path).first()
+    if not ingest_state:
+        ingest_state = IngestState(source=config['SOURCE_LOCAL_FS'], scope_key=folder_path)
+        db.session.add(ingest_state)
+    ingest_state.last_started_at = start_time
+    ingest_state.last_error_message = None
+    db.session.commit()
+
+    effective_date_from = date_from_str
+    if not date_from_str and ingest_state.cursor_updated_at:
+        effective_date_from = ingest_state.cursor_updated_at.isoformat()
+
+    pipeline = _FilePipeline(session_id, workers=workers, batch_size=batch_size, roots=[folder_path])
+    try:
+        # Session + scan start events
+        yield {'level': 'info', 'message': f'Starting folder scan: {folder_path}', 'stage': LogEvent.SCAN_START.value, 'session_id': session_id}
+        yield {'level': 'info', 'message': f'Session started: {session_id}', 'stage': 'session_info', 'session_id': session_id}
+
+        matched_files = find_files(folder_path, recursive, file_types_str, effective_date_from, date_to_str)
+        total_files = len(matched_files)
+        ingest_state.total_files = total_files
+        db.session.commit()
+        yield {'level': 'info', 'message': f'Scan found {total_files} matching files.', 'stage': LogEvent.SCAN_COMPLETE.value, 'total_files': total_files, 'session_id': session_id}
+
+        if total_files == 0:
+            ingest_state.cursor_updated_at = start_time
+            yield {'level': 'info', 'message': 'No files to process.', 'stage': LogEvent.DONE.value, 'summary': pipeline.summary(0), 'session_id': session_id}
+            return
+
+        yield from pipeline.process(matched_files)
+
         if not is_cancelled(session_id):
             ingest_state.cursor_updated_at = start_time
-            summary = {'total_files': total_files, 'processed_files': processed_files, 'skipped_files': skipped_files, 'error_files': error_files}
-            yield {'level': 'info', 'message': 'All files processed.', 'stage': LogEvent.DONE.value, 'summary': summary, 'session_id': session_id}
+            yield {'level': 'info', 'message': 'All files processed.', 'stage': LogEvent.DONE.value, 'summary': pipeline.summary(total_files), 'session_id': session_id}
         else:
-            summary = {'total_files': total_files, 'processed_files': processed_files, 'skipped_files': skipped_files, 'error_files': error_files}
-            yield {'level': 'warning', 'message': 'Processing stopped before completion.', 'stage': LogEvent.DONE.value, 'summary': summary, 'session_id': session_id}
+            yield {'level': 'warning', 'message': 'Processing stopped before completion.', 'stage': LogEvent.DONE.value, 'summary': pipeline.summary(total_files), 'session_id': session_id}
 
     except Exception as e:
         error_msg = f"A critical error occurred: {e}\n{traceback.format_exc()}"
         logger.critical(error_msg)
+        db.session.rollback()
         ingest_state.last_error_message = error_msg
         db.session.commit()
         yield {'level': 'critical', 'message': f'A critical error occurred: {str(e)}', 'stage': LogEvent.CRITICAL_ERROR.value, 'session_id': session_id}
     finally:
-        ingest_state.processed = processed_files
-        ingest_state.skipped = skipped_files
-        ingest_state.errors = error_files
+        pipeline.close()
+        ingest_state.processed = pipeline.processed_files
+        ingest_state.skipped = pipeline.skipped_files
+        ingest_state.errors = pipeline.error_files
         ingest_state.last_ended_at = datetime.now(timezone.utc)
         db.session.commit()
+
+
+def _delete_documents(paths):
+    """Delete Documents for removed files, or everything under removed directories; returns deleted paths."""
+    deleted = []
+    for path in paths:
+        prefix = path.rstrip('/') + '/'
+        docs = Document.query.filter(db.or_(Document.file_path == path, Document.file_path.startswith(prefix, autoescape=True))).all()
+        for doc in docs:
+            deleted.append(doc.file_path)
+            db.session.delete(doc)
+    db.session.commit()
+    return deleted
+
+
+def ingest_paths(changed_paths, deleted_paths, workers=None, batch_size=None, roots=None):
+    """Ingest an explicit set of changed files and drop Documents for deleted paths (watch mode).
+
+    Paths are normalized with ``normalize_path``; a deleted path also removes every Document
+    below it, so directory deletes/moves clean up in one step. Changed files are processed
+    before deletes are applied, so a rename (delete + create) re-points the Document instead
+    of converting the file again. ``roots`` bounds move detection (default: every ingested
+    folder). Yields the same events as a folder scan plus ``file_deleted``.
+    """
+    logger = current_app.logger
+    session_id = start_session()
+    if roots is None:
+        roots = ingested_roots()
+    pipeline = _FilePipeline(session_id, workers=workers, batch_size=batch_size, roots=roots)
+    try:
+        changed = list(changed_paths)
+        if changed:
+            yield from pipeline.process(changed)
+        deleted = _delete_documents([normalize_path(p) for p in deleted_paths])
+        for path in deleted:
+            logger.info(f"[Ingestion][{session_id}] DELETE (removed from disk) {path}")
+            yield {'level': 'info', 'message': f'Removed deleted file from index: {path}', 'stage': LogEvent.FILE_DELETED.value, 'session_id': session_id}
+        summary = pipeline.summary(len(changed))
+        summary['deleted_files'] = len(deleted)
+        yield {'level': 'info', 'message': 'Changes applied.', 'stage': LogEvent.DONE.value, 'summary': summary, 'session_id': session_id}
+    except Exception as e:
+        logger.critical(f"A critical error occurred: {e}\n{traceback.format_exc()}")
+        db.session.rollback()
+        yield {'level': 'critical', 'message': f'A critical error occurred: {str(e)}', 'stage': LogEvent.CRITICAL_ERROR.value, 'session_id': session_id}
+    finally:
+        pipeline.close()
         end_session(session_id)
 
 
+# ---------------- Ingestion Sources ---------------- #
+class IngestionSource:
+    """One unit of ingestion work run inside a session: a local folder, the Joplin vault, ...
+
+    Subclasses set ``name``, implement ``iter_events(session_id)`` (yielding the same event
+    dicts as a folder scan, checking ``is_cancelled(session_id)`` between items) and may
+    override ``from_args`` to be startable from ``/api/sources/<name>/stream``.
+    """
+    name = None
+
+    @classmethod
+    def from_args(cls, args):
+        return cls()
+
+    def label(self) -> str:
+        """Shown as ``folder_path`` in session listings."""
+        return self.name
+
+    def params(self) -> dict:
+        return {}
+
+    def iter_events(self, session_id):
+        raise NotImplementedError
+
+
+_SOURCE_TYPES = {}
+# Modules whose import registers further sources (kept lazy: they pull in their own dependencies)
+_SOURCE_PLUGIN_MODULES = ('local_document_search.services.joplin_importer',)
+
+
+def register_source(cls):
+    _SOURCE_TYPES[cls.name] = cls
+    return cls
+
+
+def get_source_type(name):
+    if name not in _SOURCE_TYPES:
+        for module in _SOURCE_PLUGIN_MODULES:
+            importlib.import_module(module)
+    return _SOURCE_TYPES.get(name)
+
+
+@register_source
+class LocalFolderSource(IngestionSource):
+    name = 'local_fs'
+
+    def __init__(self, folder_path, date_from=None, date_to=None, recursive=True, file_types=None,
+                 workers=None, batch_size=None):
+        self.folder_path = folder_path
+        self.date_from = date_from
+        self.date_to = date_to
+        self.recursive = recursive
+        self.file_types = file_types
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def label(self):
+        return self.folder_path
+
+    def params(self):
+        return {'date_from': self.date_from, 'date_to': self.date_to,
+                'recursive': self.recursive, 'file_types': self.file_types}
+
+    def iter_events(self, session_id):
+        yield from _ingest_folder(session_id, self.folder_path, self.date_from, self.date_to, self.recursive,
+                                  self.file_types, workers=self.workers, batch_size=self.batch_size)
+
+
+def _open_session(source, mode):
+    session_id = start_session()
+    sess = _get_sessions()[session_id]
+    sess['mode'] = mode
+    sess['source'] = source.name
+    sess['folder_path'] = source.label()
+    sess['params'] = source.params()
+    return session_id
+
+
+def _with_control_events(session_id, events):
+    # Sources that block between items still surface CANCEL_ACK with their next event
+    for evt in events:
+        yield from _drain_control_events(session_id)
+        yield evt
+
+
+def run_source(source):
+    """Run ``source`` synchronously, yielding its events; the session ends with the generator."""
+    session_id = _open_session(source, 'sync')
+    try:
+        yield from _with_control_events(session_id, source.iter_events(session_id))
+    finally:
+        end_session(session_id)
+
+
+def run_local_ingestion(folder_path, date_from_str, date_to_str, recursive, file_types_str,
+                        workers=None, batch_size=None):
+    """Generator yielding structured SSE dicts for ingestion progress."""
+    yield from run_source(LocalFolderSource(folder_path, date_from_str, date_to_str, recursive, file_types_str,
+                                            workers=workers, batch_size=batch_size))
+
+
 # ---------------- Asynchronous Ingestion (Background Thread) ---------------- #
+class _Subscriber:
+    """Bounded per-client event queue.
+
+    A client that cannot keep up loses its oldest pending events (reported as a warning
+    with the next delivery) instead of blocking the ingestion worker or growing without bound.
+    """
+
+    def __init__(self, maxsize, wake=None):
+        self.queue = deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        # Extra wake-up for subscribers not blocked on the Condition (asyncio clients)
+        self.wake = wake
+
+    def put(self, event):
+        if len(self.queue) >= self.maxsize:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(event)
+
+
+def _notify_subscribers(sess):
+    # caller holds sess['cond']
+    sess['cond'].notify_all()
+    for sub in sess['subscribers']:
+        if sub.wake is not None:
+            sub.wake()
+
+
 def _enqueue(session_id: str, event: dict):
-    sessions = _get_sessions()
-    sess = sessions.get(session_id)
-    if not sess:
-        return
+    sess = _get_sessions().get(session_id)
+    if sess:
+        _publish(sess, session_id, event)
+
+
+def _publish(sess, session_id, event):
     # ensure session_id present
     event.setdefault('session_id', session_id)
-    # push into queue
-    q = sess.setdefault('event_queue', deque())
-    q.append(event)
-    # also store in history (skip verbose debug_state to save space)
-    if event.get('stage') != 'debug_state':
-        hist = sess.setdefault('history', deque(maxlen=1000))
-        hist.append(event)
+    with sess['cond']:
+        # number and log everything except verbose debug_state (not worth replaying)
+        if event.get('stage') != 'debug_state':
+            sess['last_event_id'] += 1
+            event['event_id'] = sess['last_event_id']
+            sess['history'].append(event)
+        for sub in sess['subscribers']:
+            sub.put(event)
+        _notify_subscribers(sess)
+
+
+class _ProgressCoalescer:
+    """Merge per-file events into at most one PROGRESS summary per ``interval`` seconds.
+
+    FILE_PROCESSING / FILE_SUCCESS / FILE_SKIP only update counters and the current file;
+    debug_state heartbeats are dropped (subscribers send their own). Any other event is
+    emitted at once, right after the pending summary so the order stays intact. A summary
+    held back by the rate limit is sent by a timer, so a long conversion does not leave
+    the browser showing the previous file.
+    """
+    COALESCED = {LogEvent.FILE_PROCESSING.value, LogEvent.FILE_SUCCESS.value, LogEvent.FILE_SKIP.value}
+
+    def __init__(self, emit, interval):
+        self.emit = emit
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.timer = None
+        self.last_emit = 0.0
+        self.pending = False
+        self.counts = {'processed': 0, 'skipped': 0, 'errors': 0}
+        self.progress = None
+        self.current_file = None
+
+    def push(self, event):
+        stage = event.get('stage')
+        with self.lock:
+            if stage == 'debug_state':
+                return
+            if stage not in self.COALESCED:
+                self._flush()
+                if stage == LogEvent.FILE_ERROR.value:
+                    self.counts['errors'] += 1
+                self.emit(event)
+                return
+            if stage == LogEvent.FILE_PROCESSING.value:
+                self.progress = event.get('progress', self.progress)
+                self.current_file = event.get('current_file', self.current_file)
+            elif stage == LogEvent.FILE_SUCCESS.value:
+                self.counts['processed'] += 1
+            else:
+                self.counts['skipped'] += 1
+            self.pending = True
+            wait = self.last_emit + self.interval - time.monotonic()
+            if wait <= 0:
+                self._flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(wait, self._flush_later)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+
+    def _flush_later(self):
+        with self.lock:
+            self.timer = None
+            self._flush()
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        self.pending = False
+        self.last_emit = time.monotonic()
+        counts = dict(self.counts)
+        message = f"{counts['processed']} processed, {counts['skipped']} skipped, {counts['errors']} failed"
+        if self.current_file:
+            message += f" - {self.current_file}"
+        self.emit({'level': 'info', 'message': message, 'stage': LogEvent.PROGRESS.value,
+                   'progress': self.progress, 'current_file': self.current_file, 'counts': counts})
+
+
+def _mark_done(session_id: str):
+    sess = _get_sessions().get(session_id)
+    if sess:
+        with sess['cond']:
+            sess['done'] = True
+            _notify_subscribers(sess)
+
+
+def set_session_priority(session_id: str, priority) -> bool:
+    """Change a session's share of the global conversion budget (1 = default, up to 10)."""
+    sess = _get_sessions().get(session_id)
+    if not sess:
+        return False
+    sess['priority'] = clamp_priority(priority)
+    scheduler = get_scheduler()
+    if scheduler is not None and sess.get('mode') == 'async':
+        scheduler.set_priority(session_id, sess['priority'])
+    return True
 
 
-def start_async_ingestion(folder_path, date_from_str, date_to_str, recursive, file_types_str):
-    """Start ingestion in a background thread; returns session_id immediately.
+def start_async_source(source, priority=None):
+    """Run ``source`` in a background thread; returns session_id immediately.
 
-    SSE clients can then poll events via poll_async_session(session_id) generator.
+    SSE clients then follow the session via stream_async_session(session_id). File
+    conversions go through the shared scheduler with the given ``priority``.
     """
-    logger = current_app.logger
-    conversion_service = build_conversion_service()
-    session_id = start_session()
+    session_id = _open_session(source, 'async')
     sessions = _get_sessions()
-    sessions[session_id]['mode'] = 'async'
-    sessions[session_id]['folder_path'] = folder_path
-    sessions[session_id]['params'] = {
-        'date_from': date_from_str,
-        'date_to': date_to_str,
-        'recursive': recursive,
-        'file_types': file_types_str
-    }
-
     app = current_app._get_current_object()
+    sess = sessions[session_id]
+    set_session_priority(session_id, priority)
+    interval = float(app.config.get('SSE_PROGRESS_INTERVAL', 0.1))
+
+    def emit(evt):
+        _publish(sess, session_id, evt)
 
     def worker():
-        with app.app_context():
-            start_time = datetime.now(timezone.utc)
-            ingest_state = db.session.query(IngestState).filter_by(
-                source=current_app.config['SOURCE_LOCAL_FS'], scope_key=folder_path).first()
-            if not ingest_state:
-                ingest_state = IngestState(source=current_app.config['SOURCE_LOCAL_FS'], scope_key=folder_path)
-                db.session.add(ingest_state)
-            ingest_state.last_started_at = start_time
-            ingest_state.last_error_message = None
-            db.session.commit()
-
-            effective_date_from = date_from_str
-            if not date_from_str and ingest_state.cursor_updated_at:
-                effective_date_from = ingest_state.cursor_updated_at.isoformat()
-
-            processed_files = skipped_files = error_files = 0
+        # Own DB session per worker thread, rolled back on failure and removed when the run ends
+        with worker_context(app):
+            coalescer = _ProgressCoalescer(emit, interval) if interval > 0 else None
             try:
-                _enqueue(session_id, {'level': 'info', 'message': f'Starting folder scan: {folder_path}', 'stage': LogEvent.SCAN_START.value})
-                _enqueue(session_id, {'level': 'info', 'message': f'Session started: {session_id}', 'stage': 'session_info'})
-
-                matched_files = find_files(folder_path, recursive, file_types_str, effective_date_from, date_to_str)
-                total_files = len(matched_files)
-                ingest_state.total_files = total_files
-                db.session.commit()
-                _enqueue(session_id, {'level': 'info', 'message': f'Scan found {total_files} matching files.', 'stage': LogEvent.SCAN_COMPLETE.value, 'total_files': total_files})
-
-                if total_files == 0:
-                    summary = {'total_files': 0, 'processed_files': 0, 'skipped_files': 0, 'error_files': 0}
-                    ingest_state.cursor_updated_at = start_time
-                    db.session.commit()
-                    _enqueue(session_id, {'level': 'info', 'message': 'No files to process.', 'stage': LogEvent.DONE.value, 'summary': summary})
-                    return
-
-                for i, file_path in enumerate(matched_files):
-                    if is_cancelled(session_id):
-                        _enqueue(session_id, {'level': 'warning', 'message': 'Stopping before next file (cancelled).', 'stage': LogEvent.CANCELLED.value})
-                        break
-                    # Drain control events
-                    ctrl_events = sessions.get(session_id, {}).get('control_events', [])
-                    while ctrl_events:
-                        _enqueue(session_id, ctrl_events.pop(0))
-
-                    qlen = len(sessions.get(session_id, {}).get('control_events', []))
-                    _enqueue(session_id, {
-                        'level': 'info',
-                        'message': f"Heartbeat: i={i} stop={is_cancelled(session_id)} queue={qlen}",
-                        'stage': 'debug_state'
-                    })
-
-                    progress = int(((i + 1) / total_files) * 100)
-                    metadata = get_file_metadata(file_path)
-                    if not metadata:
-                        skipped_files += 1
-                        logger.warning(f"[Ingestion][{session_id}] SKIP (metadata unavailable) {file_path}")
-                        _enqueue(session_id, {'level': 'warning', 'message': f'Could not get metadata for {file_path}, skipping.', 'stage': LogEvent.FILE_SKIP.value})
-                        continue
-
-                    logger.info(f"[Ingestion][{session_id}] PROCESS {i+1}/{total_files} :: {metadata['file_name']}")
-                    _enqueue(session_id, {'level': 'info', 'message': f"Processing file {i+1}/{total_files}: {metadata['file_name']}", 'stage': LogEvent.FILE_PROCESSING.value, 'progress': progress, 'current_file': metadata['file_name']})
-
-                    # Sidecar metadata
-                    source_url = None
-                    try:
-                        meta_path = file_path + '.meta.json'
-                        if os.path.exists(meta_path):
-                            with open(meta_path, 'r', encoding='utf-8') as f:
-                                mdata = json.load(f)
-                                source_url = mdata.get('source_url')
-                    except Exception as e:
-                        logger.warning(f"Could not read metadata for {file_path}: {e}")
-
-                    source = current_app.config['SOURCE_LOCAL_FS']
-                    download_path = current_app.config.get('DOWNLOAD_PATH')
-                    if download_path:
-                        try:
-                            norm_download = os.path.normpath(download_path)
-                            norm_file = os.path.normpath(file_path)
-                            if norm_file.startswith(norm_download + os.sep):
-                                rel = os.path.relpath(norm_file, norm_download)
-                                parts = rel.split(os.sep)
-                                if len(parts) > 1:
-                                    source = f"公众号_{parts[0]}"
-                        except Exception as e:
-                            logger.warning(f"Could not derive source from DOWNLOAD_PATH for {file_path}: {e}")
-
-                    existing_doc = Document.query.filter(Document.file_path.ilike(metadata['file_path'])).first()
-                    if existing_doc and existing_doc.file_modified_time == metadata['file_modified_time']:
-                        skipped_files += 1
-                        logger.info(f"[Ingestion][{session_id}] SKIP (unchanged) {file_path}")
-                        _enqueue(session_id, {'level': 'info', 'message': f'Skipping unchanged file: {file_path}', 'stage': LogEvent.FILE_SKIP.value, 'reason': 'unchanged'})
-                        continue
-
-                    result: ConversionResult = conversion_service.convert(file_path, metadata['file_type'])
-                    if not result.success:
-                        error_files += 1
-                        if existing_doc:
-                            existing_doc.status = 'failed'
-                            existing_doc.error_message = result.error
-                            existing_doc.source = source
-                            existing_doc.source_url = source_url
-                        else:
-                            db.session.add(Document(
-                                file_name=metadata['file_name'], file_type=metadata['file_type'],
-                                file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
-                                file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
-                                status='failed', error_message=result.error, source=source, source_url=source_url
-                            ))
-                        logger.error(f"[Ingestion][{session_id}] ERROR converting: {file_path} :: {result.error}")
-                        _enqueue(session_id, {'level': 'error', 'message': f'Failed to convert file: {file_path}. Reason: {result.error}', 'stage': LogEvent.FILE_ERROR.value})
+                for evt in _with_control_events(session_id, source.iter_events(session_id)):
+                    if coalescer is None:
+                        emit(evt)
                     else:
-                        if existing_doc:
-                            existing_doc.file_size = metadata['file_size']
-                            existing_doc.file_modified_time = metadata['file_modified_time']
-                            existing_doc.markdown_content = result.content
-                            existing_doc.conversion_type = result.conversion_type
-                            existing_doc.status = 'completed'
-                            existing_doc.error_message = None
-                            existing_doc.source = source
-                            existing_doc.source_url = source_url
-                        else:
-                            db.session.add(Document(
-                                file_name=metadata['file_name'], file_type=metadata['file_type'],
-                                file_size=metadata['file_size'], file_created_at=metadata['file_created_at'],
-                                file_modified_time=metadata['file_modified_time'], file_path=metadata['file_path'],
-                                markdown_content=result.content, conversion_type=result.conversion_type, status='completed',
-                                source=source, source_url=source_url
-                            ))
-                        processed_files += 1
-                        logger.info(f"[Ingestion][{session_id}] SUCCESS {file_path}")
-                        _enqueue(session_id, {'level': 'info', 'message': f'Successfully processed: {file_path}', 'stage': LogEvent.FILE_SUCCESS.value})
-
-                    db.session.commit()
-
-                    if is_cancelled(session_id):
-                        _enqueue(session_id, {'level': 'warning', 'message': '当前文件完成后停止 (stopped after current file).', 'stage': LogEvent.CANCELLED.value})
-                        break
-
-                # Summary
-                summary = {'total_files': len(matched_files), 'processed_files': processed_files, 'skipped_files': skipped_files, 'error_files': error_files}
-                if not is_cancelled(session_id):
-                    ingest_state.cursor_updated_at = start_time
-                    _enqueue(session_id, {'level': 'info', 'message': 'All files processed.', 'stage': LogEvent.DONE.value, 'summary': summary})
-                else:
-                    _enqueue(session_id, {'level': 'warning', 'message': 'Processing stopped before completion.', 'stage': LogEvent.DONE.value, 'summary': summary})
-            except Exception as e:
-                error_msg = f"A critical error occurred: {e}\n{traceback.format_exc()}"
-                logger.critical(error_msg)
-                ingest_state.last_error_message = error_msg
-                db.session.commit()
-                _enqueue(session_id, {'level': 'critical', 'message': f'A critical error occurred: {str(e)}', 'stage': LogEvent.CRITICAL_ERROR.value})
+                        coalescer.push(evt)
             finally:
-                ingest_state.processed = processed_files
-                ingest_state.skipped = skipped_files
-                ingest_state.errors = error_files
-                ingest_state.last_ended_at = datetime.now(timezone.utc)
-                db.session.commit()
+                if coalescer is not None:
+                    coalescer.close()
                 # Mark session done (do not end immediately to allow late consumers)
-                sessions[session_id]['done'] = True
+                _mark_done(session_id)
 
     t = threading.Thread(target=worker, name=f"ingest-{session_id}", daemon=True)
     t.start()
@@ -496,37 +768,145 @@ def start_async_ingestion(folder_path, date_from_str, date_to_str, recursive, fi
     return session_id
 
 
-def stream_async_session(session_id: str):
-    """Generator for SSE that streams events from async session queue.
+def start_async_ingestion(folder_path, date_from_str, date_to_str, recursive, file_types_str,
+                          workers=None, batch_size=None, priority=None):
+    """Start folder ingestion in a background thread; returns session_id immediately."""
+    return start_async_source(LocalFolderSource(folder_path, date_from_str, date_to_str, recursive, file_types_str,
+                                                workers=workers, batch_size=batch_size), priority=priority)
+
+
+def _events_after(sess, session_id, after_event_id):
+    """Logged events with ``event_id`` > ``after_event_id``; caller holds the session Condition.
+
+    Events already trimmed from the bounded log are reported by one EVENTS_DROPPED warning.
+    """
+    events = [evt for evt in sess['history'] if evt['event_id'] > after_event_id]
+    first = events[0]['event_id'] if events else sess['last_event_id'] + 1
+    missed = first - after_event_id - 1
+    if missed > 0:
+        events.insert(0, {'level': 'warning', 'message': f'{missed} earlier event(s) no longer available.',
+                          'stage': LogEvent.EVENTS_DROPPED.value, 'session_id': session_id})
+    return events
+
+
+def get_session_events(session_id: str, after_event_id: int = 0):
+    """Snapshot of the session's event log after ``after_event_id`` (None if the session is gone)."""
+    sess = _get_sessions().get(session_id)
+    if not sess:
+        return None
+    with sess['cond']:
+        return _events_after(sess, session_id, after_event_id)
+
+
+def _subscribe(sess, session_id, after_event_id, wake=None):
+    """Register a subscriber; returns it with the logged events it has to replay first."""
+    sub = _Subscriber(int(current_app.config.get('SSE_SUBSCRIBER_QUEUE_SIZE', 1000)), wake)
+    with sess['cond']:
+        replay = _events_after(sess, session_id, after_event_id)
+        sess['subscribers'].append(sub)
+    return sub, replay
 
-    Continues until session marked done and queue drained OR session gone."""
-    heartbeat_interval = 2.0
-    last_hb = 0.0
-    while True:
-        sessions = _get_sessions()
-        sess = sessions.get(session_id)
-        if not sess:
-            break
-        q = sess.get('event_queue')
-        emitted = False
-        while q:
-            evt = q.popleft()
-            yield evt
-            emitted = True
-        now = time.time()
-        if now - last_hb >= heartbeat_interval:
-            last_hb = now
-            yield {
-                'level': 'info',
-                'message': f"Async heartbeat stop={sess.get('stop')} done={sess.get('done')} q={len(q)}",
-                'stage': 'debug_state',
-                'session_id': session_id
-            }
-        if sess.get('done') and not q:
-            # Grace period done
-            break
-        if not emitted:
-            time.sleep(0.3)
 
+def _unsubscribe(sess, sub):
+    with sess['cond']:
+        if sub in sess['subscribers']:
+            sess['subscribers'].remove(sub)
+
+
+def _take(sess, sub, session_id):
+    """Pending events of ``sub`` (plus an EVENTS_DROPPED notice) and whether the session is finished."""
+    with sess['cond']:
+        batch = list(sub.queue)
+        sub.queue.clear()
+        dropped, sub.dropped = sub.dropped, 0
+        finished = sess['done']
+    if dropped:
+        batch.insert(0, {'level': 'warning', 'message': f'{dropped} event(s) skipped (client too slow).',
+                         'stage': LogEvent.EVENTS_DROPPED.value, 'session_id': session_id})
+    return batch, finished
+
+
+def _heartbeat(sess, session_id):
+    return {
+        'level': 'info',
+        'message': f"Async heartbeat stop={sess.get('stop')} done={sess.get('done')} subscribers={len(sess['subscribers'])}",
+        'stage': 'debug_state',
+        'session_id': session_id
+    }
 
 
+def stream_async_session(session_id: str, after_event_id: int = 0):
+    """Generator for SSE that follows an async session as one of its subscribers.
+
+    Logged events numbered above ``after_event_id`` are replayed first: 0 (a new stream)
+    delivers everything since the session started, a client's Last-Event-ID only what it
+    missed. Then blocks on the session's Condition between events (no polling); a
+    debug_state heartbeat is emitted only after SSE_HEARTBEAT_SECONDS of silence.
+    Ends once the session is done and drained, or gone.
+    """
+    heartbeat_interval = float(current_app.config.get('SSE_HEARTBEAT_SECONDS', 15.0))
+    sess = _get_sessions().get(session_id)
+    if not sess:
+        return
+    sub, replay = _subscribe(sess, session_id, after_event_id)
+    try:
+        yield from replay
+        while True:
+            with sess['cond']:
+                if not sub.queue and not sess['done']:
+                    sess['cond'].wait(heartbeat_interval)
+            batch, finished = _take(sess, sub, session_id)
+            yield from batch
+            if finished:
+                break
+            if not batch:
+                if session_id not in _get_sessions():
+                    break
+                yield _heartbeat(sess, session_id)
+    finally:
+        _unsubscribe(sess, sub)
+
+
+async def astream_async_session(session_id: str, after_event_id: int = 0):
+    """Async generator twin of stream_async_session for the ASGI front end.
+
+    Waits on an asyncio.Event set from the publishing thread, so an idle client costs
+    neither a thread nor CPU. Must run inside an app context.
+    """
+    heartbeat_interval = float(current_app.config.get('SSE_HEARTBEAT_SECONDS', 15.0))
+    sess = _get_sessions().get(session_id)
+    if not sess:
+        return
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:  # loop already closed (server shutting down)
+            pass
+
+    sub, replay = _subscribe(sess, session_id, after_event_id, wake)
+    try:
+        for evt in replay:
+            yield evt
+        while True:
+            with sess['cond']:
+                idle = not sub.queue and not sess['done']
+            if idle:
+                try:
+                    await asyncio.wait_for(ready.wait(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    pass
+            ready.clear()
+            batch, finished = _take(sess, sub, session_id)
+            for evt in batch:
+                yield evt
+            if finished:
+                break
+            if not batch:
+                if session_id not in _get_sessions():
+                    break
+                yield _heartbeat(sess, session_id)
+    finally:
+        _unsubscribe(sess, sub)
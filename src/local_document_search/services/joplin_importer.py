@@ -0,0 +1,514 @@
+"""Joplin note import through the Joplin Data API (Web Clipper service).
+
+Public:
+    JoplinImporter(app).run(full_resync=False, test_note_ids=None) -> dict
+    JoplinImporter(app).iter_run(session_id=None, ...) -> ingestion events
+    JoplinSource(full_resync=False) -- ingestion source for sessions / SSE (``/api/sources/joplin/stream``)
+
+The first run (or ``full_resync``) pages through every note. Afterwards the importer is
+driven by Joplin's ``/events`` change feed: the cursor is persisted in
+``IngestState.cursor_token`` and each run only fetches the bodies of notes created or
+updated since then, and removes the Documents of deleted notes. The head cursor is read
+*before* a full sync starts, so notes edited while it runs are picked up by the next run.
+
+HTTP fetches run on a small thread pool (JOPLIN_FETCH_WORKERS) a few pages / notes ahead
+of the conversion loop. Existing Documents are loaded once per run into a note id map and
+each page is written with bulk insert/update statements.
+
+Note bodies go through the text converter registry by markup language: Markdown notes are
+stored as-is, HTML notes (web clips) are converted. HTML conversions are cached on disk
+under ``CACHE_DIR/joplin`` keyed by note id + ``updated_time``, so a resync (full resync,
+renamed folder) does not convert unchanged notes again.
+"""
+import os
+import tempfile
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import count, islice
+import requests
+import sqlalchemy as sa
+from flask import current_app
+from local_document_search.extensions import db
+from local_document_search.models import Document, IngestState, ConversionType
+from local_document_search.services.converters import convert_text_to_markdown
+from local_document_search.services.ingestion_manager import IngestionSource, is_cancelled, register_source
+from local_document_search.services.log_events import LogEvent
+
+NOTE_FIELDS = 'id,parent_id,title,body,created_time,updated_time,source_url,markup_language'
+ITEM_TYPE_NOTE = 1
+EVENT_TYPE_DELETED = 3
+# Joplin's MarkupToHtml constants
+MARKUP_LANGUAGE_MARKDOWN = 1
+MARKUP_LANGUAGE_HTML = 2
+
+
+def _same_instant(stored, current):
+    # SQLite hands timestamps back without tzinfo; they were written as UTC
+    if stored is not None and stored.tzinfo is None:
+        stored = stored.replace(tzinfo=timezone.utc)
+    return stored == current
+
+
+def _note_id_from_path(file_path):
+    return file_path.rsplit('__', 1)[-1]
+
+
+class NoteBodyCache:
+    """Converted note bodies on disk: ``<root>/<id[:2]>/<id>.<updated_time>.md``; older versions are replaced."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, note_id):
+        return os.path.join(self.root, note_id[:2])
+
+    def _path(self, note_id, updated_time):
+        return os.path.join(self._dir(note_id), f"{note_id}.{updated_time}.md")
+
+    def get(self, note_id, updated_time):
+        try:
+            with open(self._path(note_id, updated_time), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, note_id, updated_time, content):
+        directory = self._dir(note_id)
+        os.makedirs(directory, exist_ok=True)
+        self.discard(note_id)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp, self._path(note_id, updated_time))
+
+    def discard(self, note_id):
+        try:
+            names = os.listdir(self._dir(note_id))
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(f"{note_id}.") and name.endswith('.md'):
+                try:
+                    os.remove(os.path.join(self._dir(note_id), name))
+                except OSError:
+                    pass
+
+
+def _tag(evt, session_id):
+    return dict(evt, session_id=session_id) if session_id else evt
+
+
+def _with_session(events, session_id):
+    """Re-yield ``events`` tagged with ``session_id``, passing the generator's return value through."""
+    while True:
+        try:
+            evt = next(events)
+        except StopIteration as stop:
+            return stop.value
+        yield _tag(evt, session_id)
+
+
+def _prefetch(executor, fn, items, depth):
+    """Yield ``fn(item)`` in input order while keeping up to ``depth`` calls running ahead."""
+    items = iter(items)
+    pending = deque(executor.submit(fn, item) for item in islice(items, depth))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield result
+
+
+class JoplinImporter:
+    def __init__(self, app):
+        self.app = app
+        self.api_url = app.config['JOPLIN_API_URL'].rstrip('/')
+        self.api_token = app.config['JOPLIN_API_TOKEN']
+        self.logger = app.logger
+        self.session = requests.Session()
+        self.session.params = {'token': self.api_token}
+        self.folders_map = {}
+        self.source_name = app.config['SOURCE_JOPLIN']
+        self.batch_size = app.config['JOPLIN_IMPORT_BATCH_SIZE']
+        self.fetch_workers = max(1, int(app.config.get('JOPLIN_FETCH_WORKERS', 4)))
+        self.body_cache = (NoteBodyCache(os.path.join(app.config['CACHE_DIR'], 'joplin'))
+                           if app.config.get('JOPLIN_NOTE_CACHE', True) else None)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.fetch_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _api_get(self, endpoint, params=None, allow_missing=False):
+        """Helper for making GET requests to Joplin API; returns None for a 404 when ``allow_missing``."""
+        try:
+            response = self.session.get(f"{self.api_url}/{endpoint}", params=params)
+            if allow_missing and response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Joplin API request failed for endpoint '{endpoint}': {e}")
+            raise
+
+    def _build_folder_map(self):
+        """Fetches all folders and builds a map for path construction."""
+        self.logger.info("Fetching all folders from Joplin...")
+        self.folders_map = {}
+        page = 1
+        while True:
+            result = self._api_get('folders', {'fields': 'id,parent_id,title', 'page': page})
+            for f in result.get('items', []):
+                self.folders_map[f['id']] = {'parent_id': f.get('parent_id', ''), 'title': f['title']}
+            if not result.get('has_more'):
+                break
+            page += 1
+        self.logger.info(f"Built map for {len(self.folders_map)} folders.")
+
+    def _get_folder_path(self, note_parent_id):
+        """Builds the folder path for a note from the folder map."""
+        if not self.folders_map:
+            self._build_folder_map()
+
+        path_parts = []
+        current_id = note_parent_id
+        while current_id:
+            folder = self.folders_map.get(current_id)
+            if folder:
+                path_parts.append(folder['title'])
+                current_id = folder.get('parent_id', '')
+            else:
+                break  # Should not happen in a consistent DB
+        return "/".join(reversed(path_parts))
+
+    def _convert_ms_to_datetime(self, ms_timestamp):
+        """Converts millisecond timestamp to timezone-aware datetime."""
+        if not ms_timestamp:
+            return None
+        return datetime.fromtimestamp(ms_timestamp / 1000.0, tz=timezone.utc)
+
+    def _note_path(self, note):
+        return f"joplin://{self._get_folder_path(note.get('parent_id'))}/{note['title']}__{note['id']}"
+
+    def _existing_notes(self):
+        """Map note id -> (document id, file_path, file_modified_time) of every Joplin Document, in one query.
+
+        The note id is the stable part of the path (title and folder may change), so notes are
+        matched through this map rather than with per-id ``LIKE '%__<id>'`` filters.
+        """
+        query = db.session.query(Document.id, Document.file_path, Document.file_modified_time).filter(
+            Document.source == self.source_name)
+        return {_note_id_from_path(row.file_path): (row.id, row.file_path, row.file_modified_time) for row in query}
+
+    def _convert_body(self, note, file_type):
+        """Markdown for a note body; HTML conversions are served from / stored in the body cache."""
+        cacheable = self.body_cache is not None and file_type != 'md'
+        if cacheable:
+            cached = self.body_cache.get(note['id'], note['updated_time'])
+            if cached is not None:
+                return cached, ConversionType.HTML_TO_MD
+        result = convert_text_to_markdown(note['body'], file_type)
+        if not result.success:
+            raise ValueError(result.error)
+        if cacheable:
+            self.body_cache.put(note['id'], note['updated_time'], result.content)
+        return result.content, result.conversion_type
+
+    def _note_doc_data(self, note, file_path, note_updated_time):
+        body = note.get('body') or ''
+        file_type = 'html' if note.get('markup_language') == MARKUP_LANGUAGE_HTML else 'md'
+        if body:
+            markdown_content, conversion_type = self._convert_body(note, file_type)
+        else:
+            markdown_content, conversion_type = "", ConversionType.DIRECT
+        return {
+            'file_name': note['title'],
+            'file_type': file_type,
+            'file_size': len(body.encode('utf-8')),
+            'file_created_at': self._convert_ms_to_datetime(note['created_time']),
+            'file_modified_time': note_updated_time,
+            'file_path': file_path,
+            'markdown_content': markdown_content,
+            'conversion_type': conversion_type,
+            'status': 'completed',
+            'error_message': None,
+            'source': self.source_name,
+            'source_url': note.get('source_url', ''),
+        }
+
+    def _write_page(self, notes, existing, ingest_state):
+        """Convert one page of notes, write it with bulk insert/update statements and yield per-note events."""
+        inserts, updates, outcomes = [], [], []
+        for note in notes:
+            note_updated_time = self._convert_ms_to_datetime(note['updated_time'])
+            try:
+                file_path = self._note_path(note)
+                current = existing.get(note['id'])
+                if current and _same_instant(current[2], note_updated_time) and current[1] == file_path:
+                    self.logger.debug(f"Skipping unchanged note: {note['title']}")
+                    ingest_state.skipped += 1
+                    outcomes.append({'level': 'info', 'message': f"Skipping unchanged note: {note['title']}",
+                                     'stage': LogEvent.FILE_SKIP.value, 'reason': 'unchanged'})
+                    continue
+                doc_data = self._note_doc_data(note, file_path, note_updated_time)
+                if current:
+                    self.logger.info(f"Updating note: {note['title']}")
+                    updates.append(dict(doc_data, id=current[0]))
+                else:
+                    self.logger.info(f"Adding new note: {note['title']}")
+                    inserts.append(doc_data)
+                    # Guard against the same note showing up twice (listing shifted by concurrent edits)
+                    existing[note['id']] = (None, file_path, note_updated_time)
+                ingest_state.processed += 1
+                outcomes.append({'level': 'info', 'message': f'Successfully processed: {file_path}',
+                                 'stage': LogEvent.FILE_SUCCESS.value})
+            except Exception as e:
+                self.logger.error(f"Failed to process note ID {note.get('id')}: {e}")
+                ingest_state.errors += 1
+                outcomes.append({'level': 'error', 'message': f"Failed to convert note: {note.get('title')}. Reason: {e}",
+                                 'stage': LogEvent.FILE_ERROR.value})
+        if inserts:
+            db.session.bulk_insert_mappings(Document, inserts)
+        if updates:
+            db.session.bulk_update_mappings(Document, updates)
+        db.session.commit()
+        yield from outcomes
+
+    def _delete_notes(self, existing, note_ids):
+        """Bulk-delete the Documents of ``note_ids``; returns their file paths."""
+        found = [existing[note_id] for note_id in note_ids if note_id in existing and existing[note_id][0] is not None]
+        if self.body_cache is not None:
+            for note_id in note_ids:
+                self.body_cache.discard(note_id)
+        doc_ids = [doc_id for doc_id, _, _ in found]
+        for start in range(0, len(doc_ids), self.batch_size):
+            chunk = doc_ids[start:start + self.batch_size]
+            db.session.execute(sa.delete(Document.__table__).where(Document.__table__.c.id.in_(chunk)))
+        if doc_ids:
+            self.logger.info(f"Removed {len(doc_ids)} deleted note(s).")
+        return [file_path for _, file_path, _ in found]
+
+    def _latest_cursor(self):
+        """Current head of the change feed (``/events`` without a cursor returns no items)."""
+        return str(self._api_get('events').get('cursor'))
+
+    def _read_changes(self, cursor):
+        """Follow ``/events`` from ``cursor``; returns (changed note ids, deleted note ids, new cursor)."""
+        changed, deleted = {}, set()
+        while True:
+            result = self._api_get('events', {'cursor': cursor})
+            for event in result.get('items', []):
+                if event.get('item_type') != ITEM_TYPE_NOTE:
+                    continue
+                note_id = event['item_id']
+                if event.get('type') == EVENT_TYPE_DELETED:
+                    changed.pop(note_id, None)
+                    deleted.add(note_id)
+                else:
+                    deleted.discard(note_id)
+                    changed[note_id] = True
+            cursor = str(result.get('cursor', cursor))
+            if not result.get('has_more'):
+                break
+        return list(changed), deleted, cursor
+
+    def _fetch_page(self, page):
+        self.logger.info(f"Fetching page {page} of notes...")
+        return self._api_get('notes', {
+            'fields': NOTE_FIELDS,
+            'limit': self.batch_size,
+            'page': page,
+            # A stable key: ordering by updated_time moves notes edited during the sync across pages
+            'order_by': 'id',
+            'order_dir': 'ASC',
+        })
+
+    def _fetch_note(self, note_id):
+        return note_id, self._api_get(f'notes/{note_id}', {'fields': NOTE_FIELDS}, allow_missing=True)
+
+    def _iter_all_notes(self, executor):
+        # Pages past the end come back empty; the few requested speculatively are simply dropped
+        for result in _prefetch(executor, self._fetch_page, count(1), self.fetch_workers):
+            notes = result.get('items', [])
+            if notes:
+                yield notes
+            if not notes or not result.get('has_more'):
+                break
+
+    def _iter_changed_notes(self, executor, note_ids):
+        """Fetch changed notes concurrently, yielded in page-sized groups; notes gone in the meantime come back as None."""
+        group = []
+        for item in _prefetch(executor, self._fetch_note, note_ids, self.fetch_workers * 2):
+            group.append(item)
+            if len(group) >= self.batch_size:
+                yield group
+                group = []
+        if group:
+            yield group
+
+    def _deleted_events(self, paths):
+        for path in paths:
+            yield {'level': 'info', 'message': f'Removed deleted note from index: {path}', 'stage': LogEvent.FILE_DELETED.value}
+
+    def _full_sync(self, executor, ingest_state, cancelled):
+        """Yield events for a full listing; returns the deleted paths, or None when cancelled."""
+        existing = self._existing_notes()
+        seen = set()
+        for page, notes in enumerate(self._iter_all_notes(executor), start=1):
+            ingest_state.total_files += len(notes)
+            seen.update(note['id'] for note in notes)
+            yield {'level': 'info', 'message': f"Processing page {page} ({len(notes)} notes, {ingest_state.total_files} so far)",
+                   'stage': LogEvent.FILE_PROCESSING.value, 'current_file': notes[-1]['title']}
+            yield from self._write_page(notes, existing, ingest_state)
+            if cancelled():
+                return None
+        # Anything indexed from Joplin that the full listing no longer contains was deleted, unless
+        # the listing shifted under concurrent deletes: confirm each one with a direct lookup
+        unseen = [note_id for note_id in existing if note_id not in seen and existing[note_id][0] is not None]
+        gone = [note_id for note_id, note in _prefetch(executor, self._fetch_note, unseen, self.fetch_workers * 2) if note is None]
+        deleted = self._delete_notes(existing, gone)
+        yield from self._deleted_events(deleted)
+        return deleted
+
+    def _incremental_sync(self, executor, ingest_state, cursor, cancelled):
+        """Yield events for the changes since ``cursor``; returns (deleted paths, new cursor), or None when cancelled."""
+        changed, deleted, cursor = self._read_changes(cursor)
+        self.logger.info(f"Change feed: {len(changed)} changed, {len(deleted)} deleted note(s).")
+        ingest_state.total_files = len(changed)
+        yield {'level': 'info', 'message': f'Change feed: {len(changed)} changed, {len(deleted)} deleted note(s).',
+               'stage': LogEvent.SCAN_COMPLETE.value, 'total_files': len(changed)}
+        existing = self._existing_notes()
+        done = 0
+        for group in self._iter_changed_notes(executor, changed):
+            done += len(group)
+            yield {'level': 'info', 'message': f"Processing notes {done}/{len(changed)}",
+                   'stage': LogEvent.FILE_PROCESSING.value, 'progress': int(done / len(changed) * 100),
+                   'current_file': next((note['title'] for _, note in reversed(group) if note), '')}
+            deleted.update(note_id for note_id, note in group if note is None)
+            notes = [note for _, note in group if note is not None]
+            yield from self._write_page(notes, existing, ingest_state)
+            if cancelled():
+                return None
+        paths = self._delete_notes(existing, deleted)
+        yield from self._deleted_events(paths)
+        return paths, cursor
+
+    def iter_run(self, session_id=None, full_resync=False, test_note_ids=None):
+        """Run the import, yielding ingestion events; must run inside an app context.
+
+        With a ``session_id`` the run stops after the current page once the session is
+        cancelled; the change-feed cursor is then left where it was.
+        """
+        def cancelled():
+            return session_id is not None and is_cancelled(session_id)
+
+        def event(evt):
+            return _tag(evt, session_id)
+
+        self.logger.info("--- Starting Joplin Import ---")
+        ingest_state = db.session.query(IngestState).filter_by(source=self.source_name, scope_key=self.source_name).first()
+        if not ingest_state:
+            ingest_state = IngestState(source=self.source_name, scope_key=self.source_name)
+            db.session.add(ingest_state)
+
+        cursor = None if full_resync else ingest_state.cursor_token
+        start_time = datetime.now(timezone.utc)
+        ingest_state.last_started_at = start_time
+        ingest_state.total_files = 0
+        ingest_state.processed = 0
+        ingest_state.skipped = 0
+        ingest_state.errors = 0
+        ingest_state.last_error_message = None
+        db.session.commit()
+
+        deleted = []
+        stopped = False
+        executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='joplin-fetch')
+        try:
+            mode = 'selected notes' if test_note_ids else (f'incremental from change cursor {cursor}' if cursor else 'full')
+            yield event({'level': 'info', 'message': f'Starting Joplin sync ({mode}).', 'stage': LogEvent.SCAN_START.value})
+            if session_id:
+                yield event({'level': 'info', 'message': f'Session started: {session_id}', 'stage': 'session_info'})
+            self._build_folder_map()
+            if test_note_ids:
+                # Test mode: fetch specific notes, leave the change-feed cursor untouched
+                notes = [self._api_get(f'notes/{note_id}', {'fields': NOTE_FIELDS}) for note_id in test_note_ids]
+                ingest_state.total_files = len(notes)
+                yield from _with_session(self._write_page(notes, self._existing_notes(), ingest_state), session_id)
+            elif cursor:
+                self.logger.info(f"Performing incremental sync from change cursor {cursor}.")
+                result = yield from _with_session(self._incremental_sync(executor, ingest_state, cursor, cancelled), session_id)
+                if result is None:
+                    stopped = True
+                else:
+                    deleted, ingest_state.cursor_token = result
+                    ingest_state.cursor_updated_at = start_time
+            else:
+                self.logger.info("Performing full sync. Fetching all notes.")
+                head = self._latest_cursor()
+                result = yield from _with_session(self._full_sync(executor, ingest_state, cancelled), session_id)
+                if result is None:
+                    stopped = True
+                else:
+                    deleted = result
+                    ingest_state.cursor_token = head
+                    ingest_state.cursor_updated_at = start_time
+            db.session.commit()
+            summary = self._summary(ingest_state, deleted)
+            if stopped:
+                self.logger.info("--- Joplin Import Cancelled ---")
+                yield event({'level': 'warning', 'message': 'Stopping after current page (cancelled).', 'stage': LogEvent.CANCELLED.value})
+                yield event({'level': 'warning', 'message': 'Processing stopped before completion.', 'stage': LogEvent.DONE.value, 'summary': summary})
+            else:
+                self.logger.info("--- Joplin Import Finished Successfully ---")
+                yield event({'level': 'info', 'message': 'All notes processed.', 'stage': LogEvent.DONE.value, 'summary': summary})
+
+        except Exception as e:
+            db.session.rollback()
+            error_msg = f"A critical error occurred: {e}\n{traceback.format_exc()}"
+            self.logger.critical(error_msg)
+            ingest_state.last_error_message = error_msg
+            yield event({'level': 'critical', 'message': f'A critical error occurred: {str(e)}', 'stage': LogEvent.CRITICAL_ERROR.value})
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            ingest_state.last_ended_at = datetime.now(timezone.utc)
+            db.session.commit()
+            self.logger.info(f"Run summary: Total={ingest_state.total_files}, Processed={ingest_state.processed}, "
+                             f"Skipped={ingest_state.skipped}, Errors={ingest_state.errors}, Deleted={len(deleted)}")
+
+    def _summary(self, ingest_state, deleted):
+        return {'total_files': ingest_state.total_files, 'processed_files': ingest_state.processed,
+                'skipped_files': ingest_state.skipped, 'error_files': ingest_state.errors,
+                'deleted_files': len(deleted)}
+
+    def run(self, full_resync=False, test_note_ids=None):
+        """Run the import outside a session (script / tests); returns the run summary."""
+        with self.app.app_context():
+            summary = {}
+            for evt in self.iter_run(full_resync=full_resync, test_note_ids=test_note_ids):
+                summary = evt.get('summary', summary)
+            ingest_state = db.session.query(IngestState).filter_by(source=self.source_name, scope_key=self.source_name).one()
+            return dict(summary, cursor=ingest_state.cursor_token, error=ingest_state.last_error_message)
+
+
+@register_source
+class JoplinSource(IngestionSource):
+    """Joplin vault as an ingestion source (``/api/sources/joplin/stream?full=true``)."""
+    name = 'joplin'
+
+    def __init__(self, full_resync=False):
+        self.full_resync = full_resync
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(full_resync=(args.get('full') or 'false').lower() == 'true')
+
+    def label(self):
+        return 'joplin://'
+
+    def params(self):
+        return {'full_resync': self.full_resync}
+
+    def iter_events(self, session_id):
+        importer = JoplinImporter(current_app._get_current_object())
+        yield from importer.iter_run(session_id=session_id, full_resync=self.full_resync)
@@ -5,9 +5,13 @@ class LogEvent(str, Enum):
     SCAN_START = "scan_start"
     SCAN_COMPLETE = "scan_complete"
     FILE_PROCESSING = "file_processing"
+    PROGRESS = "progress"  # 异步会话：合并后的进度摘要（计数 + 当前文件），限频发送
     FILE_SKIP = "file_skip"
     FILE_SUCCESS = "file_success"
     FILE_ERROR = "file_error"
+    FILE_DELETED = "file_deleted"  # 监听模式：源文件已删除/移走，对应记录已清理
+    FILE_MOVED = "file_moved"  # 内容与已消失的记录一致（大小+SHA-256），改指向新路径而不重新转换
+    EVENTS_DROPPED = "events_dropped"  # SSE 订阅端消费过慢，丢弃了最早的若干条事件
     CANCEL_ACK = "cancel_ack"  # 新增：收到取消请求立即反馈（早于正式cancelled终止事件）
     CANCELLED = "cancelled"
     DONE = "done"
@@ -0,0 +1,133 @@
+"""Local Tesseract OCR engine: tiles very large images and OCRs tiles in a shared process pool.
+
+Public functions:
+    ocr_image(img, lang, ...) -> str
+    ocr_images(images, lang, ...) -> list[str]
+
+Large images are cut into full-width horizontal bands so that reading order is simply
+top-to-bottom; cut rows are moved to the lightest row near the nominal boundary so a
+text line is not sliced in half. All callers share one process pool sized by the
+configured CPU budget, so concurrent conversions cannot oversubscribe the machine.
+
+This module deliberately avoids importing Flask: pool workers import it on spawn.
+"""
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Tuple
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def resolve_max_workers(budget: int | None) -> int:
+    """Translate the configured CPU budget into a worker count (0/None -> half the CPUs)."""
+    cpu = os.cpu_count() or 1
+    if not budget or budget <= 0:
+        return max(1, cpu // 2)
+    return max(1, min(int(budget), cpu))
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pool_workers = max_workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def _ocr_tile(tile, lang: str) -> str:
+    """Pool worker: OCR one tile (PIL images are picklable)."""
+    import pytesseract
+    return pytesseract.image_to_string(tile, lang=lang) or ''
+
+
+def _lightest_row(img, lo: int, hi: int) -> int:
+    """Return the row in [lo, hi) with the highest mean brightness (likely inter-line whitespace)."""
+    from PIL import Image
+    strip = img.crop((0, lo, img.width, hi)).convert('L')
+    # BOX-resampling to width 1 yields the per-row mean in a single C call
+    means = strip.resize((1, hi - lo), Image.Resampling.BOX).tobytes()
+    best = max(range(len(means)), key=lambda i: means[i])
+    return lo + best
+
+
+def plan_tiles(img, tile_height: int, min_pixels: int) -> List[Tuple[int, int]]:
+    """Return (top, bottom) row ranges covering the image, top to bottom.
+
+    Images below ``min_pixels`` stay in one piece; otherwise they are split into bands of
+    roughly ``tile_height`` rows, each boundary snapped to the lightest nearby row.
+    """
+    width, height = img.size
+    if width * height < min_pixels or height <= tile_height or tile_height <= 0:
+        return [(0, height)]
+    search = max(1, tile_height // 10)
+    bands = []
+    top = 0
+    while height - top > tile_height + search:
+        target = top + tile_height
+        cut = _lightest_row(img, target - search, min(height, target + search))
+        bands.append((top, cut))
+        top = cut
+    bands.append((top, height))
+    return bands
+
+
+def ocr_images(images: Iterable, lang: str, max_workers: int = 1,
+               tile_height: int = 2000, min_pixels: int = 12_000_000) -> List[str]:
+    """OCR several PIL images concurrently, returning one text per image in input order.
+
+    Tiles of all images are submitted to the shared pool together; text is stitched back
+    per image in band order. With a single tile overall (or ``max_workers <= 1``) OCR
+    runs inline to avoid pool round-trips.
+    """
+    jobs = []  # (image_index, tile)
+    count = 0
+    for idx, img in enumerate(images):
+        count += 1
+        for top, bottom in plan_tiles(img, tile_height, min_pixels):
+            tile = img if (top, bottom) == (0, img.height) else img.crop((0, top, img.width, bottom))
+            jobs.append((idx, tile))
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        texts = [_ocr_tile(tile, lang) for _, tile in jobs]
+    else:
+        pool = _get_pool(max_workers)
+        futures = [pool.submit(_ocr_tile, tile, lang) for _, tile in jobs]
+        texts = [f.result() for f in futures]
+
+    per_image: List[List[str]] = [[] for _ in range(count)]
+    for (idx, _), text in zip(jobs, texts):
+        if text and text.strip():
+            per_image[idx].append(text.strip())
+    return ['\n'.join(parts) for parts in per_image]
+
+
+def ocr_image(img, lang: str, max_workers: int = 1,
+              tile_height: int = 2000, min_pixels: int = 12_000_000) -> str:
+    return ocr_images([img], lang, max_workers=max_workers, tile_height=tile_height, min_pixels=min_pixels)[0]
+
+
+def ocr_options(config) -> dict:
+    """Build ocr_images keyword arguments from a Flask config mapping."""
+    return {
+        'max_workers': resolve_max_workers(config.get('OCR_MAX_WORKERS', 0)),
+        'tile_height': config.get('OCR_TILE_HEIGHT', 2000),
+        'min_pixels': config.get('OCR_TILE_MIN_PIXELS', 12_000_000),
+    }
@@ -0,0 +1,243 @@
+"""Pooled headless LibreOffice conversion service for legacy Office formats (.doc/.ppt/...).
+
+Public functions:
+    get_office_pool(size, timeout, base_port, profile_root) -> OfficePool
+    OfficePool.convert(src_path, target_ext, filter_name, outdir) -> str | None
+    OfficePool.convert_many(jobs) -> list[str | None]
+
+Each pool slot owns an isolated LibreOffice user profile, so concurrent conversions no
+longer collide on the shared default profile. When the ``uno`` bindings shipped with
+LibreOffice are importable, every slot keeps a long-lived ``soffice --headless`` listening
+on a local socket and conversions are driven over UNO, paying the multi-second startup
+once. Listening ports are probed from the OS each time a slot starts (unless
+LIBREOFFICE_BASE_PORT pins them), so the web server and CLI runs can each keep a pool
+without colliding. Without ``uno`` a slot falls back to a one-shot ``soffice --convert-to`` using its
+own profile. Jobs are bounded by a per-job timeout; a hung or crashed instance is killed
+and restarted before the next job.
+"""
+import os
+import time
+import atexit
+import queue
+import shutil
+import socket
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import uno  # type: ignore  # provided by LibreOffice (e.g. python3-uno), not installable from PyPI
+    from com.sun.star.beans import PropertyValue  # type: ignore
+    _has_uno = True
+except Exception:
+    _has_uno = False
+
+STARTUP_TIMEOUT = 30.0
+
+
+def find_soffice() -> str | None:
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def _free_port() -> int:
+    # Released again before soffice binds it; a lost race only fails that start and the next job retries
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _props(**kwargs):
+    values = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        values.append(prop)
+    return tuple(values)
+
+
+class OfficeInstance:
+    """One pool slot: an isolated profile plus (with UNO) a long-lived listening soffice."""
+
+    def __init__(self, soffice: str, slot: int, port: int, profile_root: str):
+        self.soffice = soffice
+        self.slot = slot
+        self.fixed_port = port  # 0 -> a free port is picked on every start
+        self.port = port
+        self.profile_dir = os.path.join(profile_root, f"slot_{slot}")
+        self.proc = None
+        self.desktop = None
+
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).resolve().as_uri()
+
+    def _base_cmd(self):
+        return [
+            self.soffice, '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+            '--nolockcheck', f"-env:UserInstallation={self.profile_url}",
+        ]
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.desktop is not None
+
+    def start(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.port = self.fixed_port or _free_port()
+        accept = f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        self.proc = subprocess.Popen(self._base_cmd() + [accept], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local_ctx)
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(url)
+                self.desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+                logger.info("LibreOffice slot %d listening on port %d", self.slot, self.port)
+                return
+            except Exception:
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"LibreOffice slot {self.slot} failed to start on port {self.port}")
+                time.sleep(0.5)
+
+    def stop(self):
+        self.desktop = None
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.proc = None
+
+    def ensure_running(self):
+        if not self.is_alive():
+            if self.proc is not None:
+                logger.warning("LibreOffice slot %d is not responding; restarting", self.slot)
+            self.stop()
+            self.start()
+
+    def convert_uno(self, src: Path, dst: Path, filter_name: str):
+        doc = self.desktop.loadComponentFromURL(src.as_uri(), '_blank', 0, _props(Hidden=True, ReadOnly=True))
+        try:
+            doc.storeToURL(dst.as_uri(), _props(FilterName=filter_name, Overwrite=True))
+        finally:
+            doc.close(True)
+
+    def convert_cli(self, src: Path, outdir: Path, target_ext: str, filter_name: str, timeout: float):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        cmd = self._base_cmd() + ['--convert-to', f"{target_ext}:{filter_name}", '--outdir', str(outdir), str(src)]
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout, check=True)
+
+
+class OfficePool:
+    def __init__(self, soffice: str, size: int = 2, timeout: float = 120.0, base_port: int = 0,
+                 profile_root: str = 'cache/lo_profiles', use_uno: bool = _has_uno):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.use_uno = use_uno
+        self._idle = queue.Queue()
+        for slot in range(self.size):
+            self._idle.put(OfficeInstance(soffice, slot, base_port + slot if base_port else 0, profile_root))
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='soffice')
+
+    def _run_uno(self, inst: OfficeInstance, src: Path, dst: Path, filter_name: str):
+        inst.ensure_running()
+        outcome = {}
+
+        def work():
+            try:
+                inst.convert_uno(src, dst, filter_name)
+            except Exception as e:
+                outcome['error'] = e
+
+        t = threading.Thread(target=work, name=f"soffice-job-{inst.slot}", daemon=True)
+        t.start()
+        t.join(self.timeout)
+        if t.is_alive():
+            # Killing the instance disposes the UNO bridge, which unblocks the job thread
+            inst.stop()
+            raise TimeoutError(f"LibreOffice conversion timed out after {self.timeout}s")
+        if 'error' in outcome:
+            if inst.proc is None or inst.proc.poll() is not None:
+                inst.stop()
+            raise outcome['error']
+
+    def convert(self, src_path: str, target_ext: str, filter_name: str, outdir: str) -> str | None:
+        """Convert ``src_path`` into ``outdir/<stem>.<target_ext>``; returns the output path or None."""
+        src = Path(src_path).resolve()
+        out = Path(outdir).resolve()
+        out.mkdir(parents=True, exist_ok=True)
+        dst = out / f"{src.stem}.{target_ext}"
+        inst = self._idle.get()
+        try:
+            if self.use_uno:
+                self._run_uno(inst, src, dst, filter_name)
+            else:
+                inst.convert_cli(src, out, target_ext, filter_name, self.timeout)
+        except Exception as e:
+            logger.error("LibreOffice conversion failed for %s (slot %d): %s", src, inst.slot, e)
+            return None
+        finally:
+            self._idle.put(inst)
+        if not dst.exists():
+            logger.error("LibreOffice conversion completed but output file not found: %s", dst)
+            return None
+        return str(dst)
+
+    def convert_many(self, jobs):
+        """Batch submission: ``jobs`` is an iterable of (src_path, target_ext, filter_name, outdir)."""
+        futures = [self._executor.submit(self.convert, *job) for job in jobs]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_office_pool(size: int = 2, timeout: float = 120.0, base_port: int = 0,
+                    profile_root: str = 'cache/lo_profiles') -> OfficePool | None:
+    """Return the process-wide pool, creating it on first use; None if LibreOffice is not installed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            soffice = find_soffice()
+            if not soffice:
+                return None
+            _pool = OfficePool(soffice, size=size, timeout=timeout, base_port=base_port, profile_root=profile_root)
+        return _pool
+
+
+def office_pool_from_config(config) -> OfficePool | None:
+    """get_office_pool() with sizing taken from a Flask config mapping."""
+    return get_office_pool(
+        size=config.get('LIBREOFFICE_POOL_SIZE', 2),
+        timeout=config.get('LIBREOFFICE_JOB_TIMEOUT', 120),
+        base_port=config.get('LIBREOFFICE_BASE_PORT', 0),
+        profile_root=os.path.join(config.get('CACHE_DIR', 'cache'), 'lo_profiles'),
+    )
+
+
+def shutdown_office_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+atexit.register(shutdown_office_pool)
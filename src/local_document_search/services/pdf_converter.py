@@ -0,0 +1,150 @@
+"""Scanned-PDF support: detect pages without a text layer and OCR only those pages.
+
+Public function:
+    convert_pdf_with_ocr_fallback(file_path: str, convert_text_layer) -> ConversionResult | None
+
+Returns None when the PDF has a usable text layer on every page (or when pypdfium2 /
+Tesseract are unavailable) so the caller keeps the regular MarkItDown path. When at least
+PDF_OCR_SCANNED_RATIO of the pages are textless the PDF counts as scanned and is built
+from the page texts alone; otherwise ``convert_text_layer()`` (MarkItDown) converts it and
+the OCR'd pages are appended. Pages that render blank are never sent to Tesseract.
+"""
+import os
+import shutil
+import threading
+from flask import current_app
+from local_document_search.models import ConversionType
+from local_document_search.services.conversion_result import ConversionResult
+from local_document_search.services.ocr_engine import ocr_images, ocr_options
+
+# pdfium is not thread-safe; serialize document access across ingestion threads
+_pdfium_lock = threading.Lock()
+# Grey-level spread below which a rendered page counts as blank
+BLANK_PAGE_CONTRAST = 16
+
+
+def _tesseract_available() -> bool:
+    try:
+        import pytesseract
+    except Exception:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def _page_texts(pdf) -> list[str]:
+    texts = []
+    for index in range(len(pdf)):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        try:
+            texts.append(textpage.get_text_range() or '')
+        finally:
+            textpage.close()
+            page.close()
+    return texts
+
+
+def _render_pages(pdf, page_indexes, scale):
+    images = []
+    for index in page_indexes:
+        page = pdf[index]
+        try:
+            images.append(page.render(scale=scale).to_pil())
+        finally:
+            page.close()
+    return images
+
+
+def _is_blank(img) -> bool:
+    """True for a page that renders (almost) uniformly: separator pages, empty backs of scans."""
+    thumb = img.convert('L')
+    thumb.thumbnail((128, 128))
+    low, high = thumb.getextrema()
+    return high - low < BLANK_PAGE_CONTRAST
+
+
+def _ocr_sections(texts, indexes):
+    return {i: f"## Page {i + 1}\n\n{texts[i].strip()}" for i in indexes if texts[i] and texts[i].strip()}
+
+
+def _merge_pages(content, sections, page_count):
+    """Put OCR'd pages into MarkItDown's output at their position (pages are form-feed separated)."""
+    pages = content.split('\f')
+    if len(pages) != page_count:
+        # Unexpected layout: keep MarkItDown's text intact and append the OCR'd pages
+        return content.rstrip() + '\n\n' + '\n\n'.join(sections[i] for i in sorted(sections)) + '\n'
+    for index, section in sections.items():
+        pages[index] = section + '\n\n' + pages[index].strip()
+    return '\n\n'.join(page.strip() for page in pages if page.strip()) + '\n'
+
+
+def convert_pdf_with_ocr_fallback(file_path: str, convert_text_layer) -> ConversionResult | None:
+    config = current_app.config
+    if not config.get('PDF_OCR_FALLBACK', True):
+        return None
+    try:
+        import pypdfium2 as pdfium
+    except Exception:
+        current_app.logger.debug("pypdfium2 not installed; skipping scanned-PDF detection for %s", file_path)
+        return None
+
+    min_chars = config.get('PDF_OCR_MIN_TEXT_CHARS', 16)
+    try:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(file_path)
+    except Exception as e:
+        # Encrypted or malformed for pdfium; MarkItDown may still read it, so leave it the regular path
+        current_app.logger.warning(f"pdfium could not open {file_path}; skipping scanned-PDF detection: {e}")
+        return None
+    try:
+        with _pdfium_lock:
+            texts = _page_texts(pdf)
+        textless = [i for i, t in enumerate(texts) if len(t.strip()) < min_chars]
+        if not textless:
+            return None
+        if not _tesseract_available():
+            current_app.logger.warning(f"{len(textless)} page(s) of {file_path} have no text layer but Tesseract is unavailable; OCR skipped.")
+            return None
+
+        scanned = len(textless) >= len(texts) * config.get('PDF_OCR_SCANNED_RATIO', 0.5)
+        current_app.logger.info(
+            f"{'Scanned' if scanned else 'Mixed'} PDF detected: {len(textless)}/{len(texts)} page(s) "
+            f"without text layer in {os.path.basename(file_path)}")
+        lang = config.get('TESSERACT_LANG', 'eng')
+        options = ocr_options(config)
+        scale = config.get('PDF_OCR_DPI', 200) / 72.0
+        # Render a few pages per round so memory stays bounded by the batch, not the file
+        batch = max(1, options['max_workers'] * 2)
+        ocr_pages = []
+        for start in range(0, len(textless), batch):
+            with _pdfium_lock:
+                images = _render_pages(pdf, textless[start:start + batch], scale)
+            pages = [(index, img) for index, img in zip(textless[start:start + batch], images) if not _is_blank(img)]
+            ocr_pages.extend(index for index, _ in pages)
+            for (index, _), text in zip(pages, ocr_images([img for _, img in pages], lang, **options)):
+                texts[index] = text
+            for img in images:
+                img.close()
+    finally:
+        with _pdfium_lock:
+            pdf.close()
+
+    metadata = {'page_count': len(texts), 'ocr_pages': [i + 1 for i in ocr_pages]}
+    if not scanned:
+        result = convert_text_layer()
+        sections = _ocr_sections(texts, ocr_pages)
+        if not result.success or not sections:
+            return result
+        content = _merge_pages(result.content, sections, len(texts))
+        return ConversionResult(success=True, content=content, conversion_type=result.conversion_type, metadata=metadata)
+
+    sections = _ocr_sections(texts, range(len(texts)))
+    if not sections:
+        return ConversionResult(success=False, error=f"OCR produced no text for scanned PDF {file_path}", conversion_type=None, content=None)
+    content = f"# {os.path.basename(file_path)}\n\n" + '\n\n'.join(sections.values()) + '\n'
+    return ConversionResult(
+        success=True,
+        content=content,
+        conversion_type=ConversionType.STRUCTURED_TO_MD,
+        metadata=metadata,
+    )
@@ -0,0 +1,82 @@
+"""Database connection pool usage counters.
+
+Public:
+    install_pool_metrics(app) -> PoolMetrics
+    pool_snapshot(app) -> dict
+
+Counts checkouts / new connections / invalidations on the engine's pool and tracks the
+peak number of connections checked out at once, so a pool that is too small for the
+number of parallel ingestions shows up as ``peak_checked_out`` == size + overflow.
+"""
+import threading
+from sqlalchemy import event
+from local_document_search.extensions import db
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'checkouts': self.checkouts, 'connects': self.connects, 'invalidations': self.invalidations,
+                    'checked_out': self.checked_out, 'peak_checked_out': self.peak_checked_out}
+
+
+def install_pool_metrics(app):
+    """Attach counters to the app's engine pool (once per app)."""
+    if 'pool_metrics' in app.extensions:
+        return app.extensions['pool_metrics']
+    metrics = PoolMetrics()
+    with app.app_context():
+        pool = db.engine.pool
+    event.listen(pool, 'connect', metrics.on_connect)
+    event.listen(pool, 'checkout', metrics.on_checkout)
+    event.listen(pool, 'checkin', metrics.on_checkin)
+    event.listen(pool, 'invalidate', metrics.on_invalidate)
+    app.extensions['pool_metrics'] = metrics
+    return metrics
+
+
+def pool_snapshot(app):
+    """Pool configuration and live usage (QueuePool figures when the pool provides them)."""
+    with app.app_context():
+        pool = db.engine.pool
+    data = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        value = getattr(pool, name, None)
+        if callable(value):
+            try:
+                data[name] = value()
+            except (AttributeError, NotImplementedError, TypeError):
+                pass
+    timeout = getattr(pool, 'timeout', None)
+    if callable(timeout):
+        data['timeout'] = timeout()
+    metrics = app.extensions.get('pool_metrics')
+    if metrics is not None:
+        data.update(metrics.as_dict())
+    return data
@@ -1,9 +1,8 @@
-import os
-import shutil
-import subprocess
 import sys
 from flask import current_app
 from pathlib import Path
+from local_document_search.services.office_pool import office_pool_from_config
+from local_document_search.services.conversion_cache import cached_conversion
 
 # Try to import win32com when on Windows; otherwise fallback to LibreOffice headless (soffice)
 _has_win32 = False
@@ -18,33 +17,39 @@ except Exception:
 
 def convert_ppt_to_pptx(ppt_path: str) -> str | None:
     """
-    使用 Microsoft PowerPoint 的 COM 接口将 .ppt 转换为 .pptx。
+    使用 Microsoft PowerPoint 的 COM 接口（或 LibreOffice）将 .ppt 转换为 .pptx。
+
+    转换结果写入 CACHE_DIR/office 下以源文件哈希命名的缓存文件，不再写到源文件旁边。
 
     Args:
         ppt_path: 待转换的 .ppt 文件的路径。
 
     Returns:
-        转换后的 .pptx 文件路径，如果转换失败则返回 None。
+        缓存中的 .pptx 文件路径，如果转换失败则返回 None。
     """
+    config = current_app.config
+    converted = cached_conversion(
+        ppt_path, 'pptx', _convert_into,
+        config.get('CACHE_DIR', 'cache'), int(config.get('OFFICE_CACHE_MAX_MB', 2048)) * 1024 * 1024,
+    )
+    if converted:
+        current_app.logger.info(f"Using cached .pptx {converted} for {ppt_path}")
+    return converted
+
+
+def _convert_into(ppt_path_obj: Path, staging_dir: Path) -> str | None:
     powerpoint = None
     presentation = None
-    
-    ppt_path_obj = Path(ppt_path).resolve()
-    pptx_path_obj = ppt_path_obj.with_suffix('.pptx')
-
-    # 如果 .pptx 文件已存在，则直接返回
-    if pptx_path_obj.exists():
-        current_app.logger.info(f"Skipping conversion for {pptx_path_obj} as {pptx_path_obj} already exists.")
-        return str(pptx_path_obj)
+    pptx_path_obj = staging_dir / f"{ppt_path_obj.stem}.pptx"
 
     # Prefer Windows COM automation when available
     if _has_win32:
         try:
             pythoncom.CoInitialize()
             powerpoint = win32.gencache.EnsureDispatch('PowerPoint.Application')
-            presentation = powerpoint.Presentations.Open(str(ppt_path_obj), ReadOnly=False)
+            presentation = powerpoint.Presentations.Open(str(ppt_path_obj), ReadOnly=True, WithWindow=False)
             presentation.SaveAs(str(pptx_path_obj), FileFormat=constants.ppSaveAsOpenXMLPresentation)
-            current_app.logger.info(f"Successfully converted {ppt_path_obj} to {pptx_path_obj} via PowerPoint COM")
+            current_app.logger.info(f"Successfully converted {ppt_path_obj} to .pptx via PowerPoint COM")
             return str(pptx_path_obj)
         except Exception as e:
             current_app.logger.error(f"Failed to convert {ppt_path_obj} to .pptx using PowerPoint COM: {e}", exc_info=True)
@@ -66,24 +71,12 @@ def convert_ppt_to_pptx(ppt_path: str) -> str | None:
                 pass
 
     # Fallback to LibreOffice (soffice) headless conversion on non-Windows platforms
-    soffice_path = shutil.which('soffice') or shutil.which('libreoffice')
-    if not soffice_path:
+    # Pooled headless LibreOffice: long-lived instances with isolated profiles (see office_pool)
+    pool = office_pool_from_config(current_app.config)
+    if pool is None:
         current_app.logger.error("LibreOffice (soffice) not found on PATH; cannot convert .ppt to .pptx on this platform.")
         return None
-    try:
-        subprocess.check_call([
-            soffice_path,
-            '--headless',
-            '--convert-to', 'pptx:MS PowerPoint 2007 XML',
-            '--outdir', str(ppt_path_obj.parent),
-            str(ppt_path_obj)
-        ])
-        if pptx_path_obj.exists():
-            current_app.logger.info(f"Successfully converted {ppt_path_obj} to {pptx_path_obj} via LibreOffice")
-            return str(pptx_path_obj)
-        else:
-            current_app.logger.error(f"LibreOffice conversion completed but output file not found: {pptx_path_obj}")
-            return None
-    except subprocess.CalledProcessError as e:
-        current_app.logger.error(f"LibreOffice conversion failed for {ppt_path_obj}: {e}", exc_info=True)
-        return None
+    converted = pool.convert(str(ppt_path_obj), 'pptx', 'MS PowerPoint 2007 XML', str(staging_dir))
+    if converted:
+        current_app.logger.info(f"Successfully converted {ppt_path_obj} to .pptx via LibreOffice")
+    return converted
@@ -1,28 +1,32 @@
-"""Provider factory for MarkItDown instances (OpenAI / Gemini / Local) and conversion service."""
+"""Provider factory for MarkItDown instances (OpenAI / Gemini / Local) and conversion service.
+
+MarkItDown and the provider SDKs (openai, google-genai, dashscope) are imported on first
+use of a provider, so importing this module (app startup, CLI) stays cheap.
+"""
 from typing import Dict, TYPE_CHECKING
 from flask import current_app
-from markitdown import MarkItDown
-from .gemini_adapter import build_markitdown_with_gemini
-from .openai_adapter import build_markitdown_with_openai
-from .qwen_adapter import build_markitdown_with_qwen
 
 if TYPE_CHECKING:  # Avoid runtime import cycles
+    from markitdown import MarkItDown
     from local_document_search.services.conversion.interfaces import ConversionService
 else:
     ConversionService = object  # runtime placeholder to satisfy type checker references
 
-_md_instances: Dict[str, MarkItDown] = {
+_md_instances: Dict[str, "MarkItDown"] = {
     'google-genai': None,  # Gemini
     'openai': None,
     'qwen-ocr': None,
     'local': None,
 }
 
-def get_markitdown_instance(provider: str) -> MarkItDown:
+def get_markitdown_instance(provider: str) -> "MarkItDown":
+    from markitdown import MarkItDown
+
     provider = (provider or 'local').lower()
     if provider == 'google-genai':
         if _md_instances['google-genai'] is None:
             try:
+                from .gemini_adapter import build_markitdown_with_gemini
                 _md_instances['google-genai'] = build_markitdown_with_gemini()
             except Exception as e:  # pragma: no cover - defensive
                 # Log detailed failure including type and repr; suggest checking env
@@ -35,6 +39,7 @@ def get_markitdown_instance(provider: str) -> MarkItDown:
     if provider == 'openai':
         if _md_instances['openai'] is None:
             try:
+                from .openai_adapter import build_markitdown_with_openai
                 _md_instances['openai'] = build_markitdown_with_openai()
             except Exception as e:  # pragma: no cover
                 current_app.logger.exception(
@@ -46,6 +51,7 @@ def get_markitdown_instance(provider: str) -> MarkItDown:
     if provider == 'qwen-ocr':
         if _md_instances['qwen-ocr'] is None:
             try:
+                from .qwen_adapter import build_markitdown_with_qwen
                 _md_instances['qwen-ocr'] = build_markitdown_with_qwen()
             except Exception as e:  # pragma: no cover
                 current_app.logger.exception(
@@ -0,0 +1,240 @@
+"""Orphan reconciliation: follow moved/renamed files and bulk-delete true orphans.
+
+Public:
+    find_moved_document(metadata, root) -> Document | None
+    root_of(path, roots) -> str | None
+    backfill_hashes(root) -> int
+    repoint_document(doc, metadata)
+    reconcile_root(root, recursive=True, file_types_str=None, delete_orphans=True) -> dict
+    ingested_roots() -> list[str]
+    start_reconcile_scheduler(app) -> threading.Thread | None
+
+A file counts as moved when an indexed Document below the same ingestion root, with the
+same size and ``content_sha256``, no longer exists on disk. Instead of converting the file again the Document's path fields
+are re-pointed, so OCR / transcription results survive a reorganisation of the folders.
+Hashes are only computed for files whose size matches such a vanished Document.
+Documents indexed before ``content_sha256`` existed get their hash on the first
+reconcile pass over their root, while their files are still in place.
+"""
+import os
+import time
+import threading
+import traceback
+from collections import defaultdict
+from datetime import datetime, timezone
+import sqlalchemy as sa
+from flask import current_app
+from local_document_search.extensions import db, worker_context
+from local_document_search.models import Document, IngestState
+from local_document_search.services.cleanup_service import SCAN_BATCH_SIZE, find_orphan_files, orphan_scan_ids
+from local_document_search.services.filesystem_scanner import find_files, is_ingestible
+from local_document_search.utils.file_utils import get_file_metadata
+from local_document_search.utils.hash_utils import file_sha256
+
+# Upper bound on same-size Documents inspected per new file (many small files share a size)
+MAX_MOVE_CANDIDATES = 50
+
+_scheduler_lock = threading.Lock()
+_scheduler_thread = None
+
+
+def root_of(path, roots):
+    """The deepest of ``roots`` that contains ``path`` (all normalized), or None."""
+    matches = [root for root in roots if path.startswith(root.rstrip('/') + '/')]
+    return max(matches, key=len) if matches else None
+
+
+def find_moved_document(metadata, root):
+    """Return the vanished Document below ``root`` whose size and SHA-256 match the file described by ``metadata``.
+
+    Candidates are limited to the ingestion root the file was found in: a Document of another
+    root that is merely unmounted would otherwise be taken over by an identical copy.
+    """
+    size = metadata.get('file_size')
+    if not size or not root:
+        # Empty files are all identical; matching them would pair unrelated documents
+        return None
+    rows = db.session.execute(
+        sa.select(Document.id, Document.file_path, Document.content_sha256)
+        .where(Document.file_size == size,
+               Document.content_sha256.isnot(None),
+               Document.file_path.startswith(root.rstrip('/') + '/', autoescape=True),
+               Document.file_path != metadata['file_path'])
+        .limit(MAX_MOVE_CANDIDATES)
+    ).all()
+    missing = [row for row in rows if not os.path.exists(row.file_path)]
+    if not missing:
+        return None
+    try:
+        digest = file_sha256(metadata['file_path'])
+    except OSError:
+        return None
+    for row in missing:
+        if row.content_sha256 == digest:
+            return db.session.get(Document, row.id)
+    return None
+
+
+def repoint_document(doc, metadata):
+    """Move ``doc`` to the new location described by ``metadata`` (committed by the caller)."""
+    doc.file_path = metadata['file_path']
+    doc.file_name = metadata['file_name']
+    doc.file_type = metadata['file_type']
+    doc.file_created_at = metadata['file_created_at']
+    doc.file_modified_time = metadata['file_modified_time']
+
+
+def _same_instant(stored, current):
+    # SQLite hands timestamps back without tzinfo; they were written as UTC
+    if stored is not None and stored.tzinfo is None:
+        stored = stored.replace(tzinfo=timezone.utc)
+    return stored == current
+
+
+def backfill_hashes(root, batch_size=SCAN_BATCH_SIZE):
+    """Hash the files of Documents below ``root`` that have no ``content_sha256`` yet; returns the count.
+
+    Only Documents whose file is unchanged since it was indexed (same size and mtime) are
+    filled in, so the hash always describes the content the Document was converted from.
+    """
+    prefix = root.rstrip('/') + '/'
+    filled = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            sa.select(Document.id, Document.file_path, Document.file_size, Document.file_modified_time)
+            .where(Document.content_sha256.is_(None),
+                   Document.file_path.startswith(prefix, autoescape=True),
+                   Document.id > last_id)
+            .order_by(Document.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        for row in rows:
+            try:
+                st = os.stat(row.file_path)
+                if st.st_size != row.file_size or not _same_instant(
+                        row.file_modified_time, datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)):
+                    continue
+                updates.append({'id': row.id, 'content_sha256': file_sha256(row.file_path)})
+            except OSError:
+                continue
+        if updates:
+            db.session.bulk_update_mappings(Document, updates)
+            filled += len(updates)
+    return filled
+
+
+def _orphans_by_size(connection):
+    by_size = defaultdict(list)
+    rows = connection.execute(
+        sa.select(Document.id, Document.file_size, Document.content_sha256)
+        .join(orphan_scan_ids, orphan_scan_ids.c.id == Document.id)
+    )
+    total = 0
+    for row in rows:
+        total += 1
+        if row.file_size and row.content_sha256:
+            by_size[row.file_size].append((row.id, row.content_sha256))
+    return by_size, total
+
+
+def reconcile_root(root, recursive=True, file_types_str=None, delete_orphans=True, batch_size=SCAN_BATCH_SIZE):
+    """Re-point Documents of files moved within ``root`` and delete the remaining orphans.
+
+    Returns ``{'root', 'hashed', 'orphans', 'moved', 'deleted'}`` (``hashed``: Documents that
+    got their missing hash from ``backfill_hashes``). A root that does not exist (e.g. an
+    unmounted share) is left untouched. With ``delete_orphans=False`` nothing is deleted,
+    which is what ``cli reconcile --dry-run`` uses together with a rollback.
+    """
+    logger = current_app.logger
+    stats = {'root': root, 'hashed': 0, 'orphans': 0, 'moved': 0, 'deleted': 0}
+    if not os.path.isdir(root):
+        logger.warning(f"[Reconcile] root {root} is not a directory; skipping")
+        return stats
+
+    stats['hashed'] = backfill_hashes(root, batch_size=batch_size)
+    find_orphan_files(root, batch_size=batch_size)  # fills orphan_scan_ids for this connection
+    connection = db.session.connection()
+    by_size, stats['orphans'] = _orphans_by_size(connection)
+    if not stats['orphans']:
+        return stats
+
+    moved_ids = []
+    if by_size:
+        for path in find_files(root, recursive, file_types_str):
+            if not is_ingestible(path, file_types_str):
+                continue
+            metadata = get_file_metadata(path)
+            if not metadata or not by_size.get(metadata['file_size']):
+                continue
+            # Same comparison as ingestion, so a case-only difference (Windows) is not a new file
+            if db.session.query(Document.id).filter(Document.file_path.ilike(metadata['file_path'])).first():
+                continue
+            try:
+                digest = file_sha256(path)
+            except OSError:
+                continue
+            candidates = by_size[metadata['file_size']]
+            match = next((c for c in candidates if c[1] == digest), None)
+            if match is None:
+                continue
+            candidates.remove(match)
+            repoint_document(db.session.get(Document, match[0]), metadata)
+            moved_ids.append(match[0])
+            logger.info(f"[Reconcile] moved -> {metadata['file_path']}")
+        db.session.flush()
+    stats['moved'] = len(moved_ids)
+
+    if delete_orphans:
+        for start in range(0, len(moved_ids), batch_size):
+            chunk = moved_ids[start:start + batch_size]
+            connection.execute(orphan_scan_ids.delete().where(orphan_scan_ids.c.id.in_(chunk)))
+        result = connection.execute(
+            sa.delete(Document.__table__).where(Document.__table__.c.id.in_(sa.select(orphan_scan_ids.c.id)))
+        )
+        stats['deleted'] = result.rowcount
+        connection.execute(orphan_scan_ids.delete())
+        # Bulk DELETE bypasses the identity map; drop stale instances
+        db.session.expire_all()
+    logger.info(f"[Reconcile] {root}: hashed={stats['hashed']} orphans={stats['orphans']} moved={stats['moved']} deleted={stats['deleted']}")
+    return stats
+
+
+def ingested_roots():
+    """Local folders that have been ingested before (IngestState scopes of the local_fs source)."""
+    source = current_app.config['SOURCE_LOCAL_FS']
+    return [row.scope_key for row in db.session.query(IngestState.scope_key).filter_by(source=source).order_by(IngestState.scope_key)]
+
+
+def _run_scheduled(app, interval_seconds):
+    while True:
+        time.sleep(interval_seconds)
+        with worker_context(app):
+            for root in ingested_roots():
+                try:
+                    reconcile_root(root)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"[Reconcile] {root} failed: {e}\n{traceback.format_exc()}")
+
+
+def start_reconcile_scheduler(app):
+    """Start the periodic reconciliation thread when RECONCILE_INTERVAL_MINUTES > 0 (once per process)."""
+    global _scheduler_thread
+    interval = float(app.config.get('RECONCILE_INTERVAL_MINUTES', 0) or 0)
+    if interval <= 0 or app.testing:
+        return None
+    # Under the debug reloader only the serving child process runs the job
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return None
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_thread = threading.Thread(target=_run_scheduled, args=(app, interval * 60),
+                                                 name='reconcile-scheduler', daemon=True)
+            _scheduler_thread.start()
+            app.logger.info(f"[Reconcile] scheduled every {interval:g} minute(s)")
+    return _scheduler_thread
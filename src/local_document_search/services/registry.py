@@ -3,8 +3,11 @@ from .conversion_result import ConversionResult
 
 # type alias: handler(file_path: str, file_type: str) -> ConversionResult
 Handler = Callable[[str, str], ConversionResult]
+# type alias: text handler(content: str, file_type: str) -> ConversionResult, for in-memory bodies (e.g. Joplin notes)
+TextHandler = Callable[[str, str], ConversionResult]
 
 _CONVERTER_REGISTRY: Dict[str, Handler] = {}
+_TEXT_CONVERTER_REGISTRY: Dict[str, TextHandler] = {}
 
 def register(exts: List[str]):
     def decorator(fn: Handler):
@@ -16,5 +19,15 @@ def register(exts: List[str]):
 def get_handler(ext: str) -> Handler | None:
     return _CONVERTER_REGISTRY.get(ext.lower())
 
+def register_text(exts: List[str]):
+    def decorator(fn: TextHandler):
+        for e in exts:
+            _TEXT_CONVERTER_REGISTRY[e.lower()] = fn
+        return fn
+    return decorator
+
+def get_text_handler(ext: str) -> TextHandler | None:
+    return _TEXT_CONVERTER_REGISTRY.get(ext.lower())
+
 def list_registered():
     return sorted(_CONVERTER_REGISTRY.keys())
@@ -0,0 +1,134 @@
+"""Streaming spreadsheet conversion for .xlsx / .xls workbooks.
+
+Public function:
+    convert_spreadsheet_to_markdown(file_path: str, file_type: str) -> ConversionResult | None
+
+Rows are read one at a time (openpyxl read-only mode, xlrd on-demand sheets) and only
+the first SPREADSHEET_MAX_ROWS non-empty rows / SPREADSHEET_MAX_COLS columns of each
+sheet are kept, so memory and the stored markdown are bounded by the caps rather than
+by workbook size. Each sheet becomes its own ``## <sheet>`` section. Returns None when
+the reader library is unavailable or cannot parse the file, so the caller can fall back
+to MarkItDown.
+"""
+import os
+from flask import current_app
+from local_document_search.models import ConversionType
+from local_document_search.services.conversion_result import ConversionResult
+
+MAX_CELL_CHARS = 500
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).replace('\r', ' ').replace('\n', ' ').replace('|', '\\|').strip()
+    return text[:MAX_CELL_CHARS]
+
+
+def _sheet_section(name: str, rows, max_rows: int, max_cols: int):
+    """Consume ``rows`` lazily; returns (markdown section or None, stats dict)."""
+    kept = []
+    rows_truncated = False
+    cols_truncated = False
+    for row in rows:
+        row = list(row)
+        if len(row) > max_cols and any(_cell_text(v) for v in row[max_cols:]):
+            cols_truncated = True
+        cells = [_cell_text(v) for v in row[:max_cols]]
+        if not any(cells):
+            continue
+        if len(kept) >= max_rows:
+            rows_truncated = True
+            break
+        kept.append(cells)
+    stats = {'name': name, 'rows': len(kept), 'rows_truncated': rows_truncated, 'cols_truncated': cols_truncated}
+    if not kept:
+        return None, stats
+
+    width = max(max((i + 1 for i, c in enumerate(r) if c), default=0) for r in kept)
+    table = [r[:width] + [''] * (width - len(r[:width])) for r in kept]
+    lines = [
+        '| ' + ' | '.join(table[0]) + ' |',
+        '| ' + ' | '.join(['---'] * width) + ' |',
+    ]
+    lines.extend('| ' + ' | '.join(r) + ' |' for r in table[1:])
+    notes = []
+    if rows_truncated:
+        notes.append(f"first {max_rows} rows")
+    if cols_truncated:
+        notes.append(f"first {max_cols} columns")
+    section = f"## {name}\n\n" + '\n'.join(lines)
+    if notes:
+        section += f"\n\n*Truncated: showing {' and '.join(notes)}.*"
+    return section, stats
+
+
+def _iter_xlsx_sheets(file_path: str, max_cols: int):
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            # One extra column is read so truncation can be reported
+            yield ws.title, ws.iter_rows(values_only=True, max_col=max_cols + 1)
+    finally:
+        wb.close()
+
+
+def _iter_xls_sheets(file_path: str, max_cols: int):
+    import xlrd
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        for index in range(book.nsheets):
+            sheet = book.sheet_by_index(index)
+
+            def rows(sheet=sheet):
+                for r in range(sheet.nrows):
+                    values = []
+                    for cell in sheet.row_slice(r, 0, max_cols + 1):
+                        if cell.ctype == xlrd.XL_CELL_DATE:
+                            try:
+                                values.append(xlrd.xldate.xldate_as_datetime(cell.value, book.datemode))
+                                continue
+                            except Exception:
+                                pass
+                        values.append(cell.value)
+                    yield values
+
+            yield sheet.name, rows()
+            book.unload_sheet(index)
+    finally:
+        book.release_resources()
+
+
+def convert_spreadsheet_to_markdown(file_path: str, file_type: str) -> ConversionResult | None:
+    config = current_app.config
+    max_rows = max(1, int(config.get('SPREADSHEET_MAX_ROWS', 2000)))
+    max_cols = max(1, int(config.get('SPREADSHEET_MAX_COLS', 50)))
+    reader = _iter_xls_sheets if file_type == 'xls' else _iter_xlsx_sheets
+
+    sections = []
+    sheets = []
+    try:
+        for name, rows in reader(file_path, max_cols):
+            section, stats = _sheet_section(name, rows, max_rows, max_cols)
+            sheets.append(stats)
+            if section:
+                sections.append(section)
+    except ImportError as e:
+        current_app.logger.debug(f"Spreadsheet reader unavailable for {file_path}: {e}; falling back to MarkItDown")
+        return None
+    except Exception as e:
+        current_app.logger.warning(f"Streaming spreadsheet read failed for {file_path}: {e}; falling back to MarkItDown")
+        return None
+
+    if not sections:
+        return ConversionResult(success=False, error=f"Spreadsheet {file_path} contains no data", conversion_type=None, content=None)
+    content = f"# {os.path.basename(file_path)}\n\n" + '\n\n'.join(sections) + '\n'
+    return ConversionResult(
+        success=True,
+        content=content,
+        conversion_type=ConversionType.STRUCTURED_TO_MD,
+        metadata={'sheets': sheets},
+    )
@@ -1,14 +1,16 @@
 ﻿import os
 import json
 import subprocess
-import tempfile
-import hashlib
-from faster_whisper import WhisperModel
+import threading
+from collections import deque
 from datetime import datetime
 from flask import current_app
 from local_document_search.models import ConversionType
+from local_document_search.services import whisper_pool, chunked_transcriber
+from local_document_search.utils.hash_utils import file_sha256
 
 FFPROBE_BIN = os.environ.get('FFPROBE_BIN', 'ffprobe')
+SAMPLE_RATE = 16000  # faster-whisper expects mono 16 kHz float32
 
 class VideoMetadataError(Exception):
     pass
@@ -59,41 +61,130 @@ def extract_metadata(path: str) -> dict:
     return meta
 
 
-def _transcribe_video(video_path: str) -> str:
+def stream_pcm(path: str, ffmpeg_bin: str = 'ffmpeg', chunk_seconds: float = 300.0,
+               start: float | None = None, duration: float | None = None):
+    """Decode media through an ffmpeg pipe, yielding (offset_seconds, float32 mono 16 kHz chunk).
+
+    Audio never touches disk and at most one chunk is held in memory, regardless of media length.
+    ``start``/``duration`` restrict decoding to a window; offsets stay relative to ``start``.
+    """
+    import numpy as np
+
+    cmd = [ffmpeg_bin, '-nostdin', '-v', 'error']
+    if start:
+        cmd += ['-ss', f"{start:.3f}"]
+    cmd += ['-i', path]
+    if duration:
+        cmd += ['-t', f"{duration:.3f}"]
+    cmd += ['-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise VideoMetadataError("ffmpeg not found. Install ffmpeg or set FFMPEG_BIN.")
+
+    # Drain stderr concurrently so a chatty ffmpeg cannot block on a full pipe
+    stderr_tail = deque(maxlen=20)
+
+    def _drain_stderr():
+        for line in proc.stderr:
+            stderr_tail.append(line.decode('utf-8', 'ignore').strip())
+
+    drain = threading.Thread(target=_drain_stderr, daemon=True)
+    drain.start()
+
+    chunk_bytes = int(chunk_seconds * SAMPLE_RATE) * 2  # s16le -> 2 bytes per sample
+    offset = 0.0
+    try:
+        while True:
+            buf = proc.stdout.read(chunk_bytes)
+            if not buf:
+                break
+            samples = np.frombuffer(buf[:len(buf) - len(buf) % 2], dtype=np.int16).astype(np.float32) / 32768.0
+            yield offset, samples
+            offset += len(samples) / SAMPLE_RATE
+        proc.wait()
+        drain.join(timeout=5)
+        if proc.returncode != 0:
+            raise VideoMetadataError(f"ffmpeg audio extraction failed: {' '.join(stderr_tail)}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+
+def iter_transcript_segments(path: str, model_name: str, device: str, compute_type: str,
+                             idle_ttl: float, ffmpeg_bin: str = 'ffmpeg', chunk_seconds: float = 300.0):
+    """Yield (start, end, text) transcript segments incrementally, one PCM chunk at a time."""
+    for offset, samples in stream_pcm(path, ffmpeg_bin, chunk_seconds):
+        segments, _ = whisper_pool.transcribe(samples, model_name, device, compute_type, idle_ttl, beam_size=5)
+        for segment in segments:
+            yield offset + segment.start, offset + segment.end, segment.text
+
+
+def _format_timestamp(seconds: float) -> str:
+    s = int(seconds)
+    return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+def _format_segments(segments) -> str:
+    """Render (start, end, text) segments as '[HH:MM:SS] text' lines."""
+    return '\n'.join(f"[{_format_timestamp(start)}] {text.strip()}" for start, _, text in segments)
+
+
+def _use_chunked_transcription(duration: float | None) -> bool:
+    cfg = current_app.config
+    return (
+        duration is not None
+        and cfg.get('WHISPER_DEVICE', 'cpu') == 'cpu'
+        and cfg.get('WHISPER_CHUNK_WORKERS', 2) > 1
+        and duration >= cfg.get('WHISPER_CHUNK_MIN_SECONDS', 1200)
+    )
+
+
+def _transcribe_video(video_path: str, duration: float | None = None) -> str:
     """Transcribes a video file using faster-whisper, respecting config flags."""
     if not current_app.config.get('ENABLE_VIDEO_TRANSCRIPTION', False):
         return "(音视频转录功能未启用)"
 
     model_name = current_app.config.get('WHISPER_MODEL', 'base')
     device = current_app.config.get('WHISPER_DEVICE', 'cpu')
+    compute_type = current_app.config.get('WHISPER_COMPUTE_TYPE', 'int8')
+    idle_ttl = current_app.config.get('WHISPER_MODEL_IDLE_SECONDS', whisper_pool.DEFAULT_IDLE_TTL)
     ffmpeg_bin = current_app.config.get('FFMPEG_BIN', 'ffmpeg')
+    chunk_seconds = current_app.config.get('WHISPER_STREAM_CHUNK_SECONDS', 300)
     
     current_app.logger.info(f"Starting transcription for {video_path} with model '{model_name}' on device '{device}'")
 
+    if _use_chunked_transcription(duration):
+        # Long recording: VAD-aligned chunks across a process pool, checkpointed for resume
+        options = {
+            'model_name': model_name, 'device': device, 'compute_type': compute_type,
+            'idle_ttl': idle_ttl, 'ffmpeg_bin': ffmpeg_bin,
+            'chunk_seconds': current_app.config.get('WHISPER_CHUNK_SECONDS', 600),
+            'workers': current_app.config.get('WHISPER_CHUNK_WORKERS', 2),
+            'checkpoint_root': os.path.join(current_app.config.get('CACHE_DIR', 'cache'), 'transcripts'),
+        }
+        try:
+            segments = chunked_transcriber.transcribe_chunked(video_path, duration, options)
+            current_app.logger.info(f"Successfully transcribed {video_path} in chunks")
+            return _format_segments(segments)
+        except Exception as e:
+            err_msg = f"Chunked transcription failed for {video_path}: {e}"
+            current_app.logger.error(err_msg)
+            return f"(音视频转录失败: {err_msg})"
+
     try:
-        model = WhisperModel(model_name, device=device, compute_type="int8")
+        # Cached across files; only the first transcription pays the model load
+        whisper_pool.get_model(model_name, device, compute_type, idle_ttl)
     except Exception as e:
         err_msg = f"Failed to load faster-whisper model '{model_name}': {e}"
         current_app.logger.error(err_msg)
         return f"(音视频转录失败: {err_msg})"
 
-    temp_audio = None
     try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmpfile:
-            temp_audio = tmpfile.name
-        
-        # Extract audio from video
-        cmd = [
-            ffmpeg_bin, '-i', video_path, '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', '-y', temp_audio
-        ]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if proc.returncode != 0:
-            raise VideoMetadataError(f"ffmpeg audio extraction failed: {proc.stderr.strip()}")
-
-        # Transcribe
-        segments, _ = model.transcribe(temp_audio, beam_size=5)
-        
-        transcribed_text = '\n'.join([segment.text for segment in segments])
+        transcribed_text = _format_segments(iter_transcript_segments(
+            video_path, model_name, device, compute_type, idle_ttl, ffmpeg_bin, chunk_seconds))
         current_app.logger.info(f"Successfully transcribed {video_path}")
         return transcribed_text
 
@@ -101,9 +192,6 @@ def _transcribe_video(video_path: str) -> str:
         err_msg = f"Transcription process failed for {video_path}: {e}"
         current_app.logger.error(err_msg)
         return f"(音视频转录失败: {err_msg})"
-    finally:
-        if temp_audio and os.path.exists(temp_audio):
-            os.remove(temp_audio)
 
 
 def convert_video_metadata(path: str):
@@ -125,10 +213,9 @@ def convert_video_metadata(path: str):
 
     try:
         file_stats = os.stat(path)
-        with open(path, 'rb') as f:
-            sha256_hash = hashlib.sha256(f.read()).hexdigest()
+        sha256_hash = file_sha256(path, use_mmap=True)
         meta = extract_metadata(path)
-        transcription = _transcribe_video(path)
+        transcription = _transcribe_video(path, meta.get('duration_seconds'))
     except VideoMetadataError as ve:
         return f"Video metadata extraction failed: {ve}", None
     except Exception as e:
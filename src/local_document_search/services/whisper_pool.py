@@ -0,0 +1,107 @@
+"""Process-wide pool of faster-whisper models (lazy-loaded, idle-evicted) plus a transcription worker.
+
+Public functions:
+    get_model(model_name, device, compute_type, idle_ttl=None, cpu_threads=0) -> WhisperModel
+    transcribe(audio, model_name, device, compute_type, **kwargs) -> (list[Segment], TranscriptionInfo)
+    evict_idle(now=None) -> int
+
+Models are keyed by (model_name, device, compute_type, cpu_threads) so batch ingestion of many
+recordings pays the weight-loading cost once. A reaper thread drops models that have
+not been used for ``idle_ttl`` seconds. Transcriptions run on a dedicated worker
+thread so concurrent ingestion threads queue up instead of oversubscribing the CPU.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+DEFAULT_IDLE_TTL = 600.0
+
+_lock = threading.Lock()
+_models: Dict[Tuple[str, str, str, int], dict] = {}
+_key_locks: Dict[Tuple[str, str, str, int], threading.Lock] = {}
+_idle_ttl = DEFAULT_IDLE_TTL
+_reaper = None
+_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='whisper')
+
+
+def _load_model(model_name: str, device: str, compute_type: str, cpu_threads: int = 0):
+    from faster_whisper import WhisperModel  # heavy import (ctranslate2/onnx), defer until first use
+    return WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _reaper_loop():
+    while True:
+        time.sleep(max(1.0, min(_idle_ttl / 2, 60.0)))
+        evict_idle()
+
+
+def _ensure_reaper():
+    global _reaper
+    if _reaper is None or not _reaper.is_alive():
+        _reaper = threading.Thread(target=_reaper_loop, name='whisper-reaper', daemon=True)
+        _reaper.start()
+
+
+def get_model(model_name: str, device: str = 'cpu', compute_type: str = 'int8', idle_ttl: float | None = None,
+              cpu_threads: int = 0):
+    """Return a cached model for the key, loading it on first use."""
+    global _idle_ttl
+    key = (model_name, device, compute_type, cpu_threads)
+    with _lock:
+        if idle_ttl is not None:
+            _idle_ttl = float(idle_ttl)
+        entry = _models.get(key)
+        if entry is not None:
+            entry['last_used'] = time.monotonic()
+            return entry['model']
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    # Load outside the global lock so other keys stay available; the key lock prevents double loads
+    with key_lock:
+        with _lock:
+            entry = _models.get(key)
+            if entry is not None:
+                entry['last_used'] = time.monotonic()
+                return entry['model']
+        model = _load_model(model_name, device, compute_type, cpu_threads)
+        with _lock:
+            _models[key] = {'model': model, 'last_used': time.monotonic()}
+            if _idle_ttl > 0:
+                _ensure_reaper()
+        return model
+
+
+def evict_idle(now: float | None = None) -> int:
+    """Drop models idle for longer than the configured TTL; returns the number evicted."""
+    now = time.monotonic() if now is None else now
+    with _lock:
+        if _idle_ttl <= 0:
+            return 0
+        stale = [k for k, e in _models.items() if now - e['last_used'] > _idle_ttl]
+        for k in stale:
+            _models.pop(k, None)
+    return len(stale)
+
+
+def loaded_models():
+    with _lock:
+        return list(_models.keys())
+
+
+def _run_transcription(audio, model_name, device, compute_type, idle_ttl, cpu_threads, kwargs):
+    model = get_model(model_name, device, compute_type, idle_ttl, cpu_threads)
+    segments, info = model.transcribe(audio, **kwargs)
+    # faster-whisper yields lazily; materialize on the worker thread that owns the model
+    result = list(segments)
+    with _lock:
+        entry = _models.get((model_name, device, compute_type, cpu_threads))
+        if entry is not None:
+            entry['last_used'] = time.monotonic()
+    return result, info
+
+
+def transcribe(audio, model_name: str, device: str = 'cpu', compute_type: str = 'int8',
+               idle_ttl: float | None = None, cpu_threads: int = 0, **kwargs):
+    """Transcribe ``audio`` (path or float32 array) on the dedicated worker thread."""
+    future = _worker.submit(_run_transcription, audio, model_name, device, compute_type, idle_ttl, cpu_threads, kwargs)
+    return future.result()
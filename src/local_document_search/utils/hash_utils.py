@@ -0,0 +1,80 @@
+"""
+文件哈希工具：分块/mmap 流式计算 SHA-256，内存占用与文件大小无关。
+
+- file_sha256: 流式 SHA-256，结果按 (path, size, mtime) 缓存，供各转换器复用
+"""
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 1024 * 1024
+MAX_CACHE_ENTRIES = 4096
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _stat_key(path, st=None):
+    st = st or os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _cache_get(key, field):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or field not in entry:
+            return None
+        _cache.move_to_end(key)
+        return entry[field]
+
+
+def _cache_put(key, field, value):
+    with _cache_lock:
+        _cache.setdefault(key, {})[field] = value
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _sha256_stream(f, chunk_size):
+    h = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        h.update(view[:n])
+    return h.hexdigest()
+
+
+def _sha256_mmap(f, size, chunk_size):
+    h = hashlib.sha256()
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in range(0, size, chunk_size):
+            h.update(mm[offset:offset + chunk_size])
+    return h.hexdigest()
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """流式计算文件 SHA-256（十六进制），命中 (path, size, mtime) 缓存时不再读盘。"""
+    st = os.stat(path)
+    key = _stat_key(path, st)
+    cached = _cache_get(key, 'sha256')
+    if cached:
+        return cached
+    with open(path, 'rb') as f:
+        if use_mmap and st.st_size > 0:
+            digest = _sha256_mmap(f, st.st_size, chunk_size)
+        else:
+            digest = _sha256_stream(f, chunk_size)
+    _cache_put(key, 'sha256', digest)
+    return digest
+
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+import pytest
+from local_document_search.asgi import create_asgi_app
+from local_document_search.services import ingestion_manager
+from local_document_search.services.ingestion_manager import IngestionSource, get_session_debug
+
+
+class AsgiTestSource(IngestionSource):
+    name = 'asgi-test'
+    gate = None
+
+    def __init__(self, count=2, gated=False):
+        self.count = count
+        self.gated = gated
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(int(args.get('count', 2)), args.get('gated') == '1')
+
+    def iter_events(self, session_id):
+        for i in range(self.count):
+            if self.gated:
+                self.gate.acquire()
+            yield {'level': 'info', 'message': f'moved {i}', 'stage': 'file_moved'}
+        yield {'level': 'info', 'message': 'finished', 'stage': 'done', 'summary': {}}
+
+
+@pytest.fixture
+def test_source(monkeypatch):
+    """Register AsgiTestSource for one test only; the registry entry is removed on teardown."""
+    monkeypatch.setattr(AsgiTestSource, 'gate', threading.Semaphore(0))
+    monkeypatch.setitem(ingestion_manager._SOURCE_TYPES, AsgiTestSource.name, AsgiTestSource)
+    return AsgiTestSource
+
+
+def _call(asgi, path, query='', headers=(), disconnect=None):
+    """Run one GET through the ASGI app; returns (status, SSE events)."""
+    sent = []
+
+    async def receive():
+        if disconnect is not None:
+            await asyncio.get_running_loop().run_in_executor(None, disconnect.wait)
+            return {'type': 'http.disconnect'}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'root_path': '',
+             'scheme': 'http', 'headers': [(b'host', b'testserver')] + [(k.encode(), v.encode()) for k, v in headers],
+             'client': ('127.0.0.1', 5555)}
+    asyncio.run(asyncio.wait_for(asgi(scope, receive, send), 10))
+    body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body').decode()
+    events = [json.loads(line[6:]) for line in body.splitlines() if line.startswith('data: ')]
+    return sent[0]['status'], events
+
+
+def test_session_stream_is_relayed_by_coroutine(app, test_source):
+    app.config['SSE_PROGRESS_INTERVAL'] = 0
+    asgi = create_asgi_app(app)
+    status, events = _call(asgi, '/api/sources/asgi-test/stream', 'count=3')
+    assert status == 200
+    assert [e['stage'] for e in events] == ['session_info', 'file_moved', 'file_moved', 'file_moved', 'done']
+    session_id = events[0]['session_id']
+
+    # Last-Event-ID resume goes through the same handover
+    _, resumed = _call(asgi, '/api/convert-stream', headers=[('Last-Event-ID', f'{session_id}-2')])
+    assert [e['event_id'] for e in resumed] == [3, 4]
+
+    # Responses that are not a session stream are passed through unchanged
+    status, events = _call(asgi, '/api/sources/nope/stream')
+    assert status == 200 and events[0]['stage'] == 'critical_error'
+
+
+def test_client_disconnect_releases_subscriber(app, test_source):
+    asgi = create_asgi_app(app)
+    disconnect = threading.Event()
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(zip(('status', 'events'), _call(
+        asgi, '/api/sources/asgi-test/stream', 'gated=1', disconnect=disconnect))))
+    thread.start()
+    with app.app_context():
+        sessions = app.config.setdefault('INGEST_SESSIONS', {})
+        for _ in range(100):
+            session_id = next((sid for sid, s in list(sessions.items()) if s.get('source') == 'asgi-test'), None)
+            if session_id and get_session_debug(session_id)['subscribers'] == 1:
+                break
+            threading.Event().wait(0.05)
+        disconnect.set()
+        thread.join(timeout=10)
+        assert not thread.is_alive() and result['status'] == 200
+        assert get_session_debug(session_id)['subscribers'] == 0
+        test_source.gate.release()
+        test_source.gate.release()
+        sessions[session_id]['thread'].join(timeout=10)
+
+
+def test_lifespan_is_acknowledged(app):
+    messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(create_asgi_app(app)({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,34 @@
+import os
+import sys
+import stat
+import pytest
+from local_document_search.services.video_converter import stream_pcm, VideoMetadataError, SAMPLE_RATE
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='uses a POSIX shebang script as fake ffmpeg')
+
+
+def _fake_ffmpeg(tmp_path, seconds, exit_code=0):
+    """Executable that ignores ffmpeg args and writes ``seconds`` of s16le PCM to stdout."""
+    script = tmp_path / 'ffmpeg'
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"sys.stdout.buffer.write(b'\\x00\\x40' * int({seconds} * {SAMPLE_RATE}))\n"
+        "sys.stderr.write('fake ffmpeg done\\n')\n"
+        f"sys.exit({exit_code})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def test_stream_pcm_yields_bounded_chunks_with_offsets(tmp_path):
+    chunks = list(stream_pcm('ignored.mp4', _fake_ffmpeg(tmp_path, 2), chunk_seconds=0.5))
+    assert [offset for offset, _ in chunks] == [0.0, 0.5, 1.0, 1.5]
+    assert all(len(samples) == SAMPLE_RATE // 2 for _, samples in chunks)
+    assert chunks[0][1].dtype.name == 'float32'
+    assert abs(float(chunks[0][1][0]) - 0.5) < 1e-6  # 0x4000 / 32768
+
+
+def test_stream_pcm_reports_ffmpeg_failure(tmp_path):
+    with pytest.raises(VideoMetadataError, match='fake ffmpeg done'):
+        list(stream_pcm('ignored.mp4', _fake_ffmpeg(tmp_path, 0.1, exit_code=1)))
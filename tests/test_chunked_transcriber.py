@@ -0,0 +1,111 @@
+import os
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from local_document_search.services import chunked_transcriber as ct
+
+
+def test_plan_chunks_cuts_at_nearby_silence():
+    silences = [(590.0, 592.0), (1230.0, 1231.0), (1500.0, 1502.0)]
+    chunks = ct.plan_chunks(1800.0, silences, target_seconds=600.0)
+    assert chunks == [(0.0, 591.0), (591.0, 1230.5), (1230.5, 1800.0)]
+
+
+def test_plan_chunks_hard_cut_without_silence():
+    assert ct.plan_chunks(1300.0, [], target_seconds=600.0) == [(0.0, 600.0), (600.0, 1300.0)]
+    assert ct.plan_chunks(700.0, [], target_seconds=600.0) == [(0.0, 700.0)]
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    path = tmp_path / 'talk.mp3'
+    path.write_bytes(b'fake media')
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(ct, '_get_pool', lambda workers: executor)
+    monkeypatch.setattr(ct, 'detect_silences', lambda *a, **k: [])
+    options = {
+        'model_name': 'base', 'device': 'cpu', 'compute_type': 'int8', 'idle_ttl': 0,
+        'ffmpeg_bin': 'ffmpeg', 'chunk_seconds': 100.0, 'workers': 2,
+        'checkpoint_root': str(tmp_path / 'ckpt'),
+    }
+    yield str(path), options
+    executor.shutdown()
+
+
+def test_resume_only_redoes_missing_chunks(media, monkeypatch):
+    path, options = media
+    calls = []
+    crash = {'enabled': True}
+
+    def flaky(path, start, end, options):
+        calls.append(start)
+        if start == 100.0 and crash['enabled']:
+            raise RuntimeError('worker crashed')
+        return [[start, start + 1, f"text@{int(start)}"]]
+
+    monkeypatch.setattr(ct, '_transcribe_chunk', flaky)
+    with pytest.raises(RuntimeError):
+        ct.transcribe_chunked(path, 300.0, options)
+    job_dirs = os.listdir(options['checkpoint_root'])
+    assert len(job_dirs) == 1
+    assert len(os.listdir(os.path.join(options['checkpoint_root'], job_dirs[0]))) == 3  # plan + 2 chunks
+
+    calls.clear()
+    crash['enabled'] = False
+    segments = ct.transcribe_chunked(path, 300.0, options)
+    assert calls == [100.0]
+    assert [s[2] for s in segments] == ['text@0', 'text@100', 'text@200']
+    assert os.listdir(options['checkpoint_root']) == []
+
+
+def test_file_keeps_at_most_workers_chunks_in_flight(media, monkeypatch):
+    path, options = media
+    options['workers'] = 1
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def tracked(path, start, end, options):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        threading.Event().wait(0.02)
+        with lock:
+            state['running'] -= 1
+        return [[start, start + 1, f"text@{int(start)}"]]
+
+    monkeypatch.setattr(ct, '_transcribe_chunk', tracked)
+    segments = ct.transcribe_chunked(path, 300.0, options)
+    assert [s[2] for s in segments] == ['text@0', 'text@100', 'text@200']
+    assert state['peak'] == 1  # the pool has 2 workers, the file may use only 1
+
+
+def test_shared_pool_is_not_resized(monkeypatch):
+    monkeypatch.setattr(ct, '_pool', None)
+    try:
+        pool = ct._get_pool(2)
+        assert ct._get_pool(1) is pool and ct._get_pool(3) is pool
+    finally:
+        ct.shutdown_pool()
+
+
+def test_planned_chunk_is_transcribed_in_one_window(monkeypatch):
+    from local_document_search.services import video_converter, whisper_pool
+    windows, calls = [], []
+
+    def fake_stream(path, ffmpeg_bin, chunk_seconds, start=None, duration=None):
+        windows.append(chunk_seconds)
+        for offset in range(0, int(duration), int(chunk_seconds)):
+            yield float(offset), f"samples@{offset}"
+
+    class Model:
+        def transcribe(self, samples, beam_size=5):
+            calls.append(samples)
+            return [], None
+
+    monkeypatch.setattr(video_converter, 'stream_pcm', fake_stream)
+    monkeypatch.setattr(whisper_pool, 'get_model', lambda *a, **k: Model())
+    options = {'model_name': 'base', 'device': 'cpu', 'compute_type': 'int8', 'idle_ttl': 0,
+               'cpu_threads': 1, 'ffmpeg_bin': 'ffmpeg', 'chunk_seconds': 600.0}
+    # plan_chunks allows up to 1.25 x chunk_seconds so the cut lands in a silence
+    ct._transcribe_chunk('talk.mp3', 591.0, 1330.5, options)
+    assert windows == [740] and calls == ['samples@0']
@@ -0,0 +1,36 @@
+from local_document_search.extensions import db
+from local_document_search.models import Document
+from local_document_search.services.cleanup_service import find_orphan_files
+from local_document_search.utils.file_utils import normalize_path
+
+
+def _doc(path, file_type='md'):
+    return Document(file_name=path.rsplit('/', 1)[-1], file_type=file_type, file_size=1,
+                    file_created_at=None, file_modified_time=None, file_path=path, status='completed')
+
+
+def test_orphans_streamed_in_batches_and_paginated(app, tmp_path):
+    root = tmp_path / 'root'
+    (root / 'keep').mkdir(parents=True)
+    for n in range(5):
+        (root / 'keep' / f"k{n}.md").write_text('x', encoding='utf-8')
+    base = normalize_path(str(root))
+    with app.app_context():
+        db.create_all()
+        docs = [_doc(f"{base}/keep/k{n}.md") for n in range(5)]
+        docs += [_doc(f"{base}/keep/gone{n}.md") for n in range(3)]
+        docs += [_doc(f"{base}/removed_dir/r{n}.txt", 'txt') for n in range(4)]
+        docs.append(_doc(f"{base}_sibling/other.md"))  # shares the string prefix but is outside the root
+        db.session.add_all(docs)
+        db.session.commit()
+
+        query = find_orphan_files(str(root), batch_size=2)
+        orphans = sorted(d.file_name for d in query.all())
+        assert orphans == ['gone0.md', 'gone1.md', 'gone2.md', 'r0.txt', 'r1.txt', 'r2.txt', 'r3.txt']
+
+        page = query.order_by(Document.file_path.asc()).paginate(page=2, per_page=5, error_out=False)
+        assert page.total == 7 and [d.file_name for d in page.items] == ['r2.txt', 'r3.txt']
+
+        # Re-running on the same session replaces the previous scan's results
+        assert [d.file_name for d in find_orphan_files(str(root), file_type_filter='txt', path_keyword_filter='r1').all()] == ['r1.txt']
+        assert find_orphan_files(str(tmp_path / 'missing')).count() == 0
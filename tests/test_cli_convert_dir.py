@@ -0,0 +1,73 @@
+import os
+import json
+import time
+from click.testing import CliRunner
+from local_document_search.cli import cli, MANIFEST_NAME
+
+
+def _make_tree(root):
+    (root / 'sub').mkdir(parents=True)
+    for n in range(6):
+        (root / 'sub' / f"f{n}.txt").write_text(f"file {n}", encoding='utf-8')
+    (root / 'readme.md').write_text('# title', encoding='utf-8')
+
+
+def _run(src, out, *extra):
+    result = CliRunner().invoke(cli, ['convert-dir', str(src), '-o', str(out), *extra])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_parallel_convert_then_resume(tmp_path):
+    src, out = tmp_path / 'src', tmp_path / 'out'
+    _make_tree(src)
+
+    output = _run(src, out, '--jobs', '2')
+    assert 'total=7 success=7 failed=0 skipped=0' in output
+    assert '[progress] 7/7 converted' in output
+    assert 'file 3' in (out / 'sub' / 'f3.md').read_text(encoding='utf-8')
+    entries = [json.loads(line) for line in (out / MANIFEST_NAME).read_text(encoding='utf-8').splitlines()]
+    assert {e['src'] for e in entries} == {os.path.join('sub', f"f{n}.txt") for n in range(6)} | {'readme.md'}
+    # Sources are not hashed after conversion; size + mtime are enough until they are ambiguous
+    assert all(e['status'] == 'ok' and 'sha256' not in e and e['size'] > 0 for e in entries)
+
+    # Same size, newer mtime: hashed now; without a recorded hash it is converted and the hash recorded
+    future = time.time() + 10
+    (src / 'sub' / 'f0.txt').write_text('file X', encoding='utf-8')
+    os.utime(src / 'sub' / 'f0.txt', (future, future))
+    os.utime(src / 'sub' / 'f1.txt', (future, future))
+    output = _run(src, out, '--jobs', '2')
+    assert 'total=7 success=2 failed=0 skipped=5' in output
+    assert 'file X' in (out / 'sub' / 'f0.md').read_text(encoding='utf-8')
+    latest = {e['src']: e for e in map(json.loads, (out / MANIFEST_NAME).read_text(encoding='utf-8').splitlines())}
+    assert len(latest[os.path.join('sub', 'f1.txt')]['sha256']) == 64
+
+    # Touched again but identical: skipped via the recorded hash; changed content is reconverted
+    future += 10
+    (src / 'sub' / 'f0.txt').write_text('file Y', encoding='utf-8')
+    os.utime(src / 'sub' / 'f0.txt', (future, future))
+    os.utime(src / 'sub' / 'f1.txt', (future, future))
+    output = _run(src, out)
+    assert 'total=7 success=1 failed=0 skipped=6' in output
+    assert 'file Y' in (out / 'sub' / 'f0.md').read_text(encoding='utf-8')
+
+    assert 'success=7 failed=0 skipped=0' in _run(src, out, '--force')
+
+
+def test_source_deleted_during_run_is_left_out_of_manifest(tmp_path, monkeypatch):
+    from local_document_search import cli as cli_module
+    src, out = tmp_path / 'src', tmp_path / 'out'
+    _make_tree(src)
+    convert = cli_module._convert_job
+
+    def convert_then_delete(src_path, ext, out_path):
+        result = convert(src_path, ext, out_path)
+        if src_path.endswith('f2.txt'):
+            os.remove(src_path)
+        return result
+
+    monkeypatch.setattr(cli_module, '_convert_job', convert_then_delete)
+    output = _run(src, out)
+    assert 'total=7 success=7 failed=0 skipped=0' in output
+    entries = [json.loads(line) for line in (out / MANIFEST_NAME).read_text(encoding='utf-8').splitlines()]
+    assert len(entries) == 6 and os.path.join('sub', 'f2.txt') not in {e['src'] for e in entries}
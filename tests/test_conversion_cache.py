@@ -0,0 +1,54 @@
+import os
+from local_document_search.services.conversion_cache import cached_conversion, collect_garbage, cache_path
+
+
+def _fake_convert(calls):
+    def convert(src, staging_dir):
+        calls.append(src)
+        out = staging_dir / f"{src.stem}.docx"
+        out.write_bytes(b'x' * 100 + src.read_bytes())
+        return str(out)
+    return convert
+
+
+def test_conversion_written_to_cache_and_reused(tmp_path):
+    share = tmp_path / 'share'
+    share.mkdir()
+    src = share / 'report.doc'
+    src.write_bytes(b'legacy word')
+    cache_root = str(tmp_path / 'cache')
+    calls = []
+
+    first = cached_conversion(str(src), 'docx', _fake_convert(calls), cache_root)
+    second = cached_conversion(str(src), 'docx', _fake_convert(calls), cache_root)
+
+    assert first == second == str(cache_path(str(src), 'docx', cache_root))
+    assert len(calls) == 1
+    assert sorted(os.listdir(share)) == ['report.doc']
+    # Staging directories are cleaned up after the move into the cache
+    assert os.listdir(os.path.dirname(first)) == [os.path.basename(first)]
+
+
+def test_failed_conversion_leaves_no_entry(tmp_path):
+    src = tmp_path / 'broken.doc'
+    src.write_bytes(b'broken')
+    cache_root = str(tmp_path / 'cache')
+    assert cached_conversion(str(src), 'docx', lambda s, d: None, cache_root) is None
+    assert not cache_path(str(src), 'docx', cache_root).exists()
+
+
+def test_garbage_collection_evicts_least_recently_used(tmp_path):
+    cache_root = str(tmp_path / 'cache')
+    paths = []
+    for n in range(3):
+        src = tmp_path / f"doc{n}.doc"
+        src.write_bytes(f"source {n}".encode())
+        paths.append(cached_conversion(str(src), 'docx', _fake_convert([]), cache_root))
+    for age, path in zip((300, 100, 200), paths):
+        os.utime(path, (os.path.getmtime(path) - age,) * 2)
+
+    size = os.path.getsize(paths[0])
+    freed = collect_garbage(cache_root, max_bytes=size * 2)
+
+    assert freed == size
+    assert [os.path.exists(p) for p in paths] == [False, True, True]
@@ -0,0 +1,44 @@
+from local_document_search import create_app
+from local_document_search.config import Config
+from local_document_search.extensions import db, worker_context
+from local_document_search.models import Document
+
+
+class PostgresConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'postgresql+psycopg2://user:pw@localhost:1/none'
+    DB_POOL_SIZE = 3
+    DB_MAX_OVERFLOW = 7
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_recycle': 60}
+
+
+def test_pool_options_applied_to_server_databases(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    app = create_app(PostgresConfig)
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert options['pool_size'] == 3 and options['max_overflow'] == 7 and options['pool_pre_ping'] is True
+    assert options['pool_recycle'] == 60  # explicit engine options win over DB_POOL_*
+    with app.app_context():
+        pool = db.engine.pool
+        assert pool.size() == 3 and pool._max_overflow == 7  # no connection is opened
+
+
+def test_sqlite_keeps_default_engine_options(app):
+    assert 'pool_size' not in (app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+
+def test_worker_context_releases_session_and_pool_metrics(app):
+    with app.app_context():
+        db.create_all()
+    try:
+        with worker_context(app):
+            db.session.add(Document(file_name='a.md', file_type='md', file_path='/x/a.md', status='completed'))
+            db.session.flush()
+            raise RuntimeError('worker failed')
+    except RuntimeError:
+        pass
+    with worker_context(app):
+        assert Document.query.count() == 0  # rolled back, not left pending for the next user
+
+    pool = app.test_client().get('/api/convert/db-pool').get_json()['pool']
+    assert pool['checkouts'] >= 2 and pool['checked_out'] == 0 and pool['peak_checked_out'] >= 1
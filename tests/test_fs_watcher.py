@@ -0,0 +1,109 @@
+import time
+import threading
+import pytest
+from local_document_search import create_app
+from local_document_search.extensions import db
+from local_document_search.models import Document
+from local_document_search.services.fs_watcher import ChangeDebouncer, UPSERT, DELETE, watch_roots
+
+
+def test_debouncer_coalesces_bursts_per_path():
+    d = ChangeDebouncer(quiet_seconds=1.0, max_delay=5.0)
+    d.add(UPSERT, '/r/a.txt', now=0.0)
+    d.add(UPSERT, '/r/a.txt', now=0.5)
+    d.add(DELETE, '/r/b.txt', now=0.2)
+    d.add(UPSERT, '/r/b.txt', now=0.4)  # atomic save: delete followed by create
+    d.add(UPSERT, '/r/c.txt', now=0.0)
+    d.add(DELETE, '/r/c.txt', now=0.9)
+
+    assert d.pop_ready(now=1.2) == ([], [])
+    assert d.pop_ready(now=1.6) == (['/r/a.txt', '/r/b.txt'], [])
+    assert d.pop_ready(now=2.0) == ([], ['/r/c.txt'])
+    # A continuously rewritten file is still released after max_delay
+    for t in range(0, 6):
+        d.add(UPSERT, '/r/log.txt', now=float(t))
+    assert d.pop_ready(now=5.5) == (['/r/log.txt'], [])
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'watch.db'}")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _wait_for(app, predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            if predicate():
+                return True
+        time.sleep(0.05)
+    return False
+
+
+def test_polling_watch_ingests_and_removes_files(file_app, tmp_path):
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+    (root / 'existing.md').write_text('# already here', encoding='utf-8')
+    stop = threading.Event()
+    events = []
+
+    def run():
+        with file_app.app_context():
+            watch_roots([str(root)], file_types_str='md,txt', debounce=0.1, poll_interval=0.1,
+                        use_polling=True, stop_event=stop, on_event=lambda evt, r: events.append(evt))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        # Initial incremental scan picks up files that predate the watcher
+        assert _wait_for(file_app, lambda: Document.query.filter(Document.file_name == 'existing.md').count() == 1)
+
+        (root / 'sub' / 'new.txt').write_text('fresh content', encoding='utf-8')
+        (root / 'sub' / 'ignored.log').write_text('not a document', encoding='utf-8')
+        assert _wait_for(file_app, lambda: Document.query.filter(Document.file_name == 'new.txt', Document.status == 'completed').count() == 1)
+
+        (root / 'sub' / 'new.txt').unlink()
+        assert _wait_for(file_app, lambda: Document.query.filter(Document.file_name == 'new.txt').count() == 0)
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+    assert any(e['stage'] == 'file_deleted' for e in events)
+    with file_app.app_context():
+        assert Document.query.filter(Document.file_name == 'ignored.log').count() == 0
+
+
+def test_watched_rename_repoints_document(file_app, tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'a.md').write_text('# notes worth keeping', encoding='utf-8')
+    stop = threading.Event()
+    events = []
+
+    def run():
+        with file_app.app_context():
+            watch_roots([str(root)], file_types_str='md', debounce=0.1, poll_interval=0.1,
+                        use_polling=True, stop_event=stop, on_event=lambda evt, r: events.append(evt))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        assert _wait_for(file_app, lambda: Document.query.filter(Document.file_name == 'a.md', Document.status == 'completed').count() == 1)
+        with file_app.app_context():
+            doc_id = Document.query.filter(Document.file_name == 'a.md').one().id
+        del events[:]
+
+        # The watcher sees the rename as DELETE a.md + UPSERT b.md in one batch
+        (root / 'a.md').rename(root / 'b.md')
+        assert _wait_for(file_app, lambda: Document.query.filter(Document.file_name == 'b.md').count() == 1)
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+    stages = [e['stage'] for e in events if e['stage'] != 'debug_state']
+    assert 'file_moved' in stages
+    assert not {'file_success', 'file_deleted'} & set(stages)  # not converted again, not dropped
+    with file_app.app_context():
+        assert [d.id for d in Document.query.all()] == [doc_id]
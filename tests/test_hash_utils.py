@@ -0,0 +1,30 @@
+import os
+import hashlib
+from local_document_search.utils import hash_utils
+
+
+def test_sha256_streaming_and_mmap_match_hashlib(tmp_path):
+    path = tmp_path / 'blob.bin'
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    path.write_bytes(data)
+    expected = hashlib.sha256(data).hexdigest()
+    hash_utils.clear_cache()
+    assert hash_utils.file_sha256(str(path), chunk_size=64 * 1024) == expected
+    hash_utils.clear_cache()
+    assert hash_utils.file_sha256(str(path), use_mmap=True) == expected
+
+
+def test_cache_keyed_by_size_and_mtime(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'first')
+    hash_utils.clear_cache()
+    first = hash_utils.file_sha256(str(path))
+    st = os.stat(path)
+    # Same size and mtime -> served from cache without reading the file again
+    path.write_bytes(b'other')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert hash_utils.file_sha256(str(path)) == first
+    # Changed mtime invalidates the entry
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert hash_utils.file_sha256(str(path)) == hashlib.sha256(b'other').hexdigest()
+
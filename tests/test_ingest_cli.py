@@ -0,0 +1,46 @@
+import json
+import pytest
+from click.testing import CliRunner
+from local_document_search import create_app
+from local_document_search.cli import cli
+from local_document_search.extensions import db
+from local_document_search.models import Document
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'ingest.db'}"
+    monkeypatch.setenv('DATABASE_URL', url)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def test_ingest_multiple_roots_emits_json_lines(db_url, tmp_path):
+    roots = []
+    for name in ('a', 'b'):
+        root = tmp_path / name
+        root.mkdir()
+        for n in range(5):
+            (root / f"{name}{n}.txt").write_text(f"{name} text {n}", encoding='utf-8')
+        roots.append(str(root))
+    (tmp_path / 'b' / 'bad.xyz').write_text('nope', encoding='utf-8')
+
+    result = CliRunner().invoke(cli, ['ingest', *roots, '-t', 'txt,xyz', '--workers', '3', '--batch-size', '2'])
+
+    assert result.exit_code == 1, result.output  # the unsupported file fails, the rest succeed
+    events = [json.loads(line) for line in result.output.splitlines()]
+    assert all('debug_state' != e['stage'] for e in events)
+    done = [e for e in events if e['stage'] == 'done']
+    assert [e['root'] for e in done] == [r.replace('\\', '/') for r in roots]
+    assert [e['summary']['processed_files'] for e in done] == [5, 5]
+    assert done[1]['summary']['error_files'] == 1
+    with db_url.app_context():
+        assert Document.query.filter_by(status='completed').count() == 10
+        assert Document.query.filter_by(status='failed').count() == 1
+
+    # Second run: the per-root cursor means nothing is rescanned
+    rerun = CliRunner().invoke(cli, ['ingest', *roots])
+    assert rerun.exit_code == 0, rerun.output
+    assert [json.loads(l)['total_files'] for l in rerun.output.splitlines() if '"scan_complete"' in l] == [0, 0]
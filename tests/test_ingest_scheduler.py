@@ -0,0 +1,93 @@
+import threading
+import pytest
+from local_document_search import create_app
+from local_document_search.extensions import db
+from local_document_search.models import Document
+from local_document_search.services.ingest_scheduler import IngestionScheduler
+from local_document_search.services.ingestion_manager import start_async_ingestion
+
+
+def test_weighted_round_robin_across_sessions():
+    scheduler = IngestionScheduler(workers=1)
+    order, gate = [], threading.Event()
+    blocker = scheduler.submit('g', gate.wait)  # hold the only worker while the queues fill
+    scheduler.set_priority('b', 2)
+    futures = [scheduler.submit(sid, order.append, f'{sid}{n}') for n in range(1, 5) for sid in ('a', 'b')]
+    gate.set()
+    blocker.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ['a1', 'b1', 'b2', 'a2', 'b3', 'b4', 'a3', 'a4']
+    assert scheduler.stats()['queued'] == {}
+
+
+def test_release_cancels_queued_work():
+    scheduler = IngestionScheduler(workers=1)
+    gate = threading.Event()
+    blocker = scheduler.submit('a', gate.wait)
+    queued = scheduler.submit('b', lambda: 'never')
+    scheduler.release('b')
+    gate.set()
+    blocker.result(timeout=5)
+    assert queued.cancelled() and scheduler.stats()['queued'] == {}
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    # Concurrent sessions need their own connections; in-memory SQLite shares a single one
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'sched.db'}")
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def test_background_sessions_share_the_scheduler(file_app, tmp_path):
+    app = file_app
+    app.config.update(INGEST_GLOBAL_WORKERS=2, SSE_PROGRESS_INTERVAL=0)
+    roots = []
+    for name in ('a', 'b'):
+        root = tmp_path / name
+        root.mkdir()
+        for n in range(3):
+            (root / f'{name}{n}.md').write_text(f'# {name} {n}', encoding='utf-8')
+        roots.append(str(root))
+    with app.app_context():
+        db.create_all()
+        ids = [start_async_ingestion(root, None, None, True, 'md', priority=p) for root, p in zip(roots, (1, 3))]
+        sessions = app.config['INGEST_SESSIONS']
+        assert [sessions[sid]['priority'] for sid in ids] == [1, 3]
+        for sid in ids:
+            sessions[sid]['thread'].join(timeout=20)
+        assert Document.query.count() == 6
+        scheduler = app.extensions['ingest_scheduler']
+        assert scheduler.stats()['queued'] == {} and scheduler.stats()['priority'] == {}
+        threads = {t.name for t in threading.enumerate()}
+        assert not any(name.startswith('convert-') for name in threads)  # no per-session pools
+
+    client = app.test_client()
+    resp = client.post('/api/convert/batch', json={'directories': [roots[0], {'path': roots[1], 'priority': 42}]})
+    urls = [entry['stream_url'] for entry in resp.get_json()['batch']]
+    assert 'priority' not in urls[0] and urls[1].endswith('priority=10')
+    assert client.post('/api/convert/priority', json={'session_id': 'missing', 'priority': 2}).status_code == 404
+
+
+def test_lone_session_fills_the_global_pool(file_app, tmp_path, monkeypatch):
+    from local_document_search.services import ingestion_manager
+    app = file_app
+    app.config.update(INGEST_GLOBAL_WORKERS=4, SSE_PROGRESS_INTERVAL=0)
+    for n in range(8):
+        (tmp_path / f'doc{n}.md').write_text(f'# doc {n}', encoding='utf-8')
+    barrier = threading.Barrier(4, timeout=5)  # breaks unless four conversions run at once
+    convert = ingestion_manager._convert_and_hash
+
+    def gated(*args):
+        barrier.wait()
+        return convert(*args)
+
+    monkeypatch.setattr(ingestion_manager, '_convert_and_hash', gated)
+    with app.app_context():
+        db.create_all()
+        sid = start_async_ingestion(str(tmp_path), None, None, False, 'md')
+        app.config['INGEST_SESSIONS'][sid]['thread'].join(timeout=20)
+        assert not barrier.broken
+        assert Document.query.count() == 8
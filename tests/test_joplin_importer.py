@@ -0,0 +1,294 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+from local_document_search.extensions import db
+from local_document_search.models import ConversionType, Document, IngestState
+from local_document_search.services.ingestion_manager import request_cancel_ingestion, run_source
+from local_document_search.services.joplin_importer import JoplinImporter, JoplinSource
+
+
+class StubJoplin:
+    """Minimal in-memory Joplin Data API: /folders, /notes, /notes/<id>, /events."""
+
+    def __init__(self):
+        self.folders = [{'id': 'f1', 'parent_id': '', 'title': 'Work'}]
+        self.notes = {}
+        self.events = []
+        self.requests = []
+        self.clock = 1_700_000_000_000
+        self.on_page = None  # called with the page number before a /notes page is served
+
+    def put_note(self, note_id, title, body, markup_language=1):
+        self.clock += 1000
+        created = note_id not in self.notes
+        self.notes[note_id] = {'id': note_id, 'parent_id': 'f1', 'title': title, 'body': body,
+                               'created_time': self.clock, 'updated_time': self.clock,
+                               'source_url': '', 'markup_language': markup_language}
+        self.events.append({'item_type': 1, 'item_id': note_id, 'type': 1 if created else 2})
+
+    def delete_note(self, note_id):
+        del self.notes[note_id]
+        self.events.append({'item_type': 1, 'item_id': note_id, 'type': 3})
+
+    def handle(self, path, query):
+        self.requests.append(path)
+        limit = int(query.get('limit', ['100'])[0])
+        if path == '/folders':
+            return 200, {'items': self.folders, 'has_more': False}
+        if path == '/notes':
+            page = int(query.get('page', ['1'])[0])
+            if self.on_page:
+                self.on_page(page)
+            order_by = query.get('order_by', ['updated_time'])[0]
+            items = sorted(self.notes.values(), key=lambda n: n[order_by])
+            chunk = items[(page - 1) * limit:page * limit]
+            return 200, {'items': chunk, 'has_more': page * limit < len(items)}
+        if path.startswith('/notes/'):
+            note = self.notes.get(path.rsplit('/', 1)[-1])
+            return (200, note) if note else (404, {'error': 'Not Found'})
+        if path == '/events':
+            if 'cursor' not in query:
+                return 200, {'items': [], 'has_more': False, 'cursor': str(len(self.events))}
+            start = int(query['cursor'][0])
+            chunk = self.events[start:start + 2]  # tiny pages to exercise has_more
+            end = start + len(chunk)
+            return 200, {'items': chunk, 'has_more': end < len(self.events), 'cursor': str(end)}
+        return 404, {'error': 'Not Found'}
+
+
+@pytest.fixture
+def joplin():
+    stub = StubJoplin()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, payload = stub.handle(url.path, parse_qs(url.query))
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _note_cache(app, tmp_path):
+    app.config['CACHE_DIR'] = str(tmp_path / 'cache')
+
+
+def _docs():
+    return {d.file_path.rsplit('__', 1)[-1]: d for d in Document.query.filter_by(source='Joplin')}
+
+
+def test_incremental_sync_follows_change_feed(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=2)
+    joplin.put_note('a' * 32, 'Alpha', '# alpha')
+    joplin.put_note('b' * 32, 'Beta', '<p>beta</p>', markup_language=2)
+    joplin.put_note('c' * 32, 'Gamma', 'gamma')
+    with app.app_context():
+        db.create_all()
+
+    summary = JoplinImporter(app).run()
+    assert summary['error'] is None and summary['processed_files'] == 3 and summary['cursor'] == '3'
+    with app.app_context():
+        docs = _docs()
+        assert set(docs) == {'a' * 32, 'b' * 32, 'c' * 32}
+        assert docs['b' * 32].file_path == f"joplin://Work/Beta__{'b' * 32}"
+
+    joplin.requests.clear()
+    joplin.put_note('b' * 32, 'Beta renamed', '<p>beta v2</p>', markup_language=2)
+    joplin.delete_note('a' * 32)
+    joplin.put_note('d' * 32, 'Delta', 'delta')
+    joplin.put_note('e' * 32, 'Short-lived', 'gone')
+    joplin.delete_note('e' * 32)
+
+    summary = JoplinImporter(app).run()
+    assert summary['error'] is None
+    assert summary['processed_files'] == 2 and summary['deleted_files'] == 1 and summary['cursor'] == '8'
+    # Only the changed notes' bodies are fetched; the full listing is not walked again
+    assert '/notes' not in joplin.requests
+    assert sorted(p for p in joplin.requests if p.startswith('/notes/')) == [f"/notes/{'b' * 32}", f"/notes/{'d' * 32}"]
+    with app.app_context():
+        docs = _docs()
+        assert set(docs) == {'b' * 32, 'c' * 32, 'd' * 32}
+        assert docs['b' * 32].file_name == 'Beta renamed' and 'beta v2' in docs['b' * 32].markdown_content
+        assert db.session.query(IngestState).filter_by(source='Joplin').one().cursor_token == '8'
+
+    # Nothing new: one events request, no note fetches
+    joplin.requests.clear()
+    assert JoplinImporter(app).run()['processed_files'] == 0
+    assert joplin.requests.count('/events') == 1 and not any(p.startswith('/notes') for p in joplin.requests)
+
+
+def test_full_resync_removes_notes_missing_from_listing(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=50)
+    joplin.put_note('a' * 32, 'Alpha', 'alpha')
+    joplin.put_note('b' * 32, 'Beta', 'beta')
+    with app.app_context():
+        db.create_all()
+    JoplinImporter(app).run()
+
+    # Deleted while the events log was unavailable (e.g. pruned): only a full resync notices
+    del joplin.notes['a' * 32]
+    summary = JoplinImporter(app).run(full_resync=True)
+    assert summary['deleted_files'] == 1 and summary['skipped_files'] == 1
+    with app.app_context():
+        assert set(_docs()) == {'b' * 32}
+
+
+def test_concurrent_page_fetch_and_bulk_writes(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=2, JOPLIN_FETCH_WORKERS=3)
+    ids = [f"{n:032x}" for n in range(7)]
+    for n, note_id in enumerate(ids):
+        joplin.put_note(note_id, f"Note {n}", f"body {n}")
+    with app.app_context():
+        db.create_all()
+
+    summary = JoplinImporter(app).run()
+    assert summary['error'] is None and summary['total_files'] == 7 and summary['processed_files'] == 7
+    with app.app_context():
+        assert set(_docs()) == set(ids)
+
+    # Unchanged vault: every note is skipped against the prefetched state, nothing is rewritten
+    summary = JoplinImporter(app).run(full_resync=True)
+    assert summary['skipped_files'] == 7 and summary['processed_files'] == 0 and summary['deleted_files'] == 0
+
+
+def test_markdown_notes_pass_through_and_html_is_cached(app, joplin, monkeypatch):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=50)
+    md_body = '# Title\n\n* [ ] task <b>kept</b> as written\n'
+    joplin.put_note('a' * 32, 'Markdown', md_body)
+    joplin.put_note('b' * 32, 'Clip', '<h1>Clip</h1><p>from <a href="https://x.test">web</a></p>', markup_language=2)
+    with app.app_context():
+        db.create_all()
+
+    import markdownify
+    calls = []
+    real = markdownify.markdownify
+    monkeypatch.setattr(markdownify, 'markdownify', lambda html, **kw: calls.append(html) or real(html, **kw))
+
+    JoplinImporter(app).run()
+    assert len(calls) == 1  # only the HTML note is converted
+    with app.app_context():
+        docs = _docs()
+        md_doc, html_doc = docs['a' * 32], docs['b' * 32]
+        assert md_doc.markdown_content == md_body and md_doc.file_type == 'md' and md_doc.conversion_type == ConversionType.DIRECT
+        assert html_doc.file_type == 'html' and html_doc.conversion_type == ConversionType.HTML_TO_MD
+        assert '[web](https://x.test)' in html_doc.markdown_content
+        html_content = html_doc.markdown_content
+
+    # A folder rename rewrites every path; the unchanged HTML body comes from the cache
+    joplin.folders[0]['title'] = 'Archive'
+    summary = JoplinImporter(app).run(full_resync=True)
+    assert summary['processed_files'] == 2 and len(calls) == 1
+    with app.app_context():
+        assert _docs()['b' * 32].markdown_content == html_content
+        assert _docs()['b' * 32].file_path.startswith('joplin://Archive/')
+
+
+def _sse_events(response):
+    return [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines() if line.startswith('data: ')]
+
+
+def test_sync_runs_as_ingestion_source_over_sse(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=2)
+    joplin.put_note('a' * 32, 'Alpha', 'alpha')
+    joplin.put_note('b' * 32, 'Beta', 'beta')
+    with app.app_context():
+        db.create_all()
+
+    events = _sse_events(app.test_client().get('/api/sources/joplin/stream'))
+    stages = [e['stage'] for e in events if e['stage'] != 'debug_state']
+    assert stages[0] == 'session_info' and 'scan_start' in stages and stages[-1] == 'done'
+    assert 'file_success' not in stages and stages.count('progress') >= 1  # per-note events are coalesced
+    assert events[-1]['summary']['processed_files'] == 2
+    session_id = events[0]['session_id']
+    assert all(e['session_id'] == session_id for e in events)
+
+    unknown = _sse_events(app.test_client().get('/api/sources/nope/stream'))
+    assert unknown[0]['stage'] == 'critical_error'
+
+
+def test_cancelled_sync_keeps_change_cursor(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=2)
+    for n in range(3):
+        joplin.put_note(f"{n:032x}", f"Note {n}", f"body {n}")
+    with app.app_context():
+        db.create_all()
+    assert JoplinImporter(app).run()['cursor'] == '3'
+    for n in range(3, 8):
+        joplin.put_note(f"{n:032x}", f"Note {n}", f"body {n}")
+
+    with app.test_request_context():
+        stages = []
+        for evt in run_source(JoplinSource()):
+            stages.append(evt['stage'])
+            if evt['stage'] == 'file_processing' and 'cancel_ack' not in stages:
+                request_cancel_ingestion(evt['session_id'])
+        assert stages[-2:] == ['cancelled', 'done'] and 'cancel_ack' in stages
+        # Stopped after the first page: the next run resumes from the old cursor
+        assert db.session.query(IngestState).filter_by(source='Joplin').one().cursor_token == '3'
+        assert Document.query.filter_by(source='Joplin').count() == 5
+
+    summary = JoplinImporter(app).run()
+    assert summary['cursor'] == '8' and summary['total_files'] == 5
+
+
+def test_full_sync_survives_edits_and_deletes_during_listing(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=2, JOPLIN_FETCH_WORKERS=1)
+    ids = [f"{n:032x}" for n in range(6)]
+    for n, note_id in enumerate(ids):
+        joplin.put_note(note_id, f"Note {n}", f"body {n}")
+    with app.app_context():
+        db.create_all()
+    JoplinImporter(app).run()
+
+    def mutate(page):
+        if page == 2 and ids[0] in joplin.notes:
+            joplin.put_note(ids[1], 'Note 1 edited', 'body 1 v2')  # would move to the end by updated_time
+            joplin.delete_note(ids[0])  # shifts the listing: ids[2] slides onto the page already served
+
+    joplin.on_page = mutate
+    summary = JoplinImporter(app).run(full_resync=True)
+    assert summary['error'] is None and summary['deleted_files'] == 0
+    with app.app_context():
+        assert set(_docs()) == set(ids)  # nothing unchanged was dropped
+
+    joplin.on_page = None
+    summary = JoplinImporter(app).run()  # the change feed delivers the edit and the delete
+    assert summary['deleted_files'] == 1
+    with app.app_context():
+        docs = _docs()
+        assert set(docs) == set(ids[1:]) and docs[ids[1]].file_name == 'Note 1 edited'
+
+
+def test_incremental_sync_handles_mass_deletion(app, joplin):
+    app.config.update(JOPLIN_API_URL=joplin.url, JOPLIN_API_TOKEN='t', JOPLIN_IMPORT_BATCH_SIZE=500)
+    ids = [f"{n:032x}" for n in range(1100)]
+    for note_id in ids:
+        joplin.put_note(note_id, 'n', 'x')
+    with app.app_context():
+        db.create_all()
+    assert JoplinImporter(app).run()['processed_files'] == 1100
+
+    for note_id in ids[1:]:
+        joplin.delete_note(note_id)
+    summary = JoplinImporter(app).run()
+    assert summary['error'] is None and summary['deleted_files'] == 1099
+    with app.app_context():
+        assert set(_docs()) == {ids[0]}
+        assert db.session.query(IngestState).filter_by(source='Joplin').one().cursor_token == str(len(joplin.events))
@@ -0,0 +1,24 @@
+import os
+import sys
+import subprocess
+
+HEAVY = ('markitdown', 'faster_whisper', 'dashscope', 'openai', 'google.genai')
+
+
+def test_heavy_converter_deps_load_on_first_use(tmp_path):
+    sample = tmp_path / 'note.txt'
+    sample.write_text('hello', encoding='utf-8')
+    code = (
+        "import sys\n"
+        "from local_document_search import create_app\n"
+        "from local_document_search.services.converters import convert_to_markdown, get_handler\n"
+        "app = create_app()\n"
+        "assert get_handler('pdf') is not None and get_handler('mp4') is not None\n"
+        "with app.app_context():\n"
+        f"    assert convert_to_markdown({str(sample)!r}, 'txt').success\n"
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+    )
+    env = dict(os.environ, DATABASE_URL='sqlite:///:memory:', PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip().splitlines()[-1:] in ([], [''])
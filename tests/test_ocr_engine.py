@@ -0,0 +1,51 @@
+import os
+import pytest
+from PIL import Image, ImageDraw
+from local_document_search.services import ocr_engine
+
+
+def _striped_image(width=400, height=1000, line_every=50, line_height=20):
+    """White page with black 'text lines' every ``line_every`` rows."""
+    img = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    for top in range(10, height, line_every):
+        draw.rectangle((0, top, width, top + line_height - 1), fill=0)
+    return img
+
+
+def test_small_image_is_single_tile():
+    img = _striped_image()
+    assert ocr_engine.plan_tiles(img, tile_height=200, min_pixels=10**9) == [(0, 1000)]
+
+
+def test_tiles_cover_image_and_cut_on_whitespace():
+    img = _striped_image()
+    bands = ocr_engine.plan_tiles(img, tile_height=200, min_pixels=1)
+    assert bands[0][0] == 0 and bands[-1][1] == img.height
+    for (_, bottom), (top, _) in zip(bands, bands[1:]):
+        assert bottom == top
+        # cut row must be white, i.e. between two text lines
+        assert img.getpixel((0, bottom)) == 255
+    assert len(bands) > 1
+
+
+def test_ocr_images_stitches_in_reading_order(monkeypatch):
+    pytesseract = pytest.importorskip('pytesseract')
+    calls = []
+
+    def fake_ocr(tile, lang=None):
+        calls.append(tile.height)
+        return f"band-{len(calls)}"
+
+    monkeypatch.setattr(pytesseract, 'image_to_string', fake_ocr)
+    texts = ocr_engine.ocr_images([_striped_image(), _striped_image(height=100)], 'eng',
+                                  max_workers=1, tile_height=200, min_pixels=1)
+    first, second = texts
+    lines = first.split('\n')
+    assert lines == [f"band-{i}" for i in range(1, len(lines) + 1)]
+    assert second == f"band-{len(lines) + 1}"
+
+
+def test_resolve_max_workers_bounds():
+    assert ocr_engine.resolve_max_workers(0) >= 1
+    assert ocr_engine.resolve_max_workers(10**6) <= (os.cpu_count() or 1)
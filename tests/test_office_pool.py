@@ -0,0 +1,107 @@
+import os
+import sys
+import stat
+import time
+import socket
+import pytest
+from types import SimpleNamespace
+from local_document_search.services import office_pool
+from local_document_search.services.office_pool import OfficePool
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='uses a POSIX shebang script as fake soffice')
+
+
+def _fake_soffice(tmp_path, sleep=0.0):
+    """Mimics `soffice --convert-to ext:filter --outdir DIR SRC` and records the profile it was given."""
+    script = tmp_path / 'soffice'
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys, time\n"
+        "args = sys.argv[1:]\n"
+        f"time.sleep({sleep})\n"
+        "ext = args[args.index('--convert-to') + 1].split(':')[0]\n"
+        "outdir = args[args.index('--outdir') + 1]\n"
+        "profile = [a for a in args if a.startswith('-env:UserInstallation=')][0]\n"
+        "src = args[-1]\n"
+        "stem = os.path.splitext(os.path.basename(src))[0]\n"
+        "open(os.path.join(outdir, stem + '.' + ext), 'w').write(profile)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def test_batch_conversion_uses_isolated_profiles(tmp_path):
+    sources = []
+    for n in range(4):
+        src = tmp_path / f"doc{n}.doc"
+        src.write_bytes(b'legacy')
+        sources.append(src)
+    pool = OfficePool(_fake_soffice(tmp_path), size=2, timeout=30,
+                      profile_root=str(tmp_path / 'profiles'), use_uno=False)
+    try:
+        outputs = pool.convert_many([(str(s), 'docx', 'MS Word 2007 XML', str(tmp_path / 'out')) for s in sources])
+    finally:
+        pool.shutdown()
+    assert [os.path.basename(o) for o in outputs] == [f"doc{n}.docx" for n in range(4)]
+    profiles = {open(o).read() for o in outputs}
+    assert profiles <= {f"-env:UserInstallation={(tmp_path / 'profiles' / f'slot_{i}').resolve().as_uri()}" for i in range(2)}
+
+
+def test_job_timeout_returns_none_and_frees_slot(tmp_path):
+    src = tmp_path / 'slow.ppt'
+    src.write_bytes(b'legacy')
+    pool = OfficePool(_fake_soffice(tmp_path, sleep=5), size=1, timeout=0.5,
+                      profile_root=str(tmp_path / 'profiles'), use_uno=False)
+    try:
+        assert pool.convert(str(src), 'pptx', 'MS PowerPoint 2007 XML', str(tmp_path / 'out')) is None
+        assert pool._idle.qsize() == 1
+    finally:
+        pool.shutdown()
+
+
+def _fake_listening_soffice(tmp_path):
+    """Binds the port named in --accept and stays up, like a listening soffice."""
+    script = tmp_path / 'soffice-listen'
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import socket, sys, time\n"
+        "accept = [a for a in sys.argv if a.startswith('--accept=')][0]\n"
+        "port = int(accept.split('port=')[1].split(';')[0])\n"
+        "sock = socket.socket()\n"
+        "sock.bind(('127.0.0.1', port))\n"
+        "sock.listen()\n"
+        "time.sleep(30)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def test_uno_slots_listen_on_free_ports(tmp_path, monkeypatch):
+    # Stand-in for the UNO bridge: resolving always succeeds once soffice has been spawned
+    manager = SimpleNamespace(createInstanceWithContext=lambda name, ctx: object())
+    resolver = SimpleNamespace(resolve=lambda url: SimpleNamespace(ServiceManager=manager))
+    local_ctx = SimpleNamespace(ServiceManager=SimpleNamespace(createInstanceWithContext=lambda name, ctx: resolver))
+    monkeypatch.setattr(office_pool, 'uno', SimpleNamespace(getComponentContext=lambda: local_ctx), raising=False)
+
+    soffice = _fake_listening_soffice(tmp_path)
+    pools = [OfficePool(soffice, size=2, profile_root=str(tmp_path / f'profiles{n}'), use_uno=True) for n in range(2)]
+    slots = [pool._idle.get() for pool in pools for _ in range(2)]
+    try:
+        for slot in slots:
+            slot.start()
+        ports = [slot.port for slot in slots]
+        assert len(set(ports)) == 4 and 0 not in ports
+        for port in ports:  # every soffice managed to bind its port
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    assert time.monotonic() < deadline
+                    time.sleep(0.05)
+    finally:
+        for slot in slots:
+            slot.stop()
+        for pool in pools:
+            pool.shutdown()
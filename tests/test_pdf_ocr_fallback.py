@@ -0,0 +1,119 @@
+import pytest
+from PIL import Image, ImageDraw
+from local_document_search.services import pdf_converter
+from local_document_search.models import ConversionType
+from local_document_search.services.converters import _convert_structured, _convert_with_markitdown
+
+pdfium = pytest.importorskip('pypdfium2')
+pytesseract = pytest.importorskip('pytesseract')
+
+
+def _make_scanned_pdf(path, pages=2):
+    images = []
+    for n in range(pages):
+        img = Image.new('RGB', (300, 400), 'white')
+        ImageDraw.Draw(img).rectangle((20, 20 + n * 10, 200, 40 + n * 10), fill='black')
+        images.append(img)
+    images[0].save(path, save_all=True, append_images=images[1:])
+
+
+def _make_text_pdf(path, page_texts):
+    """Minimal PDF with one Helvetica text line per page; None makes an empty page."""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in page_texts:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET' if text else ''
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    out += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    path.write_bytes(bytes(out))
+
+
+def _not_called(*args, **kwargs):
+    raise AssertionError('text-layer conversion should not run for a scanned PDF')
+
+
+def test_scanned_pdf_pages_are_ocrd(app, tmp_path, monkeypatch):
+    pdf_path = tmp_path / 'scan.pdf'
+    _make_scanned_pdf(str(pdf_path))
+    app.config['OCR_MAX_WORKERS'] = 1
+    monkeypatch.setattr(pdf_converter, '_tesseract_available', lambda: True)
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda img, lang=None: 'scanned text')
+
+    with app.app_context():
+        result = pdf_converter.convert_pdf_with_ocr_fallback(str(pdf_path), _not_called)
+
+    assert result is not None and result.success
+    assert result.conversion_type == ConversionType.STRUCTURED_TO_MD
+    assert result.metadata['ocr_pages'] == [1, 2]
+    assert result.content.index('## Page 1') < result.content.index('## Page 2')
+    assert 'scanned text' in result.content
+
+
+def test_fallback_disabled_keeps_markitdown_path(app, tmp_path):
+    pdf_path = tmp_path / 'scan.pdf'
+    _make_scanned_pdf(str(pdf_path), pages=1)
+    app.config['PDF_OCR_FALLBACK'] = False
+    with app.app_context():
+        assert pdf_converter.convert_pdf_with_ocr_fallback(str(pdf_path), _not_called) is None
+
+
+def test_text_pdf_with_blank_page_keeps_markitdown_output(app, tmp_path, monkeypatch):
+    pdf_path = tmp_path / 'report.pdf'
+    _make_text_pdf(pdf_path, ['Introduction to the quarterly report', None, 'Results and outlook for next year'])
+    app.config['OCR_MAX_WORKERS'] = 1
+    monkeypatch.setattr(pdf_converter, '_tesseract_available', lambda: True)
+    ocr_calls = []
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda img, lang=None: ocr_calls.append(img) or 'ocr text')
+
+    with app.app_context():
+        result = pdf_converter.convert_pdf_with_ocr_fallback(str(pdf_path), lambda: _convert_with_markitdown(str(pdf_path)))
+
+    assert result.success and ocr_calls == []  # the blank separator page is not sent to Tesseract
+    assert result.content == _convert_with_markitdown(str(pdf_path)).content
+    assert '## Page' not in result.content
+
+
+def test_mixed_pdf_merges_ocr_pages_into_markitdown_output(app, tmp_path, monkeypatch):
+    text_path, scan_path, pdf_path = tmp_path / 'text.pdf', tmp_path / 'scan.pdf', tmp_path / 'mixed.pdf'
+    _make_text_pdf(text_path, ['Introduction to the quarterly report', 'Results and outlook for next year'])
+    _make_scanned_pdf(str(scan_path), pages=1)
+    merged = pdfium.PdfDocument(str(text_path))
+    merged.import_pages(pdfium.PdfDocument(str(scan_path)), index=1)
+    merged.save(str(pdf_path))
+    app.config['OCR_MAX_WORKERS'] = 1
+    monkeypatch.setattr(pdf_converter, '_tesseract_available', lambda: True)
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda img, lang=None: 'figure caption')
+
+    with app.app_context():
+        result = pdf_converter.convert_pdf_with_ocr_fallback(str(pdf_path), lambda: _convert_with_markitdown(str(pdf_path)))
+
+    assert result.success and result.metadata['ocr_pages'] == [2]
+    content = result.content
+    assert content.index('quarterly report') < content.index('## Page 2\n\nfigure caption') < content.index('outlook')
+
+
+def test_pdf_pdfium_cannot_open_falls_through_to_markitdown(app, tmp_path, monkeypatch):
+    pdf_path = tmp_path / 'locked.pdf'
+    _make_text_pdf(pdf_path, ['Introduction to the quarterly report'])
+
+    def refuse(*args, **kwargs):
+        raise pdfium.PdfiumError('Incorrect password error')
+
+    monkeypatch.setattr(pdfium, 'PdfDocument', refuse)
+    with app.app_context():
+        assert pdf_converter.convert_pdf_with_ocr_fallback(str(pdf_path), _not_called) is None
+        result = _convert_structured(str(pdf_path), 'pdf')
+
+    assert result.success and 'quarterly report' in result.content
@@ -0,0 +1,122 @@
+import os
+from local_document_search.extensions import db
+from local_document_search.models import Document
+from local_document_search.services.reconcile_service import find_moved_document, reconcile_root, root_of
+from local_document_search.utils.file_utils import get_file_metadata, normalize_path
+from local_document_search.utils.hash_utils import file_sha256
+
+
+def _indexed(path, content, sha=True):
+    """Write ``content`` to ``path``, index it, then return the Document (file still on disk)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    metadata = get_file_metadata(str(path))
+    doc = Document(file_name=metadata['file_name'], file_type=metadata['file_type'], file_size=metadata['file_size'],
+                   file_created_at=metadata['file_created_at'], file_modified_time=metadata['file_modified_time'],
+                   file_path=metadata['file_path'], markdown_content=f"converted {content}", status='completed',
+                   content_sha256=file_sha256(str(path)) if sha else None)
+    db.session.add(doc)
+    return doc
+
+
+def test_reconcile_repoints_moves_and_deletes_orphans(app, tmp_path):
+    root = tmp_path / 'root'
+    with app.app_context():
+        db.create_all()
+        moved = _indexed(root / 'a' / 'report.md', 'quarterly numbers')
+        gone = _indexed(root / 'a' / 'gone.md', 'deleted for real')
+        same_size = _indexed(root / 'a' / 'twin.md', 'quarterly NUMBERS')  # same size, different content
+        kept = _indexed(root / 'b' / 'kept.md', 'still here')
+        db.session.commit()
+        moved_id, kept_id, gone_ids = moved.id, kept.id, {gone.id, same_size.id}
+
+        os.makedirs(root / 'archive')
+        os.replace(root / 'a' / 'report.md', root / 'archive' / 'report-2024.md')
+        os.remove(root / 'a' / 'gone.md')
+        os.remove(root / 'a' / 'twin.md')
+
+        stats = reconcile_root(normalize_path(str(root)), batch_size=2)
+        db.session.commit()
+
+        assert stats['orphans'] == 3 and stats['moved'] == 1 and stats['deleted'] == 2
+        remaining = {d.id: d for d in Document.query.all()}
+        assert set(remaining) == {moved_id, kept_id}
+        doc = remaining[moved_id]
+        assert doc.file_path == normalize_path(str(root / 'archive' / 'report-2024.md'))
+        assert doc.file_name == 'report-2024.md' and doc.markdown_content == 'converted quarterly numbers'
+        assert not gone_ids & set(remaining)
+
+
+def test_dry_run_and_missing_root_leave_documents(app, tmp_path):
+    root = tmp_path / 'root'
+    with app.app_context():
+        db.create_all()
+        _indexed(root / 'x.md', 'orphan soon', sha=False)
+        db.session.commit()
+        os.remove(root / 'x.md')
+
+        stats = reconcile_root(normalize_path(str(root)), delete_orphans=False)
+        db.session.rollback()
+        assert stats == {'root': normalize_path(str(root)), 'hashed': 0, 'orphans': 1, 'moved': 0, 'deleted': 0}
+        assert Document.query.count() == 1
+
+        assert reconcile_root(normalize_path(str(tmp_path / 'unmounted')))['orphans'] == 0
+        assert Document.query.count() == 1
+
+
+def test_find_moved_document_requires_vanished_source(app, tmp_path):
+    root = normalize_path(str(tmp_path))
+    with app.app_context():
+        db.create_all()
+        original = _indexed(tmp_path / 'one.md', 'identical body')
+        db.session.commit()
+        (tmp_path / 'copy.md').write_text('identical body', encoding='utf-8')
+        copy_meta = get_file_metadata(str(tmp_path / 'copy.md'))
+
+        # A copy is not a move while the original still exists
+        assert find_moved_document(copy_meta, root) is None
+        os.remove(tmp_path / 'one.md')
+        assert find_moved_document(copy_meta, root).id == original.id
+
+
+def test_find_moved_document_stays_within_root(app, tmp_path):
+    with app.app_context():
+        db.create_all()
+        # Indexed under a share that is currently unmounted
+        share = _indexed(tmp_path / 'share' / 'doc.md', 'same bytes')
+        db.session.commit()
+        os.remove(tmp_path / 'share' / 'doc.md')
+        (tmp_path / 'local').mkdir()
+        (tmp_path / 'local' / 'doc.md').write_text('same bytes', encoding='utf-8')
+        meta = get_file_metadata(str(tmp_path / 'local' / 'doc.md'))
+
+        assert find_moved_document(meta, normalize_path(str(tmp_path / 'local'))) is None
+        assert root_of(meta['file_path'], [normalize_path(str(tmp_path)), normalize_path(str(tmp_path / 'local'))]) \
+            == normalize_path(str(tmp_path / 'local'))
+        assert find_moved_document(meta, normalize_path(str(tmp_path))).id == share.id
+
+
+def test_reconcile_backfills_hashes_of_legacy_documents(app, tmp_path):
+    root = tmp_path / 'root'
+    with app.app_context():
+        db.create_all()
+        legacy = _indexed(root / 'old.md', 'indexed before the upgrade', sha=False)
+        stale = _indexed(root / 'stale.md', 'edited since indexing', sha=False)
+        db.session.commit()
+        legacy_id, stale_id = legacy.id, stale.id
+        st = os.stat(root / 'stale.md')
+        os.utime(root / 'stale.md', ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        stats = reconcile_root(normalize_path(str(root)))
+        db.session.commit()
+        assert stats['hashed'] == 1 and stats['orphans'] == 0
+        assert db.session.get(Document, legacy_id).content_sha256 == file_sha256(str(root / 'old.md'))
+        assert db.session.get(Document, stale_id).content_sha256 is None  # would not describe the indexed content
+
+        # With the hash in place a later move is followed instead of deleting the Document
+        os.makedirs(root / 'archive')
+        os.replace(root / 'old.md', root / 'archive' / 'old.md')
+        stats = reconcile_root(normalize_path(str(root)))
+        db.session.commit()
+        assert stats['moved'] == 1 and stats['deleted'] == 0
+        assert db.session.get(Document, legacy_id).file_path == normalize_path(str(root / 'archive' / 'old.md'))
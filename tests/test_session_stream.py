@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from local_document_search.services.ingestion_manager import (
+    IngestionSource, _ProgressCoalescer, get_session_debug, start_async_source, stream_async_session,
+)
+
+
+class GatedSource(IngestionSource):
+    """Emits ``count`` events, each only after the test releases the gate."""
+    name = 'gated'
+
+    def __init__(self, count):
+        self.count = count
+        self.gate = threading.Semaphore(0)
+
+    def iter_events(self, session_id):
+        for i in range(self.count):
+            self.gate.acquire()
+            yield {'level': 'info', 'message': f'event {i}', 'stage': 'file_success', 'n': i}
+        yield {'level': 'info', 'message': 'finished', 'stage': 'done', 'summary': {}}
+
+
+def _sse(response):
+    """(id, event) pairs of an SSE body."""
+    out, event_id = [], None
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith('id: '):
+            event_id = line[4:]
+        elif line.startswith('data: '):
+            out.append((event_id, json.loads(line[6:])))
+            event_id = None
+    return out
+
+
+def _run(app, count):
+    source = GatedSource(count)
+    session_id = start_async_source(source)
+    for _ in range(count):
+        source.gate.release()
+    app.config['INGEST_SESSIONS'][session_id]['thread'].join(timeout=10)
+    return session_id
+
+
+def _follow(app, session_id, out, **kwargs):
+    with app.app_context():
+        out.extend(evt for evt in stream_async_session(session_id, **kwargs) if evt['stage'] != 'debug_state')
+
+
+def test_every_subscriber_receives_every_event(app):
+    app.config.update(SSE_HEARTBEAT_SECONDS=60, SSE_PROGRESS_INTERVAL=0)  # idle subscribers wake on events, not a timer
+    with app.app_context():
+        source = GatedSource(3)
+        session_id = start_async_source(source)
+        source.gate.release()  # one event before anyone subscribes: delivered through replay
+        first, second = [], []
+        threads = [threading.Thread(target=_follow, args=(app, session_id, out)) for out in (first, second)]
+        for t in threads:
+            t.start()
+        source.gate.release()
+        source.gate.release()
+        for t in threads:
+            t.join(timeout=10)
+        assert not any(t.is_alive() for t in threads)
+        for out in (first, second):
+            assert [e.get('n') for e in out] == [0, 1, 2, None] and out[-1]['stage'] == 'done'
+        assert get_session_debug(session_id)['subscribers'] == 0
+
+
+def test_slow_subscriber_drops_oldest_events(app):
+    app.config.update(SSE_SUBSCRIBER_QUEUE_SIZE=2, SSE_PROGRESS_INTERVAL=0)
+    with app.app_context():
+        source = GatedSource(5)
+        session_id = start_async_source(source)
+        stream = stream_async_session(session_id)
+        # Subscribe (the first event arrives via replay or live), then let the run finish unread
+        source.gate.release()
+        assert next(stream)['n'] == 0
+        for _ in range(4):
+            source.gate.release()
+        app.config['INGEST_SESSIONS'][session_id]['thread'].join(timeout=10)
+        rest = [e for e in stream if e['stage'] != 'debug_state']
+        assert rest[0]['stage'] == 'events_dropped' and rest[0]['message'].startswith('3 ')
+        assert [e.get('n') for e in rest[1:]] == [4, None]
+
+
+def test_progress_is_coalesced_and_errors_pass_through():
+    emitted = []
+    coalescer = _ProgressCoalescer(emitted.append, interval=0.2)
+    for i in range(50):
+        coalescer.push({'stage': 'debug_state', 'message': 'hb'})
+        coalescer.push({'stage': 'file_processing', 'progress': i * 2, 'current_file': f'f{i}.md'})
+        coalescer.push({'stage': 'file_skip' if i % 5 else 'file_success'})
+    assert [e['stage'] for e in emitted] == ['progress']  # leading update only; the rest is held back
+
+    coalescer.push({'stage': 'file_error', 'message': 'boom'})
+    # The held summary goes out first, then the error, without waiting for the interval
+    assert [e['stage'] for e in emitted] == ['progress', 'progress', 'file_error']
+    assert emitted[1]['counts'] == {'processed': 10, 'skipped': 40, 'errors': 0}
+    assert emitted[1]['current_file'] == 'f49.md' and emitted[1]['progress'] == 98
+
+    coalescer.push({'stage': 'file_processing', 'progress': 100, 'current_file': 'slow.pdf'})
+    time.sleep(0.5)  # no further events: the timer delivers the pending update
+    assert emitted[-1]['current_file'] == 'slow.pdf' and emitted[-1]['counts']['errors'] == 1
+    coalescer.close()
+    assert len(emitted) == 4
+
+
+def test_reconnect_resumes_after_last_event_id(app):
+    app.config.update(SSE_PROGRESS_INTERVAL=0, SSE_EVENT_LOG_SIZE=4)
+    client = app.test_client()
+    with app.app_context():
+        session_id = _run(app, 3)  # events 1-3 plus done (4)
+
+    full = _sse(client.get(f'/api/convert-stream?session_id={session_id}'))
+    assert full[0] == (None, {'level': 'info', 'message': f'Session started: {session_id}',
+                              'stage': 'session_info', 'session_id': session_id})
+    assert [i for i, _ in full[1:]] == [f'{session_id}-{n}' for n in (1, 2, 3, 4)]
+
+    # EventSource reconnecting on its own: any stream URL + Last-Event-ID header
+    resumed = _sse(client.get('/api/sources/gated/stream', headers={'Last-Event-ID': f'{session_id}-2'}))
+    assert [e['event_id'] for _, e in resumed] == [3, 4] and resumed[-1][1]['stage'] == 'done'
+
+    # Everything delivered and the session is done: 204 stops further reconnects
+    assert client.get(f'/api/convert-stream?session_id={session_id}&last_event_id=4').status_code == 204
+
+    with app.app_context():
+        session_id = _run(app, 5)  # 6 events, the log keeps the last 4
+    gap = _sse(client.get('/api/convert-stream', headers={'Last-Event-ID': f'{session_id}-1'}))
+    assert gap[0][1]['stage'] == 'events_dropped' and gap[0][1]['message'].startswith('1 ')
+    assert [e['event_id'] for _, e in gap[1:]] == [3, 4, 5, 6]
+
+    unknown = _sse(client.get('/api/convert-stream', headers={'Last-Event-ID': 'feedface-3'}))
+    assert unknown[0][1]['stage'] == 'critical_error'
@@ -0,0 +1,36 @@
+from openpyxl import Workbook
+from local_document_search.models import ConversionType
+from local_document_search.services.converters import convert_to_markdown
+
+
+def _write_workbook(path):
+    wb = Workbook(write_only=True)
+    people = wb.create_sheet('People')
+    people.append(['name', 'note', 'extra'])
+    for n in range(10):
+        people.append([f"user{n}", 'a|b\nc', n * 1.0])
+    wide = wb.create_sheet('Wide')
+    wide.append([f"c{n}" for n in range(8)])
+    wb.create_sheet('Empty')
+    wb.save(path)
+
+
+def test_xlsx_streamed_per_sheet_with_caps(app, tmp_path):
+    path = tmp_path / 'book.xlsx'
+    _write_workbook(path)
+    app.config.update(SPREADSHEET_MAX_ROWS=4, SPREADSHEET_MAX_COLS=5)
+    with app.app_context():
+        result = convert_to_markdown(str(path), 'xlsx')
+
+    assert result.success
+    assert result.conversion_type == ConversionType.STRUCTURED_TO_MD
+    content = result.content
+    assert '## People' in content and '## Wide' in content and '## Empty' not in content
+    assert '| name | note | extra |' in content
+    assert '| user2 | a\\|b c | 2 |' in content
+    assert 'user3' not in content
+    assert '| c0 | c1 | c2 | c3 | c4 |' in content and 'c5' not in content
+    sheets = {s['name']: s for s in result.metadata['sheets']}
+    assert sheets['People']['rows_truncated'] and not sheets['People']['cols_truncated']
+    assert sheets['Wide']['cols_truncated']
+    assert sheets['Empty']['rows'] == 0
@@ -1,9 +1,10 @@
 ﻿import os
+import shutil
 import pytest
 from local_document_search.services.video_converter import convert_video_metadata
 from local_document_search.models import ConversionType
 
-@pytest.mark.skipif(not os.environ.get('FFPROBE_BIN') and os.system('ffprobe -version >nul 2>&1') != 0,
+@pytest.mark.skipif(not os.environ.get('FFPROBE_BIN') and shutil.which('ffprobe') is None,
                     reason='ffprobe not available in PATH')
 def test_video_metadata_minimal(tmp_path):
     # 创建一个极小的空文件（ffprobe 可能会失败，这里更多是结构校验；真实环境需提供有效视频样本）
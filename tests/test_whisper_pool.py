@@ -0,0 +1,49 @@
+import time
+import pytest
+from local_document_search.services import whisper_pool
+
+
+class FakeModel:
+    def __init__(self, key):
+        self.key = key
+
+    def transcribe(self, audio, **kwargs):
+        return iter([f"{audio}:{kwargs.get('beam_size')}"]), {'language': 'en'}
+
+
+@pytest.fixture
+def fake_loader(monkeypatch):
+    loads = []
+
+    def _load(model_name, device, compute_type, cpu_threads=0):
+        loads.append((model_name, device, compute_type))
+        return FakeModel((model_name, device, compute_type))
+
+    monkeypatch.setattr(whisper_pool, '_load_model', _load)
+    monkeypatch.setattr(whisper_pool, '_models', {})
+    monkeypatch.setattr(whisper_pool, '_idle_ttl', whisper_pool.DEFAULT_IDLE_TTL)
+    monkeypatch.setattr(whisper_pool, '_ensure_reaper', lambda: None)
+    return loads
+
+
+def test_model_loaded_once_per_key(fake_loader):
+    a = whisper_pool.get_model('base', 'cpu', 'int8')
+    b = whisper_pool.get_model('base', 'cpu', 'int8')
+    c = whisper_pool.get_model('small', 'cpu', 'int8')
+    assert a is b and a is not c
+    assert fake_loader == [('base', 'cpu', 'int8'), ('small', 'cpu', 'int8')]
+
+
+def test_idle_models_evicted(fake_loader):
+    whisper_pool.get_model('base', 'cpu', 'int8', idle_ttl=10)
+    assert whisper_pool.evict_idle(now=time.monotonic() + 1) == 0
+    assert whisper_pool.evict_idle(now=time.monotonic() + 11) == 1
+    assert whisper_pool.loaded_models() == []
+    whisper_pool.get_model('base', 'cpu', 'int8')
+    assert len(fake_loader) == 2
+
+
+def test_transcribe_runs_on_worker_and_materializes(fake_loader):
+    segments, info = whisper_pool.transcribe('a.wav', 'base', beam_size=5)
+    assert segments == ['a.wav:5']
+    assert info == {'language': 'en'}